@@ -14,9 +14,17 @@ class DatabaseConfig:
         self.database_path: str = os.getenv("DIGITAL_BRAIN_DB_PATH", "digital_twins.db")
         self.cache_size: int = int(os.getenv("DIGITAL_BRAIN_CACHE_SIZE", "100"))
         self.enable_cache: bool = os.getenv("DIGITAL_BRAIN_ENABLE_CACHE", "true").lower() == "true"
+        self.cache_ttl_seconds: int = int(os.getenv("DIGITAL_BRAIN_CACHE_TTL", "0"))
+        self.cache_max_bytes: int = int(os.getenv("DIGITAL_BRAIN_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
         self.backup_interval_hours: int = int(os.getenv("DIGITAL_BRAIN_BACKUP_INTERVAL", "24"))
         self.max_user_id_length: int = int(os.getenv("DIGITAL_BRAIN_MAX_USER_ID_LENGTH", "50"))
         self.connection_timeout: int = int(os.getenv("DIGITAL_BRAIN_CONNECTION_TIMEOUT", "30"))
+        self.codec: str = os.getenv("DIGITAL_BRAIN_CODEC", "columnar")
+        self.migrate_on_read: bool = os.getenv("DIGITAL_BRAIN_MIGRATE_ON_READ", "true").lower() == "true"
+        self.pooled_connections: bool = os.getenv("DIGITAL_BRAIN_POOLED_CONNECTIONS", "true").lower() == "true"
+        # "snapshot" rewrites the whole twin per added value, "datapoints" appends a row
+        self.storage_mode: str = os.getenv("DIGITAL_BRAIN_STORAGE_MODE", "snapshot")
+        self.compact_after: int = int(os.getenv("DIGITAL_BRAIN_COMPACT_AFTER", "1000"))
     
     @property
     def database_file_path(self) -> Path:
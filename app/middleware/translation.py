@@ -7,33 +7,42 @@ from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 import json
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence
 from pathlib import Path
 
+from app.middleware.translation_catalog import TranslationCatalog
+
+TRANSLATIONS_DIR = Path(__file__).parent / "translations"
+
+# Shared by the middleware and by endpoints reached without it
+translation_catalog = TranslationCatalog(
+    TRANSLATIONS_DIR,
+    reload_interval=float(os.getenv("TRANSLATIONS_RELOAD_INTERVAL", "2"))
+)
+
 class TranslationMiddleware:
-    def __init__(self, app):
+    def __init__(self, app, catalog: Optional[TranslationCatalog] = None):
         self.app = app
-        self.translations = {}
+        self.catalog = catalog or translation_catalog
         self.load_translations()
     
+    @property
+    def translations(self) -> Dict[str, Any]:
+        """Nested translations per language, as loaded from disk"""
+        return self.catalog.sources
+    
     def load_translations(self):
         """Load translation files from backend translations directory"""
-        translations_dir = Path(__file__).parent / "translations"
+        translations_dir = self.catalog.translations_dir
         
         if not translations_dir.exists():
             print("⚠️ Translations directory not found, creating with default translations")
             translations_dir.mkdir(exist_ok=True)
             self.create_default_translations(translations_dir)
         
-        # Load translation files
-        for lang_file in translations_dir.glob("*.json"):
-            lang_code = lang_file.stem
-            try:
-                with open(lang_file, 'r', encoding='utf-8') as f:
-                    self.translations[lang_code] = json.load(f)
-                print(f"✅ Loaded translations for {lang_code}")
-            except Exception as e:
-                print(f"❌ Failed to load translations for {lang_code}: {e}")
+        # Compile translation files; later edits are picked up by the catalog's reload check
+        self.catalog.reload()
+        print(f"✅ Loaded translations for {', '.join(self.catalog.languages)}")
     
     def create_default_translations(self, translations_dir: Path):
         """Create default translation files"""
@@ -200,35 +209,20 @@ class TranslationMiddleware:
         languages.sort(key=lambda x: x[1], reverse=True)
         
         # Return first supported language
+        supported = self.catalog.languages
         for lang_code, _ in languages:
-            if lang_code in self.translations:
+            if lang_code in supported:
                 return lang_code
         
         return 'en'  # Default fallback
     
     def translate(self, key: str, language: str = 'en', **kwargs) -> str:
         """Translate a key to the specified language"""
-        if language not in self.translations:
-            language = 'en'
-        
-        # Navigate nested keys (e.g., "health.categories.cardiovascular")
-        keys = key.split('.')
-        value = self.translations[language]
-        
-        try:
-            for k in keys:
-                value = value[k]
-            
-            # Handle string formatting if kwargs provided
-            if kwargs and isinstance(value, str):
-                return value.format(**kwargs)
-            
-            return value
-        except (KeyError, TypeError):
-            # Fallback to English if key not found
-            if language != 'en':
-                return self.translate(key, 'en', **kwargs)
-            return key  # Return key itself if not found
+        return self.catalog.translate(key, language, **kwargs)
+    
+    def translate_many(self, keys: Sequence[str], language: str = 'en') -> List[str]:
+        """Translate several keys to the specified language"""
+        return self.catalog.translate_many(keys, language)
     
     async def __call__(self, request: Request, call_next):
         # Extract language from Accept-Language header
@@ -239,6 +233,7 @@ class TranslationMiddleware:
         request.state.language = language
         request.state.translate = lambda key, **kwargs: self.translate(key, language, **kwargs)
         request.state.t = request.state.translate  # Shorthand alias
+        request.state.translate_many = lambda keys: self.translate_many(keys, language)
         
         # Process request
         response = await call_next(request)
@@ -252,7 +247,19 @@ class TranslationMiddleware:
 # Helper function to get translation function from request
 def get_translator(request: Request):
     """Get translation function from request state"""
-    return getattr(request.state, 'translate', lambda key, **kwargs: key)
+    translate = getattr(request.state, 'translate', None)
+    if translate is None:
+        language = get_language(request)
+        translate = lambda key, **kwargs: translation_catalog.translate(key, language, **kwargs)
+    return translate
+
+def get_batch_translator(request: Request):
+    """Get a function translating a list of keys in one call"""
+    translate_many = getattr(request.state, 'translate_many', None)
+    if translate_many is None:
+        language = get_language(request)
+        translate_many = lambda keys: translation_catalog.translate_many(keys, language)
+    return translate_many
 
 def get_language(request: Request) -> str:
     """Get current language from request state"""
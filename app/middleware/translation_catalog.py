@@ -0,0 +1,146 @@
+"""
+Compiled catalog of the static UI translations in ``translations/*.json``.
+
+Each language file is flattened once into a single ``{"a.b.c": value}``
+dict, with the language's fallback chain (``hi-IN`` -> ``hi`` -> ``en``)
+already merged in, so a lookup is one dict access and a miss costs nothing
+extra. Intermediate keys (``"health.status"``) map to their nested dicts,
+as the nested walk used to return them.
+
+The files are re-checked at most every ``reload_interval`` seconds; when
+any of them changes the catalog is recompiled and swapped in whole, so
+readers never see a half-built table. A file that fails to parse keeps
+its previously loaded translations.
+"""
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def flatten(tree: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """``{"a": {"b": "x"}}`` -> ``{"a": {"b": "x"}, "a.b": "x"}``."""
+    flat: Dict[str, Any] = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        flat[path] = value
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+    return flat
+
+
+class TranslationCatalog:
+    """Flat per-language lookup tables compiled from a directory of JSON files."""
+
+    def __init__(self, translations_dir, default_language: str = 'en', reload_interval: float = 2.0):
+        self.translations_dir = Path(translations_dir)
+        self.default_language = default_language
+        self.reload_interval = reload_interval
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        self._compiled: Dict[str, Dict[str, Any]] = {}
+        self._signature: Optional[Tuple] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @property
+    def languages(self) -> List[str]:
+        self._maybe_reload()
+        return list(self._compiled)
+
+    @property
+    def sources(self) -> Dict[str, Dict[str, Any]]:
+        """The nested translations as loaded from disk."""
+        self._maybe_reload()
+        return self._sources
+
+    @property
+    def version(self) -> Optional[Tuple]:
+        """Changes whenever the compiled translations do."""
+        self._maybe_reload()
+        return self._signature
+
+    def fallback_chain(self, language: str) -> List[str]:
+        chain = [language]
+        if '-' in language:
+            chain.append(language.split('-', 1)[0])
+        if self.default_language not in chain:
+            chain.append(self.default_language)
+        return chain
+
+    def table(self, language: str) -> Dict[str, Any]:
+        """The compiled lookup table for ``language`` (the default language's if unknown)."""
+        self._maybe_reload()
+        compiled = self._compiled
+        table = compiled.get(language)
+        if table is None:
+            table = compiled.get(self.default_language, {})
+        return table
+
+    def translate(self, key: str, language: str = 'en', **kwargs) -> Any:
+        """Translate a key; a key missing from every language in the chain is returned as is."""
+        value = self.table(language).get(key, key)
+        if kwargs and isinstance(value, str):
+            return value.format(**kwargs)
+        return value
+
+    def translate_many(self, keys: Sequence[str], language: str = 'en') -> List[Any]:
+        """Translations of ``keys`` in order, resolving the language once."""
+        table = self.table(language)
+        return [table.get(key, key) for key in keys]
+
+    def reload(self) -> bool:
+        """Recompile if any translation file changed; returns whether it did."""
+        with self._lock:
+            signature = self._file_signature()
+            if signature == self._signature:
+                return False
+
+            sources = dict(self._sources)
+            present = set()
+            for lang_file in self.translations_dir.glob("*.json"):
+                present.add(lang_file.stem)
+                try:
+                    with open(lang_file, 'r', encoding='utf-8') as f:
+                        sources[lang_file.stem] = json.load(f)
+                except Exception as e:
+                    logger.error(f"Failed to load translations for {lang_file.stem}: {e}")
+            sources = {lang: tree for lang, tree in sources.items() if lang in present}
+
+            flat = {lang: flatten(tree) for lang, tree in sources.items()}
+            compiled = {}
+            for lang in flat:
+                table: Dict[str, Any] = {}
+                # Later (more specific) languages in the chain override earlier ones
+                for fallback in reversed(self.fallback_chain(lang)):
+                    table.update(flat.get(fallback, {}))
+                compiled[lang] = table
+
+            self._sources = sources
+            self._compiled = compiled
+            self._signature = signature
+            self.reloads += 1
+            logger.info(f"Compiled translations for {', '.join(sorted(compiled)) or 'no languages'}")
+            return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Failed to reload translations from {self.translations_dir}: {e}")
+
+    def _file_signature(self) -> Tuple:
+        signature = []
+        for lang_file in sorted(self.translations_dir.glob("*.json")):
+            stat = lang_file.stat()
+            signature.append((lang_file.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
@@ -6,6 +6,9 @@ from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, ForeignKe
 from datetime import datetime
 from app.database import Base
 
+# data_type of the row tracking the incremental recompute state for a user
+PIPELINE_STATE_TYPE = 'pipeline_state'
+
 
 class ComputedData(Base):
     """Store computed/derived health data for users."""
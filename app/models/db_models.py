@@ -45,6 +45,7 @@ class Biomarker(Base):
     category = Column(String(50))  # 'metabolic', 'lipids', 'vitamins', etc.
     test_date = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User", back_populates="biomarkers")
 
@@ -60,6 +61,7 @@ class MedicalHistory(Base):
     start_date = Column(DateTime)
     end_date = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User", back_populates="medical_history")
 
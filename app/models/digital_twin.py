@@ -1,6 +1,8 @@
+from bisect import bisect_left, bisect_right, insort_right
+from dataclasses import dataclass
 from enum import Enum
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 
 class FieldState(Enum):
@@ -9,20 +11,52 @@ class FieldState(Enum):
     NOT_APPLICABLE = "not_applicable"
 
 
+@dataclass(frozen=True, eq=False)
 class HealthDataPoint:
-    def __init__(self, value: Any, timestamp: datetime, unit: Optional[str] = None, metadata: Dict[str, Any] = None):
-        self.value = value
-        self.timestamp = timestamp
-        self.unit = unit
-        self.metadata = metadata or {}
+    """
+    One recorded value. Points are frozen and shared between copies of a
+    twin, so ``value`` and ``metadata`` must be treated as read-only too.
+    """
+    value: Any
+    timestamp: datetime
+    unit: Optional[str] = None
+    metadata: Dict[str, Any] = None
+    
+    def __post_init__(self):
+        if not self.metadata:
+            object.__setattr__(self, 'metadata', {})
+
+
+_EPOCH = datetime(1970, 1, 1)
+_DOWNSAMPLE_METHODS = ("first", "last", "min", "max", "mean")
+
+
+def _timestamp_of(data_point: 'HealthDataPoint') -> datetime:
+    return data_point.timestamp
 
 
 class HealthField:
+    """
+    A named series of data points kept sorted by timestamp.
+    
+    ``values`` stays a plain list so it can be iterated and indexed directly;
+    inserts use binary search instead of re-sorting, and the range queries
+    below are O(log n) lookups on it. Copies share the list until one of
+    them adds a value (copy-on-write), so only write through ``add_value``
+    and ``bulk_add``.
+    """
+    
     def __init__(self, field_name: str, field_type: str, state: FieldState):
         self.field_name = field_name
         self.field_type = field_type
         self.state = state
         self.values: List[HealthDataPoint] = []
+        self._shared = False  # values is also referenced by a copy
+    
+    def _own_values(self):
+        if self._shared:
+            self.values = list(self.values)
+            self._shared = False
     
     def add_value(self, value: Any, timestamp: datetime, unit: Optional[str] = None, metadata: Dict[str, Any] = None):
         """Add a new data point to this field"""
@@ -32,8 +66,22 @@ class HealthField:
             unit=unit,
             metadata=metadata or {}
         )
-        self.values.append(data_point)
-        self.values.sort(key=lambda x: x.timestamp)
+        self._own_values()
+        if not self.values or timestamp >= self.values[-1].timestamp:
+            self.values.append(data_point)
+        else:
+            # After any points with the same timestamp, like a stable sort would
+            insort_right(self.values, data_point, key=_timestamp_of)
+        self.state = FieldState.POPULATED
+    
+    def bulk_add(self, data_points: Iterable[Union[HealthDataPoint, tuple]]):
+        """Add many data points (or ``(value, timestamp[, unit[, metadata]])`` tuples), sorting once"""
+        added = [point if isinstance(point, HealthDataPoint) else HealthDataPoint(*point) for point in data_points]
+        if not added:
+            return
+        self._own_values()
+        self.values.extend(added)
+        self.values.sort(key=_timestamp_of)
         self.state = FieldState.POPULATED
     
     def get_latest_value(self) -> Optional[HealthDataPoint]:
@@ -43,6 +91,69 @@ class HealthField:
     def get_historical_values(self) -> List[HealthDataPoint]:
         """Get all data points in chronological order"""
         return self.values
+    
+    def range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[HealthDataPoint]:
+        """Data points with start <= timestamp < end; either bound may be omitted"""
+        lo = bisect_left(self.values, start, key=_timestamp_of) if start is not None else 0
+        hi = bisect_left(self.values, end, key=_timestamp_of) if end is not None else len(self.values)
+        return self.values[lo:hi]
+    
+    def latest_before(self, timestamp: datetime) -> Optional[HealthDataPoint]:
+        """The most recent data point at or before ``timestamp``"""
+        position = bisect_right(self.values, timestamp, key=_timestamp_of)
+        return self.values[position - 1] if position else None
+    
+    def downsample(self, interval: timedelta, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   method: str = "last") -> List[HealthDataPoint]:
+        """
+        One data point per ``interval`` bucket (aligned to the Unix epoch).
+        
+        ``method`` is "first", "last", "min" or "max", which return existing
+        points, or "mean", which returns a new point stamped with the bucket
+        start and carrying the sample count in its metadata.
+        """
+        if method not in _DOWNSAMPLE_METHODS:
+            raise ValueError(f"Unknown downsample method '{method}'")
+        if interval <= timedelta(0):
+            raise ValueError("Downsample interval must be positive")
+        
+        buckets: List[List[HealthDataPoint]] = []
+        current_bucket = None
+        for point in self.range(start, end):
+            origin = _EPOCH.replace(tzinfo=point.timestamp.tzinfo)
+            bucket = (point.timestamp - origin) // interval
+            if bucket != current_bucket:
+                buckets.append([])
+                current_bucket = bucket
+            buckets[-1].append(point)
+        
+        if method == "first":
+            return [points[0] for points in buckets]
+        if method == "last":
+            return [points[-1] for points in buckets]
+        if method == "min":
+            return [min(points, key=lambda p: p.value) for points in buckets]
+        if method == "max":
+            return [max(points, key=lambda p: p.value) for points in buckets]
+        
+        result = []
+        for points in buckets:
+            first = points[0].timestamp
+            origin = _EPOCH.replace(tzinfo=first.tzinfo)
+            result.append(HealthDataPoint(
+                value=sum(p.value for p in points) / len(points),
+                timestamp=origin + ((first - origin) // interval) * interval,
+                unit=points[-1].unit,
+                metadata={'count': len(points)}
+            ))
+        return result
+    
+    def copy(self) -> 'HealthField':
+        """Copy of this field; the (frozen) data points are shared, the list until either side writes"""
+        field = HealthField(self.field_name, self.field_type, self.state)
+        field.values = self.values
+        field._shared = self._shared = True
+        return field
 
 
 class HealthDomain:
@@ -76,6 +187,12 @@ class HealthDomain:
         
         populated_count = sum(1 for field in self.fields.values() if field.state == FieldState.POPULATED)
         return (populated_count / len(self.fields)) * 100
+    
+    def copy(self) -> 'HealthDomain':
+        """Copy of this domain and its fields"""
+        domain = HealthDomain(self.domain_name)
+        domain.fields = {name: field.copy() for name, field in self.fields.items()}
+        return domain
 
 
 class DigitalTwin:
@@ -85,6 +202,8 @@ class DigitalTwin:
         self.updated_at = datetime.now()
         self.metadata = metadata or {}
         self.domains: Dict[str, HealthDomain] = {}
+        # Highest appended data point id folded into this twin by the storage layer
+        self.last_point_id = 0
         
         # Initialize common health domains
         common_domains = ["demographics", "biomarkers", "medical_history", "lifestyle", "genetics"]
@@ -113,6 +232,11 @@ class DigitalTwin:
         else:
             return health_field.get_historical_values()
     
+    def get_field(self, domain: str, field: str) -> Optional[HealthField]:
+        """Retrieve a field, e.g. to run range or downsampling queries on its history"""
+        health_domain = self.domains.get(domain)
+        return health_domain.fields.get(field) if health_domain else None
+    
     def get_domain(self, domain: str) -> Optional[HealthDomain]:
         """Retrieve entire domain"""
         return self.domains.get(domain)
@@ -133,3 +257,19 @@ class DigitalTwin:
         
         total_completeness = sum(domain.get_completeness_percentage() for domain in self.domains.values())
         return total_completeness / len(self.domains)
+    
+    def copy(self) -> 'DigitalTwin':
+        """
+        Structural snapshot of this twin.
+        
+        Domains and fields are copied and each field's value list is copied
+        on its first write, so changes made through the public API do not
+        leak between copies. Data points are frozen and shared. The cost
+        depends on the number of fields, not on the length of their history.
+        """
+        twin = DigitalTwin(self.user_id, metadata=dict(self.metadata))
+        twin.created_at = self.created_at
+        twin.updated_at = self.updated_at
+        twin.last_point_id = self.last_point_id
+        twin.domains = {name: domain.copy() for name, domain in self.domains.items()}
+        return twin
@@ -28,6 +28,41 @@ async def update_llm_config(config: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/llm/cache")
+async def get_llm_cache_stats() -> Dict[str, Any]:
+    """Get LLM response cache statistics."""
+    return llm_orchestrator.get_cache_stats()
+
+
+@router.delete("/llm/cache")
+async def clear_llm_cache():
+    """Clear cached LLM responses."""
+    if llm_orchestrator.response_cache is not None:
+        llm_orchestrator.response_cache.clear()
+    return {"message": "LLM response cache cleared"}
+
+
+@router.get("/context/cache")
+async def get_context_cache_stats() -> Dict[str, Any]:
+    """Get digital twin summary cache statistics."""
+    from app.services.twin_summary_cache import twin_summary_cache
+    return twin_summary_cache.stats()
+
+
+@router.get("/translations/response-cache")
+async def get_translated_response_cache_stats() -> Dict[str, Any]:
+    """Get translated response cache statistics."""
+    from app.services.translated_response_cache import translated_response_cache
+    return translated_response_cache.stats()
+
+
+@router.get("/translations/jobs")
+async def get_translation_job_status() -> Dict[str, Any]:
+    """Get background translation queue depth, lag and worker counters."""
+    from app.services.translation_jobs import translation_worker
+    return translation_worker.status()
+
+
 @router.get("/llm/models")
 async def list_available_models():
     """List available AWS Bedrock models."""
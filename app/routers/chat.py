@@ -1,19 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
 from typing import Optional, List
-import json
-import asyncio
+from contextlib import aclosing
 
 from app.services.chat.chat_service import ChatService
 from app.services.chat.models import (
     ChatRequest, ChatSession, ChatSessionSummary, Message, StreamEvent
 )
+from app.services.chat.sse import coalesce_tokens, event_frame, sse_frame
 from app.middleware.translation import get_translator, get_language
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 # Initialize chat service
 chat_service = ChatService()
+stream_config = chat_service.llm_orchestrator.aws_llm.config.get("sse", {})
 
 
 @router.post("/sessions")
@@ -114,25 +115,24 @@ async def send_message_streaming(
                 "language": language,
                 "timestamp": "2024-01-08T03:35:00Z"
             }
-            yield f"data: {json.dumps({'type': 'session_info', 'data': session_info})}\n\n"
+            yield sse_frame({'type': 'session_info', 'data': session_info})
             
-            # Add language context to chat request
-            request.language = language
-            
-            # Stream the chat response
-            async for event in chat_service.send_message(user_id, session_id, request.message, language=language):
-                event_data = {
-                    "type": event.event_type.value,
-                    "data": event.data,
-                    "timestamp": event.timestamp.isoformat()
-                }
-                yield f"data: {json.dumps(event_data)}\n\n"
-                
-                # Small delay to ensure proper streaming
-                await asyncio.sleep(0.01)
+            # Stream the chat response; tokens are merged into frames unless coalescing is off.
+            # Each frame waits for the client to take the previous one, and a disconnect
+            # closes the stream, which stops generation.
+            events = chat_service.send_message(user_id, session_id, request.message, language=language)
+            if stream_config.get("coalesce", True):
+                events = coalesce_tokens(
+                    events,
+                    flush_interval=stream_config.get("flush_interval_ms", 50) / 1000,
+                    max_chars=stream_config.get("max_frame_chars", 1024)
+                )
+            async with aclosing(events):
+                async for event in events:
+                    yield event_frame(event)
             
             # Send completion signal
-            yield f"data: {json.dumps({'type': 'stream_end'})}\n\n"
+            yield sse_frame({'type': 'stream_end'})
             
         except Exception as e:
             error_message = t('chat.responses.error') if hasattr(t, '__call__') else f"Error processing message: {str(e)}"
@@ -141,7 +141,7 @@ async def send_message_streaming(
                 "data": error_message,
                 "timestamp": "2024-01-08T03:35:00Z"
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield sse_frame(error_data)
     
     return StreamingResponse(
         event_stream(),
@@ -156,14 +156,15 @@ async def send_message_streaming(
 
 
 @router.post("/message")
-async def send_message_simple(request: ChatRequest, user_id: str = "hardcoded"):
+async def send_message_simple(request: ChatRequest, http_request: Request, user_id: str = "hardcoded"):
     """Send a message and get a simple JSON response (non-streaming)."""
     try:
         # Collect all streaming events
         full_response = ""
         session_id = request.session_id
+        language = get_language(http_request)
         
-        async for event in chat_service.send_message(user_id, session_id, request.message):
+        async for event in chat_service.send_message(user_id, session_id, request.message, language=language):
             if event.event_type.value == "complete":
                 full_response = event.data
                 if not session_id:
@@ -2,23 +2,27 @@
 Database-backed API endpoints for user data.
 """
 
-from fastapi import APIRouter, HTTPException, Request
-from app.services.user_db_service import user_db_service
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.services.user_db_service import UserDBService, get_user_db_service
 from app.services.digital_twin_db import digital_twin_db
-from app.middleware.translation import get_translator, get_language
+from app.services.translated_response_cache import translated_response_cache
+from app.middleware.translation import get_batch_translator, get_language, translation_catalog
 
 router = APIRouter(prefix="/api/db", tags=["database"])
 
+# Endpoints that only touch the database are plain ``def`` so FastAPI runs them
+# in its threadpool, each with its own request-scoped session.
+
 
 @router.get("/users")
-async def get_all_users():
+def get_all_users(user_db_service: UserDBService = Depends(get_user_db_service)):
     """Get all users from database."""
     users = user_db_service.get_all_users()
     return {"users": users, "count": len(users)}
 
 
 @router.get("/users/{user_id}")
-async def get_user(user_id: str):
+def get_user(user_id: str, user_db_service: UserDBService = Depends(get_user_db_service)):
     """Get user profile from database."""
     user = user_db_service.get_user(user_id)
     if not user:
@@ -27,36 +31,55 @@ async def get_user(user_id: str):
 
 
 @router.get("/users/{user_id}/biomarkers")
-async def get_user_biomarkers(user_id: str, request: Request):
+def get_user_biomarkers(user_id: str, request: Request,
+                        user_db_service: UserDBService = Depends(get_user_db_service)):
     """Get user biomarkers grouped by category."""
+    return translated_response_cache.get_or_build(
+        "db_users.biomarkers", user_id, get_language(request),
+        lambda: build_biomarkers_response(user_id, request, user_db_service),
+        translation_version=translation_catalog.version
+    )
+
+
+def build_biomarkers_response(user_id: str, request: Request, user_db_service: UserDBService) -> dict:
+    """Translated biomarkers payload for ``get_user_biomarkers``."""
     biomarkers = user_db_service.get_user_biomarkers_by_category(user_id)
     if not biomarkers:
         raise HTTPException(status_code=404, detail=f"No biomarkers found for '{user_id}'")
     
-    # Get translation function
-    t = get_translator(request)
+    # Translate biomarker categories, names and statuses with one catalog lookup
+    category_keys = {category: f"health.categories.{category}" for category in biomarkers}
+    name_keys = {}
+    status_keys = {}
+    for markers in biomarkers.values():
+        for marker in markers:
+            if 'name' in marker:
+                biomarker_key = marker['name'].lower().replace(' ', '').replace('-', '')
+                name_keys[marker['name']] = f"health.biomarkers.{biomarker_key}"
+            if 'status' in marker:
+                status_keys[marker['status']] = f"health.status.{marker['status'].lower()}"
+    
+    keys = list({*category_keys.values(), *name_keys.values(), *status_keys.values()})
+    translations = dict(zip(keys, get_batch_translator(request)(keys)))
     
-    # Translate biomarker categories and names
     translated_biomarkers = {}
     for category, markers in biomarkers.items():
-        translated_category = t(f"health.categories.{category}")
+        translated_category = translations[category_keys[category]]
         translated_markers = []
         
         for marker in markers:
             translated_marker = marker.copy()
             # Translate biomarker name if it has a translation key
             if 'name' in marker:
-                biomarker_key = marker['name'].lower().replace(' ', '').replace('-', '')
-                translated_name = t(f"health.biomarkers.{biomarker_key}")
-                if translated_name != f"health.biomarkers.{biomarker_key}":  # Translation found
-                    translated_marker['name'] = translated_name
+                key = name_keys[marker['name']]
+                if translations[key] != key:  # Translation found
+                    translated_marker['name'] = translations[key]
             
             # Translate status
             if 'status' in marker:
-                status_key = marker['status'].lower()
-                translated_status = t(f"health.status.{status_key}")
-                if translated_status != f"health.status.{status_key}":  # Translation found
-                    translated_marker['status_label'] = translated_status
+                key = status_keys[marker['status']]
+                if translations[key] != key:  # Translation found
+                    translated_marker['status_label'] = translations[key]
             
             translated_markers.append(translated_marker)
         
@@ -72,14 +95,14 @@ async def get_user_biomarkers(user_id: str, request: Request):
 
 
 @router.get("/users/{user_id}/medical-history")
-async def get_user_medical_history(user_id: str):
+def get_user_medical_history(user_id: str, user_db_service: UserDBService = Depends(get_user_db_service)):
     """Get user medical history."""
     history = user_db_service.get_user_medical_history(user_id)
     return {"user_id": user_id, "medical_history": history}
 
 
 @router.get("/users/{user_id}/full")
-async def get_user_full_data(user_id: str):
+def get_user_full_data(user_id: str, user_db_service: UserDBService = Depends(get_user_db_service)):
     """Get complete user data from database."""
     data = user_db_service.get_user_full_data(user_id)
     if not data:
@@ -88,7 +111,7 @@ async def get_user_full_data(user_id: str):
 
 
 @router.get("/users/{user_id}/routines")
-async def get_user_routines(user_id: str):
+def get_user_routines(user_id: str):
     """Get daily and weekly routines for user (auto-computed)."""
     computed = digital_twin_db.get_computed_data(user_id)
     if not computed:
@@ -104,7 +127,7 @@ async def get_user_routines(user_id: str):
 
 
 @router.get("/users/{user_id}/health-scores")
-async def get_user_health_scores(user_id: str):
+def get_user_health_scores(user_id: str):
     """Get computed health scores for user."""
     computed = digital_twin_db.get_computed_data(user_id)
     if not computed or 'health_scores' not in computed:
@@ -118,7 +141,7 @@ async def get_user_health_scores(user_id: str):
 
 
 @router.post("/users/{user_id}/recompute")
-async def recompute_user_data(user_id: str):
+def recompute_user_data(user_id: str):
     """Force recomputation of all derived data for user."""
-    result = digital_twin_db.compute_derived_data(user_id)
+    result = digital_twin_db.compute_derived_data(user_id, force=True)
     return {"user_id": user_id, "recomputed": True, "summary": {k: len(v) if isinstance(v, list) else 'computed' for k, v in result.items()}}
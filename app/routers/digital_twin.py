@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional
 from app.models.digital_twin import DigitalTwin, FieldState
 from app.storage.digital_twins import digital_twin_storage
 from app.services.digital_twin_db import digital_twin_db
+from app.services.twin_summary_cache import twin_summary_cache
 
 router = APIRouter(prefix="/api/digital-twin", tags=["digital-twin"])
 
@@ -56,6 +57,7 @@ async def create_digital_twin(user_id: str, metadata: Dict[str, Any] = None):
     
     digital_twin = DigitalTwin(user_id=user_id, metadata=metadata or {})
     digital_twin_storage.set(user_id, digital_twin)
+    twin_summary_cache.invalidate(user_id)
     return {"message": "Digital twin created successfully", "user_id": user_id}
 
 
@@ -69,20 +71,16 @@ async def add_health_data(
     metadata: Dict[str, Any] = None
 ):
     """Add health data to a user's digital twin"""
-    digital_twin = digital_twin_storage.get(user_id)
-    if not digital_twin:
-        # Auto-create digital twin if it doesn't exist
-        digital_twin = DigitalTwin(user_id=user_id)
-    
-    digital_twin.set_value(domain, field, value, unit=unit, metadata=metadata)
-    digital_twin_storage.set(user_id, digital_twin)
+    # Auto-creates the digital twin if it doesn't exist
+    digital_twin_storage.add_value(user_id, domain, field, value, unit=unit, metadata=metadata)
+    twin_summary_cache.invalidate(user_id)
     return {"message": "Health data added successfully"}
 
 
 @router.get("/users/{user_id}/data/{domain}/{field}")
 async def get_health_data(user_id: str, domain: str, field: str, latest: bool = True):
     """Get health data from a user's digital twin"""
-    digital_twin = digital_twin_storage.get(user_id)
+    digital_twin = digital_twin_storage.get(user_id, domains=[domain])
     if not digital_twin:
         raise HTTPException(status_code=404, detail="Digital twin not found")
     
@@ -112,7 +110,7 @@ async def get_health_data(user_id: str, domain: str, field: str, latest: bool =
 @router.get("/users/{user_id}/domains/{domain}")
 async def get_domain_data(user_id: str, domain: str):
     """Get all data from a specific health domain"""
-    digital_twin = digital_twin_storage.get(user_id)
+    digital_twin = digital_twin_storage.get(user_id, domains=[domain])
     if not digital_twin:
         raise HTTPException(status_code=404, detail="Digital twin not found")
     
@@ -1,4 +1,5 @@
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 from app.models.digital_twin import DigitalTwin
 from .calculator import BiologicalAgeCalculator
 
@@ -9,11 +10,16 @@ class BiologicalAgeEngine:
     def __init__(self):
         self.calculator = BiologicalAgeCalculator()
     
-    def predict_biological_age(self, digital_twin: DigitalTwin) -> Dict[str, Any]:
-        """Predict biological age from a Digital Twin"""
+    def predict_biological_age(self, digital_twin: DigitalTwin, as_of: Optional[datetime] = None) -> Dict[str, Any]:
+        """Predict biological age from a Digital Twin, optionally from the data known at ``as_of``"""
+        def latest(field):
+            return field.latest_before(as_of) if as_of else field.get_latest_value()
+        
         # Extract user data from digital twin
-        age_data = digital_twin.get_value("demographics", "age")
-        gender_data = digital_twin.get_value("demographics", "gender")
+        age_field = digital_twin.get_field("demographics", "age")
+        gender_field = digital_twin.get_field("demographics", "gender")
+        age_data = latest(age_field) if age_field else None
+        gender_data = latest(gender_field) if gender_field else None
         
         if not age_data:
             raise ValueError(f"Age data not found in digital twin for {digital_twin.user_id}")
@@ -24,12 +30,12 @@ class BiologicalAgeEngine:
         
         if biomarkers_domain:
             for field_name, field in biomarkers_domain.fields.items():
-                if field.values:
-                    latest = field.get_latest_value()
+                point = latest(field)
+                if point:
                     biomarkers[field_name] = {
-                        'value': latest.value,
-                        'unit': latest.unit,
-                        'timestamp': latest.timestamp
+                        'value': point.value,
+                        'unit': point.unit,
+                        'timestamp': point.timestamp
                     }
         
         # Prepare data for calculation
@@ -3,13 +3,26 @@ import boto3
 from typing import AsyncIterator, Dict, Any, Optional
 from pathlib import Path
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 from .models import StreamEvent, StreamEventType
 
 
+_END_OF_STREAM = object()
+
+
 class AWSBedrockLLM:
-    """AWS Bedrock LLM integration with streaming support."""
+    """
+    AWS Bedrock LLM integration with streaming support.
+    
+    boto3 is synchronous, so Bedrock calls run on a dedicated thread pool and
+    stream chunks are handed to the event loop through a bounded asyncio.Queue.
+    At most ``max_concurrent_streams`` requests are in flight per worker; the
+    rest wait for a slot without blocking the loop.
+    """
     
     def __init__(self, config_path: str = "config/llm_config.json"):
         self.config = self._load_config(config_path)
@@ -17,6 +30,14 @@ class AWSBedrockLLM:
             'bedrock-runtime',
             region_name=self.config["llm"]["region"]
         )
+        self.max_concurrent_streams = self.config["llm"].get("max_concurrent_streams", 8)
+        self.stream_queue_size = self.config["llm"].get("stream_queue_size", 64)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_streams,
+            thread_name_prefix="bedrock-stream"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load LLM configuration."""
@@ -32,7 +53,9 @@ class AWSBedrockLLM:
                     "region": "us-east-1",
                     "max_tokens": 1000,
                     "temperature": 0.7,
-                    "streaming": True
+                    "streaming": True,
+                    "max_concurrent_streams": 8,
+                    "stream_queue_size": 64
                 }
             }
     
@@ -72,15 +95,10 @@ class AWSBedrockLLM:
                     data="Connecting to AWS Bedrock..."
                 )
                 
-                response = self.bedrock_client.invoke_model_with_response_stream(
-                    modelId=model_id,
-                    body=json.dumps(body)
-                )
-                
                 # Process streaming response
                 full_text = ""
-                for event in response['body']:
-                    chunk = json.loads(event['chunk']['bytes'])
+                async for chunk_bytes in self._stream_chunks(model_id, json.dumps(body)):
+                    chunk = json.loads(chunk_bytes)
                     
                     if "titan" in model_id:
                         if 'outputText' in chunk:
@@ -98,9 +116,6 @@ class AWSBedrockLLM:
                                 event_type=StreamEventType.TOKEN,
                                 data=token
                             )
-                    
-                    # Small delay for realistic streaming
-                    await asyncio.sleep(0.01)
                 
                 yield StreamEvent(
                     event_type=StreamEventType.COMPLETE,
@@ -108,12 +123,10 @@ class AWSBedrockLLM:
                 )
             else:
                 # Non-streaming fallback
-                response = self.bedrock_client.invoke_model(
-                    modelId=model_id,
-                    body=json.dumps(body)
-                )
-                
-                response_body = json.loads(response['body'].read())
+                async with self._stream_slots():
+                    response_body = json.loads(await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._invoke_model, model_id, json.dumps(body)
+                    ))
                 
                 if "titan" in model_id:
                     text = response_body.get('results', [{}])[0].get('outputText', '')
@@ -129,7 +142,6 @@ class AWSBedrockLLM:
                         event_type=StreamEventType.TOKEN,
                         data=word + " "
                     )
-                    await asyncio.sleep(0.05)
                 
                 yield StreamEvent(
                     event_type=StreamEventType.COMPLETE,
@@ -153,6 +165,79 @@ class AWSBedrockLLM:
                 data=f"AWS Bedrock error: {str(e)}"
             )
     
+    def _stream_slots(self) -> asyncio.Semaphore:
+        """Per-worker limit on concurrent Bedrock requests, bound to the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrent_streams)
+            self._slots_loop = loop
+        return self._slots
+    
+    def _invoke_model(self, model_id: str, body: str) -> bytes:
+        response = self.bedrock_client.invoke_model(modelId=model_id, body=body)
+        return response['body'].read()
+    
+    async def _stream_chunks(self, model_id: str, body: str) -> AsyncIterator[bytes]:
+        """
+        Yield raw chunk payloads from invoke_model_with_response_stream.
+        
+        A pool thread makes the request and iterates the event stream, putting
+        chunks on a bounded queue so a slow client applies backpressure to the
+        reader. If the consumer stops early the reader is told to stop and the
+        stream is closed.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.stream_queue_size)
+        stop = threading.Event()
+        
+        def put(item) -> None:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while not stop.is_set():
+                try:
+                    future.result(timeout=0.5)
+                    return
+                except FutureTimeoutError:
+                    continue
+            future.cancel()
+        
+        def read() -> None:
+            try:
+                response = self.bedrock_client.invoke_model_with_response_stream(
+                    modelId=model_id,
+                    body=body
+                )
+                stream = response['body']
+                try:
+                    for event in stream:
+                        if stop.is_set():
+                            break
+                        if 'chunk' in event:
+                            put(event['chunk']['bytes'])
+                finally:
+                    close = getattr(stream, 'close', None)
+                    if close is not None:
+                        close()
+                put(_END_OF_STREAM)
+            except Exception as e:
+                put(e)
+        
+        async with self._stream_slots():
+            reader = loop.run_in_executor(self._executor, read)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _END_OF_STREAM:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                stop.set()
+                # Unblock a reader waiting on a full queue, then let it finish
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.wait([reader])
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get current model configuration."""
         return {
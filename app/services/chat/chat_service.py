@@ -1,4 +1,7 @@
 from typing import AsyncIterator, Optional
+from contextlib import aclosing
+import asyncio
+import os
 import uuid
 from datetime import datetime
 
@@ -7,8 +10,12 @@ from .models import (
     StreamEvent, ChatRequest, ChatResponse
 )
 from .session_manager import SessionManager
+from .sqlite_session_manager import SQLiteSessionManager
 from .message_store import MessageStore
-from .context_builder import ContextBuilder
+from .log_message_store import LogMessageStore
+from .context_builder import ContextBuilder, chat_doc_id, chat_source
+from .context_window import ContextWindowStore
+from .retrieval import RetrievalIndex
 from .llm_orchestrator import LLMOrchestrator
 
 
@@ -16,18 +23,53 @@ class ChatService:
     """Main chat service orchestrating all chat interactions."""
     
     def __init__(self, data_dir: str = "data"):
-        self.session_manager = SessionManager(f"{data_dir}/chat")
-        self.message_store = MessageStore(f"{data_dir}/chat")
-        self.context_builder = ContextBuilder(data_dir)
+        # "json" rewrites one file per session; "log" (opt-in) appends one line per message
+        message_backend = os.getenv("CHAT_MESSAGE_BACKEND", "json")
+        if message_backend == "json":
+            self.message_store = MessageStore(f"{data_dir}/chat")
+        elif message_backend == "log":
+            self.message_store = LogMessageStore(f"{data_dir}/chat")
+        else:
+            raise ValueError(f"Unknown CHAT_MESSAGE_BACKEND {message_backend!r}; expected 'json' or 'log'")
+        # "json" rewrites sessions.json on every change; "sqlite" (opt-in) keeps sessions in an indexed table
+        session_backend = os.getenv("CHAT_SESSION_BACKEND", "json")
+        if session_backend == "json":
+            self.session_manager = SessionManager(f"{data_dir}/chat", self.message_store)
+        elif session_backend == "sqlite":
+            self.session_manager = SQLiteSessionManager(f"{data_dir}/chat", self.message_store)
+        else:
+            raise ValueError(f"Unknown CHAT_SESSION_BACKEND {session_backend!r}; expected 'json' or 'sqlite'")
         self.llm_orchestrator = LLMOrchestrator()
+        llm_config = self.llm_orchestrator.aws_llm.config
+        
+        # Health records and past turns are retrieved per message instead of listed in full
+        retrieval_config = llm_config.get("retrieval", {})
+        self.retrieval_index = None
+        if retrieval_config.get("enabled", True):
+            self.retrieval_index = RetrievalIndex(f"{data_dir}/chat/retrieval.db")
+        self.context_builder = ContextBuilder(
+            data_dir,
+            retrieval_index=self.retrieval_index,
+            retrieval_k=retrieval_config.get("top_k", 5),
+            snippet_chars=retrieval_config.get("snippet_chars", 300)
+        )
+        
+        # Conversation history budget defaults to the response's max_tokens
+        window_config = llm_config.get("context_window", {})
+        self.context_windows = ContextWindowStore(
+            f"{data_dir}/chat",
+            token_budget=window_config.get("token_budget") or llm_config["llm"]["max_tokens"],
+            max_messages=window_config.get("max_messages", 10)
+        )
     
     async def send_message(
         self, 
         user_id: str, 
         session_id: Optional[str], 
-        message: str
+        message: str,
+        language: str = "en"
     ) -> AsyncIterator[StreamEvent]:
-        """Send a message and stream the assistant's response."""
+        """Send a message and stream the assistant's response in ``language``."""
         
         # Get or create session
         if session_id:
@@ -38,6 +80,10 @@ class ChatService:
             session = await self.session_manager.create_session(user_id)
             session_id = session.session_id
         
+        # History for the prompt, before the message being answered is added
+        window = await self.context_windows.get(session_id, self.message_store.get_messages)
+        history = window.render()
+        
         # Save user message
         user_message = Message(
             session_id=session_id,
@@ -45,43 +91,65 @@ class ChatService:
             content=message
         )
         await self.message_store.save_message(user_message)
+        window = await self.context_windows.append(session_id, user_message)
+        await self._index_message(user_id, user_message)
         
-        # Update session activity and message count
-        await self.session_manager.update_session_activity(session_id)
-        await self.session_manager.increment_message_count(session_id)
-        
-        # Get recent messages for context
-        recent_messages = await self.message_store.get_recent_messages(session_id, count=10)
-        
-        # Build context
-        context = await self.context_builder.build_context(
-            user_id=user_id,
-            session_id=session_id,
-            recent_messages=recent_messages,
-            include_research=False  # Can be made configurable
-        )
-        
-        # Generate and stream response
-        assistant_message_id = str(uuid.uuid4())
-        full_response = ""
-        
-        async for event in self.llm_orchestrator.generate_response(context, message):
-            yield event
+        # Session activity, message count and preview are updated once per turn
+        saved_count = 1
+        last_content = message
+        try:
+            # Build context
+            context = await self.context_builder.build_context(
+                user_id=user_id,
+                session_id=session_id,
+                recent_messages=window.recent_messages(),
+                include_research=False  # Can be made configurable
+            )
+            context.history = history
+            context.language = language
+            
+            # Generate and stream response
+            assistant_message_id = str(uuid.uuid4())
+            full_response = ""
             
-            if event.event_type.value == "token":
-                full_response += event.data
-            elif event.event_type.value == "complete":
-                full_response = event.data
-                
-                # Save assistant response
-                assistant_message = Message(
-                    message_id=assistant_message_id,
-                    session_id=session_id,
-                    role=MessageRole.ASSISTANT,
-                    content=full_response
-                )
-                await self.message_store.save_message(assistant_message)
-                await self.session_manager.increment_message_count(session_id)
+            # Closed with this generator, so a caller that stops early stops generation
+            async with aclosing(self.llm_orchestrator.generate_response(context, message)) as events:
+                async for event in events:
+                    yield event
+                    
+                    if event.event_type.value == "token":
+                        full_response += event.data
+                    elif event.event_type.value == "complete":
+                        full_response = event.data
+                        
+                        # Save assistant response
+                        assistant_message = Message(
+                            message_id=assistant_message_id,
+                            session_id=session_id,
+                            role=MessageRole.ASSISTANT,
+                            content=full_response
+                        )
+                        if await self.message_store.save_message(assistant_message):
+                            saved_count += 1
+                            last_content = full_response
+                            await self.context_windows.append(session_id, assistant_message)
+                            await self._index_message(user_id, assistant_message)
+        finally:
+            # Shielded so a client disconnect cancelling the stream cannot drop the update
+            await asyncio.shield(
+                self.session_manager.record_message(session_id, preview=last_content, count=saved_count)
+            )
+    
+    async def _index_message(self, user_id: str, message: Message) -> None:
+        if self.retrieval_index is None:
+            return
+        try:
+            # SQLite writes; kept off the event loop
+            await asyncio.to_thread(
+                self.retrieval_index.add, user_id, chat_doc_id(message), chat_source(message.session_id), message.content
+            )
+        except Exception as e:
+            print(f"Error indexing message: {e}")
     
     async def create_session(
         self, 
@@ -138,6 +206,9 @@ class ChatService:
         # Delete messages and session
         await self.message_store.delete_session_messages(session_id)
         await self.session_manager.delete_session(session_id)
+        await self.context_windows.delete(session_id)
+        if self.retrieval_index is not None:
+            await asyncio.to_thread(self.retrieval_index.sync_source, user_id, chat_source(session_id), [])
         
         return True
     
@@ -152,6 +223,5 @@ class ChatService:
         if not session:
             return False
         
-        session.title = title
-        await self.session_manager._save_session(session)
-        return True
+        # Only the title changes, so concurrent message counts are kept
+        return await self.session_manager.update_session_fields(session_id, title=title)
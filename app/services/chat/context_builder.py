@@ -1,18 +1,37 @@
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+import asyncio
 import json
 from pathlib import Path
 
 from .models import ChatContext, Message
 from ..recommendations.digital_twin_analyzer import DigitalTwinAnalyzer
+from ..twin_summary_cache import twin_summary_cache
+from .retrieval import RetrievalIndex, record_documents
+
+
+def chat_doc_id(message: Message) -> str:
+    """Retrieval document id of a chat message."""
+    return f"chat:{message.message_id}"
+
+
+def chat_source(session_id: str) -> str:
+    """Retrieval source holding a session's messages."""
+    return f"chat:{session_id}"
 
 
 class ContextBuilder:
     """Builds context for LLM requests by combining conversation history and digital twin data."""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", retrieval_index: Optional[RetrievalIndex] = None,
+                 retrieval_k: int = 5, snippet_chars: int = 300):
         self.digital_twin_analyzer = DigitalTwinAnalyzer(data_dir)
-        self.cache = {}  # Simple in-memory cache
+        # Process-wide, invalidated when the user's data changes
+        self.cache = twin_summary_cache
+        # Without an index no documents are retrieved and the full summary goes into the prompt
+        self.retrieval_index = retrieval_index
+        self.retrieval_k = retrieval_k
+        self.snippet_chars = snippet_chars
     
     async def build_context(
         self, 
@@ -45,84 +64,9 @@ class ContextBuilder:
     
     async def _get_digital_twin_summary(self, user_id: str) -> Dict[str, Any]:
         """Get summarized digital twin data for context."""
-        cache_key = f"digital_twin_{user_id}"
-        
-        # Check cache first
-        if cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if datetime.now() - timestamp < timedelta(minutes=30):  # 30-minute cache
-                return cached_data
-        
         try:
-            # Load digital twin data
-            digital_twin = self.digital_twin_analyzer.load_user_data(user_id)
-            
-            # Create summary for LLM context
-            summary = {
-                "user_id": user_id,
-                "demographics": {
-                    "age": digital_twin.demographics.age,
-                    "sex": digital_twin.demographics.sex
-                },
-                "latest_biomarkers": {},
-                "active_conditions": [],
-                "medications": [],
-                "family_history": [],
-                "health_goals": []
-            }
-            
-            # Add latest biomarkers
-            if digital_twin.latest_biomarkers:
-                summary["latest_biomarkers"] = {
-                    "test_date": digital_twin.latest_biomarkers.test_date.isoformat(),
-                    "key_markers": {}
-                }
-                
-                # Extract key biomarkers
-                for category, markers in digital_twin.latest_biomarkers.categories.items():
-                    for marker_name, marker_value in markers.items():
-                        if marker_value.status in ["high", "low"]:  # Only abnormal values
-                            summary["latest_biomarkers"]["key_markers"][marker_name] = {
-                                "value": marker_value.value,
-                                "unit": marker_value.unit,
-                                "status": marker_value.status,
-                                "ref_range": marker_value.ref_range
-                            }
-            
-            # Add active conditions
-            for condition in digital_twin.conditions:
-                if condition.status == "active":
-                    summary["active_conditions"].append({
-                        "condition": condition.condition,
-                        "severity": getattr(condition, 'severity', None)
-                    })
-            
-            # Add current medications
-            for medication in digital_twin.medications:
-                summary["medications"].append({
-                    "name": medication.name,
-                    "dosage": medication.dosage
-                })
-            
-            # Add family history
-            for family_condition in digital_twin.family_history:
-                summary["family_history"].append({
-                    "condition": family_condition.condition,
-                    "relation": family_condition.relation
-                })
-            
-            # Add health goals
-            for goal in digital_twin.goals:
-                summary["health_goals"].append({
-                    "goal": goal.goal,
-                    "priority": goal.priority
-                })
-            
-            # Cache the summary
-            self.cache[cache_key] = (summary, datetime.now())
-            
-            return summary
-            
+            # A miss loads the twin and re-indexes its records, both blocking SQLite work
+            return await asyncio.to_thread(self.cache.get_or_build, user_id, self._build_digital_twin_summary)
         except Exception as e:
             print(f"Error building digital twin summary: {e}")
             return {
@@ -130,16 +74,107 @@ class ContextBuilder:
                 "error": "Digital twin data unavailable"
             }
     
+    def _build_digital_twin_summary(self, user_id: str) -> Dict[str, Any]:
+        """Summarize the user's digital twin for LLM context."""
+        # Load digital twin data
+        digital_twin = self.digital_twin_analyzer.load_user_data(user_id)
+        
+        # Runs only when the cached summary is stale, which is also when the records changed
+        if self.retrieval_index is not None:
+            try:
+                self.retrieval_index.sync_source(user_id, "record", record_documents(digital_twin))
+            except Exception as e:
+                print(f"Error indexing health records: {e}")
+        
+        # Create summary for LLM context
+        summary = {
+            "user_id": user_id,
+            "demographics": {
+                "age": digital_twin.demographics.age,
+                "sex": digital_twin.demographics.sex
+            },
+            "latest_biomarkers": {},
+            "active_conditions": [],
+            "medications": [],
+            "family_history": [],
+            "health_goals": []
+        }
+        
+        # Add latest biomarkers
+        if digital_twin.latest_biomarkers:
+            summary["latest_biomarkers"] = {
+                "test_date": digital_twin.latest_biomarkers.test_date.isoformat(),
+                "key_markers": {}
+            }
+            
+            # Extract key biomarkers
+            for category, markers in digital_twin.latest_biomarkers.categories.items():
+                for marker_name, marker_value in markers.items():
+                    if marker_value.status in ["high", "low"]:  # Only abnormal values
+                        summary["latest_biomarkers"]["key_markers"][marker_name] = {
+                            "value": marker_value.value,
+                            "unit": marker_value.unit,
+                            "status": marker_value.status,
+                            "ref_range": marker_value.ref_range
+                        }
+        
+        # Add active conditions
+        for condition in digital_twin.conditions:
+            if condition.status == "active":
+                summary["active_conditions"].append({
+                    "condition": condition.condition,
+                    "severity": getattr(condition, 'severity', None)
+                })
+        
+        # Add current medications
+        for medication in digital_twin.medications:
+            summary["medications"].append({
+                "name": medication.name,
+                "dosage": medication.dosage
+            })
+        
+        # Add family history
+        for family_condition in digital_twin.family_history:
+            summary["family_history"].append({
+                "condition": family_condition.condition,
+                "relation": family_condition.relation
+            })
+        
+        # Add health goals
+        for goal in digital_twin.goals:
+            summary["health_goals"].append({
+                "goal": goal.goal,
+                "priority": goal.priority
+            })
+        
+        return summary
+    
     async def _get_relevant_documents(
         self, 
         user_id: str, 
         recent_messages: List[Message]
     ) -> List[Dict[str, Any]]:
-        """Get documents relevant to the conversation."""
-        # For now, return empty list
-        # In a full implementation, this would analyze recent messages
-        # and retrieve relevant lab reports, medical documents, etc.
-        return []
+        """Top-k records and past chat turns matching the latest user message."""
+        if self.retrieval_index is None:
+            return []
+        
+        query = next((m.content for m in reversed(recent_messages) if m.role.value == "user"), "")
+        if not query:
+            return []
+        
+        try:
+            # Turns already in the prompt's history are not repeated as documents
+            return await asyncio.to_thread(
+                self.retrieval_index.search,
+                user_id,
+                query,
+                k=self.retrieval_k,
+                exclude=[chat_doc_id(m) for m in recent_messages],
+                snippet_chars=self.snippet_chars
+            )
+        except Exception as e:
+            print(f"Error retrieving documents: {e}")
+            return []
     
     async def _build_research_context(self, recent_messages: List[Message]) -> str:
         """Build research context from recent messages."""
@@ -181,9 +216,16 @@ class ContextBuilder:
             condition_names = [c["condition"] for c in conditions]
             context_parts.append(f"Active conditions: {', '.join(condition_names)}")
         
+        # Retrieved health records replace the full biomarker and family history
+        # listings; past chat turns alone do not
+        records_retrieved = any(doc.get("source") == "record" for doc in context.relevant_documents)
+        if context.relevant_documents:
+            context_parts.append("Relevant records:")
+            context_parts.extend(f"- {doc['text']}" for doc in context.relevant_documents)
+        
         # Key biomarkers
         biomarkers = context.digital_twin_summary.get("latest_biomarkers", {})
-        if biomarkers and biomarkers.get("key_markers"):
+        if biomarkers and biomarkers.get("key_markers") and not records_retrieved:
             marker_info = []
             for marker, data in biomarkers["key_markers"].items():
                 marker_info.append(f"{marker}: {data['value']} {data['unit']} ({data['status']})")
@@ -199,7 +241,7 @@ class ContextBuilder:
         
         # Family history
         family_history = context.digital_twin_summary.get("family_history", [])
-        if family_history:
+        if family_history and not records_retrieved:
             family_conditions = [f"{fh['condition']} ({fh['relation']})" for fh in family_history]
             context_parts.append(f"Family history: {', '.join(family_conditions)}")
         
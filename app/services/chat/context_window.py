@@ -0,0 +1,257 @@
+"""
+Rolling, token-budgeted conversation context per chat session.
+
+A ContextWindow keeps the most recent messages verbatim and folds older ones
+into a short summary, one line per message. Both parts are bounded by a token
+budget, so rendering the history for a prompt costs the same on the fifth
+turn as on the five-hundredth. Windows are updated as messages arrive and are
+persisted under ``<data_dir>/context/<session_id>.json``, with the same
+per-session lock files and atomic writes as the message store.
+"""
+
+from typing import Any, Callable, Awaitable, Deque, Dict, List, Optional
+from collections import deque
+import asyncio
+import json
+import re
+from pathlib import Path
+
+from app.storage.cache import LRUCache
+
+from .locking import InterProcessLock, KeyedLocks, async_locks, atomic_write_json
+from .models import Message, MessageRole
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+SUMMARY_LINE_CHARS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _role_label(role: str) -> str:
+    return "User" if role == MessageRole.USER.value else "Assistant"
+
+
+def _summarize(role: str, content: str) -> str:
+    """One line standing in for an evicted message: its first sentence, shortened."""
+    first = _SENTENCE_END.split(content.strip(), maxsplit=1)[0].replace("\n", " ")
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS].rstrip() + "..."
+    return f"{_role_label(role)}: {first}"
+
+
+class ContextWindow:
+    """Last ``max_messages`` messages plus a summary of older ones, within ``token_budget``."""
+
+    def __init__(self, session_id: str, token_budget: int = 1000, max_messages: int = 10,
+                 summary_share: float = 0.25):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.summary_budget = int(token_budget * summary_share)
+        self.messages: Deque[Dict[str, Any]] = deque()  # {message_id, role, content, tokens}
+        self.summary: Deque[Dict[str, Any]] = deque()  # {text, tokens}
+        self.message_tokens = 0
+        self.summary_tokens = 0
+        self.omitted = 0  # summary lines dropped to stay within budget
+        self.message_count = 0
+        self._rendered: Optional[str] = None
+
+    def add(self, message: Message) -> None:
+        content = message.content
+        entry = {
+            'message_id': message.message_id,
+            'role': message.role.value,
+            'content': content,
+            'tokens': estimate_tokens(content)
+        }
+        self.messages.append(entry)
+        self.message_tokens += entry['tokens']
+        self.message_count += 1
+
+        # Keep at least the newest message verbatim, even if it alone is over budget
+        recent_budget = self.token_budget - self.summary_budget
+        while len(self.messages) > 1 and (
+            len(self.messages) > self.max_messages or self.message_tokens > recent_budget
+        ):
+            evicted = self.messages.popleft()
+            self.message_tokens -= evicted['tokens']
+            self._fold(evicted)
+        self._rendered = None
+
+    def _fold(self, entry: Dict[str, Any]) -> None:
+        text = _summarize(entry['role'], entry['content'])
+        line = {'text': text, 'tokens': estimate_tokens(text)}
+        self.summary.append(line)
+        self.summary_tokens += line['tokens']
+        while self.summary and self.summary_tokens > self.summary_budget:
+            dropped = self.summary.popleft()
+            self.summary_tokens -= dropped['tokens']
+            self.omitted += 1
+
+    def render(self) -> str:
+        """History section of the prompt; cached until the next message arrives."""
+        if self._rendered is None:
+            parts = []
+            if self.summary or self.omitted:
+                parts.append("\nEARLIER IN THIS CONVERSATION (summary):")
+                if self.omitted:
+                    parts.append(f"- ({self.omitted} earlier messages omitted)")
+                parts.extend(f"- {line['text']}" for line in self.summary)
+            if self.messages:
+                parts.append("\nCONVERSATION HISTORY:")
+                parts.extend(f"{_role_label(m['role'])}: {m['content']}" for m in self.messages)
+            self._rendered = "\n".join(parts)
+        return self._rendered
+
+    def recent_messages(self) -> List[Message]:
+        return [
+            Message(message_id=m['message_id'], session_id=self.session_id,
+                    role=MessageRole(m['role']), content=m['content'])
+            for m in self.messages
+        ]
+
+    @property
+    def tokens(self) -> int:
+        return self.message_tokens + self.summary_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'session_id': self.session_id,
+            'token_budget': self.token_budget,
+            'max_messages': self.max_messages,
+            'message_count': self.message_count,
+            'omitted': self.omitted,
+            'messages': list(self.messages),
+            'summary': list(self.summary)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], token_budget: int, max_messages: int) -> "ContextWindow":
+        window = cls(data['session_id'], token_budget, max_messages)
+        window.message_count = data.get('message_count', 0)
+        window.omitted = data.get('omitted', 0)
+        window.summary = deque(data.get('summary', []))
+        window.summary_tokens = sum(line['tokens'] for line in window.summary)
+        window.messages = deque(data.get('messages', []))
+        window.message_tokens = sum(m['tokens'] for m in window.messages)
+        return window
+
+
+class ContextWindowStore:
+    """
+    Loads, updates and persists context windows, keeping recently used ones in memory.
+
+    Several workers may serve the same session, so a cached window is only
+    used while the file it was read from is unchanged (same inode, mtime and
+    size). Appends re-read the window under the session's lock file and
+    replace the file atomically (see locking.py).
+    """
+
+    def __init__(self, data_dir: str = "data/chat", token_budget: int = 1000, max_messages: int = 10,
+                 max_cached: int = 1000):
+        self.context_dir = Path(data_dir) / "context"
+        self.context_dir.mkdir(parents=True, exist_ok=True)
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self._windows = LRUCache(max_entries=max_cached)  # session_id -> (window, file signature)
+        self._file_locks = KeyedLocks(
+            lambda session_id: InterProcessLock(self.context_dir / ".locks" / f"{session_id}.lock")
+        )
+        self._write_locks = async_locks()
+
+    async def get(
+        self,
+        session_id: str,
+        load_messages: Optional[Callable[[str], Awaitable[List[Message]]]] = None
+    ) -> ContextWindow:
+        """
+        The session's window. Sessions without a saved window (created before
+        windows existed) are rebuilt once from ``load_messages``.
+        """
+        window = self._load(session_id)
+        if window is not None:
+            return window
+
+        window = ContextWindow(session_id, self.token_budget, self.max_messages)
+        if load_messages is not None:
+            for message in await load_messages(session_id):
+                window.add(message)
+            if window.message_count:
+                async with self._write_locks(session_id):
+                    return await asyncio.to_thread(self._save_rebuilt, window)
+        return window
+
+    async def append(self, session_id: str, message: Message) -> ContextWindow:
+        async with self._write_locks(session_id):
+            return await asyncio.to_thread(self._append_locked, session_id, message)
+
+    async def delete(self, session_id: str) -> None:
+        async with self._write_locks(session_id):
+            await asyncio.to_thread(self._delete_locked, session_id)
+
+    def _delete_locked(self, session_id: str) -> None:
+        with self._file_locks(session_id):
+            self._windows.invalidate(session_id)
+            path = self._path(session_id)
+            if path.exists():
+                path.unlink()
+
+    def _append_locked(self, session_id: str, message: Message) -> ContextWindow:
+        with self._file_locks(session_id):
+            window = self._load(session_id) or ContextWindow(session_id, self.token_budget, self.max_messages)
+            window.add(message)
+            self._save(window)
+            return window
+
+    def _save_rebuilt(self, window: ContextWindow) -> ContextWindow:
+        with self._file_locks(window.session_id):
+            # Another worker may have rebuilt or appended in the meantime
+            current = self._load(window.session_id)
+            if current is not None:
+                return current
+            self._save(window)
+            return window
+
+    def _path(self, session_id: str) -> Path:
+        return self.context_dir / f"{session_id}.json"
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[tuple]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, session_id: str) -> Optional[ContextWindow]:
+        """The saved window, from memory while its file is unchanged; None if there is none."""
+        path = self._path(session_id)
+        signature = self._signature(path)
+        if signature is None:
+            self._windows.invalidate(session_id)
+            return None
+
+        cached = self._windows.get(session_id)
+        if cached is not None and cached[1] == signature:
+            return cached[0]
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                window = ContextWindow.from_dict(json.load(f), self.token_budget, self.max_messages)
+        except Exception as e:
+            print(f"Error loading context window: {e}")
+            return None
+        self._windows.put(session_id, (window, signature))
+        return window
+
+    def _save(self, window: ContextWindow) -> None:
+        try:
+            path = self._path(window.session_id)
+            atomic_write_json(path, window.to_dict(), ensure_ascii=False)
+            self._windows.put(window.session_id, (window, self._signature(path)))
+        except Exception as e:
+            self._windows.invalidate(window.session_id)
+            print(f"Error saving context window: {e}")
@@ -1,18 +1,35 @@
 from typing import AsyncIterator, List, Optional
+from contextlib import aclosing
 import asyncio
 import json
 from datetime import datetime
 
 from .models import ChatContext, Message, StreamEvent, StreamEventType
 from .aws_bedrock_llm import AWSBedrockLLM
+from .response_cache import ResponseCache, shared_response_cache, summary_hash
+from .context_builder import ContextBuilder
 
 
 class LLMOrchestrator:
     """Orchestrates LLM interactions with AWS Bedrock streaming support."""
     
-    def __init__(self, config_path: str = "config/llm_config.json"):
+    # Reply languages other than English; unknown codes fall back to English
+    REPLY_LANGUAGES = {
+        'hi': 'Hindi',
+        'ta': 'Tamil'
+    }
+    
+    def __init__(self, config_path: str = "config/llm_config.json", response_cache: Optional[ResponseCache] = None):
         self.aws_llm = AWSBedrockLLM(config_path)
         self.system_prompt = self._build_system_prompt()
+        
+        # Shared by every orchestrator in the process unless one is passed in
+        cache_config = self.aws_llm.config.get("response_cache", {})
+        if response_cache is None and cache_config.get("enabled", True):
+            response_cache = shared_response_cache(cache_config)
+        self.response_cache = response_cache
+        self._context_builder: Optional[ContextBuilder] = None
+        self._formatted_context = {}  # (summary hash, research context) -> formatted text
     
     async def generate_response(
         self, 
@@ -26,8 +43,20 @@ class LLMOrchestrator:
             prompt = self._build_prompt(context, user_message)
             
             # Generate response using AWS Bedrock
-            async for event in self.aws_llm.generate_streaming_response(prompt):
-                yield event
+            if self.response_cache is None:
+                stream = self.aws_llm.generate_streaming_response(prompt)
+            else:
+                llm_config = self.aws_llm.config["llm"]
+                key = ResponseCache.make_key(
+                    prompt, llm_config["model_id"], llm_config["temperature"], context.digital_twin_summary
+                )
+                stream = self.response_cache.stream(
+                    key, lambda: self.aws_llm.generate_streaming_response(prompt)
+                )
+            
+            async with aclosing(stream):
+                async for event in stream:
+                    yield event
             
         except Exception as e:
             yield StreamEvent(
@@ -60,12 +89,22 @@ Remember: You have access to the user's health data, so personalize your respons
             prompt_parts.append(f"\nUSER HEALTH CONTEXT:\n{context_str}")
         
         # Add conversation history
-        if context.recent_messages:
+        if context.history is not None:
+            if context.history:
+                prompt_parts.append(context.history)
+        elif context.recent_messages:
             prompt_parts.append("\nCONVERSATION HISTORY:")
             for message in context.recent_messages[-5:]:  # Last 5 messages
                 role = "User" if message.role.value == "user" else "Assistant"
                 prompt_parts.append(f"{role}: {message.content}")
         
+        # Part of the prompt, so replies in different languages are cached separately
+        reply_language = self.REPLY_LANGUAGES.get(context.language)
+        if reply_language:
+            prompt_parts.append(
+                f"\nRespond in {reply_language}. Keep biomarker names, values and units as they appear above."
+            )
+        
         # Add current user message
         prompt_parts.append(f"\nUser: {user_message}")
         prompt_parts.append("\nAssistant:")
@@ -73,10 +112,21 @@ Remember: You have access to the user's health data, so personalize your respons
         return "\n".join(prompt_parts)
     
     def _format_context(self, context: ChatContext) -> str:
-        """Format context for the prompt."""
-        from .context_builder import ContextBuilder
-        builder = ContextBuilder()
-        return builder.format_context_for_llm(context)
+        """Format context for the prompt, reusing the text while its inputs are unchanged."""
+        key = (
+            summary_hash(context.digital_twin_summary),
+            context.research_context,
+            tuple((doc.get('doc_id'), doc.get('text')) for doc in context.relevant_documents)
+        )
+        formatted = self._formatted_context.get(key)
+        if formatted is None:
+            if self._context_builder is None:
+                self._context_builder = ContextBuilder()
+            formatted = self._context_builder.format_context_for_llm(context)
+            if len(self._formatted_context) >= 256:
+                self._formatted_context.clear()
+            self._formatted_context[key] = formatted
+        return formatted
     
     def get_model_info(self) -> dict:
         """Get current model configuration."""
@@ -85,3 +135,9 @@ Remember: You have access to the user's health data, so personalize your respons
     def update_model_config(self, **kwargs) -> None:
         """Update model configuration."""
         self.aws_llm.update_model_config(**kwargs)
+    
+    def get_cache_stats(self) -> dict:
+        """Response cache counters, including hit rate and coalesced requests."""
+        if self.response_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.stats()}
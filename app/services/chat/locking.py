@@ -0,0 +1,109 @@
+"""
+Locking and atomic-write helpers for file-backed chat storage.
+
+Several uvicorn workers may write the same chat files. ``InterProcessLock``
+serialises writers across threads and processes with an exclusive
+``flock`` on a lock file. ``atomic_write_json`` replaces a file with a
+temp-file-plus-rename, so readers never see a half-written document.
+``KeyedLocks`` hands out one lock object per key (session id).
+"""
+
+from typing import Any, Callable, Dict, Generic, TypeVar
+import asyncio
+import json
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms fall back to in-process locking
+    fcntl = None
+
+T = TypeVar("T")
+
+
+class InterProcessLock:
+    """
+    Reentrant lock held across threads (RLock) and processes (flock).
+
+    The lock file is opened and flocked by the outermost acquisition in this
+    process and closed again on the matching release, so idle sessions do
+    not hold file descriptors. Lock files are left in place: removing one
+    while another process waits on it would let two writers in.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            # Closing the descriptor drops the flock
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self) -> "InterProcessLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class KeyedLocks(Generic[T]):
+    """One lock per key, created on first use by ``factory(key)``."""
+
+    def __init__(self, factory: Callable[[str], T]):
+        self._factory = factory
+        self._locks: Dict[str, T] = {}
+        self._guard = threading.Lock()
+
+    def __call__(self, key: str) -> T:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = self._factory(key)
+            return lock
+
+
+def async_locks() -> KeyedLocks[asyncio.Lock]:
+    """Per-key asyncio locks; coroutines for the same key queue without blocking the loop."""
+    return KeyedLocks(lambda key: asyncio.Lock())
+
+
+def atomic_write_json(path: Path, data: Any, **dump_kwargs) -> None:
+    """Write JSON to a temp file in the same directory, fsync it and rename it over ``path``."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
@@ -0,0 +1,337 @@
+"""
+Append-only segmented log storage for chat messages.
+
+Each session gets a directory under ``<data_dir>/log/`` holding numbered
+segments of JSON lines (``seg_000000.jsonl``), each with a sidecar ``.idx``
+file of 8-byte byte offsets, one per message. Appending a message writes one
+line and one offset; reading a range seeks straight to its first line.
+Content updates go to ``patches.jsonl`` and are applied on read until the
+session is compacted; the session holding a message is found through the
+``message_index.db`` sidecar (see message_index.py).
+Writers in every worker process serialise on a per-session lock file
+(see locking.py).
+
+Compaction tool:
+    python -m app.services.chat.log_message_store [--data-dir data/chat] [--session ID] [--rebuild-index]
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+from array import array
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+from pathlib import Path
+
+from .locking import InterProcessLock, KeyedLocks
+from .message_store import MessageStore
+from .models import Message
+
+OFFSET_BYTES = 8
+
+
+class LogMessageStore(MessageStore):
+    """MessageStore backed by per-session segmented JSONL logs."""
+
+    def __init__(self, data_dir: str = "data/chat", segment_size: int = 1000):
+        self.log_dir = Path(data_dir) / "log"
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        # Appends from every worker process go through the session's lock file
+        self._locks = KeyedLocks(lambda session_id: InterProcessLock(self.log_dir / ".locks" / f"{session_id}.lock"))
+        super().__init__(data_dir)
+
+    def _index_path(self) -> Path:
+        return self.log_dir / "message_index.db"
+
+    def rebuild_index(self) -> None:
+        """Re-create the message_id index from the logs, importing legacy session files."""
+        self.index.clear()
+        for session_id in self.session_ids():
+            session_dir = self._session_dir(session_id)
+            self.index.add_many(
+                (json.loads(line)['message_id'], session_id, position)
+                for position, line in enumerate(self._iter_lines(session_dir, 0, self._count(session_dir)))
+            )
+
+    async def save_message(self, message: Message) -> bool:
+        """Append a message to its session log."""
+        try:
+            # Same-process saves queue on the event loop; the lock file is waited on in a thread
+            async with self._write_locks(message.session_id):
+                await asyncio.to_thread(self._save_locked, message)
+            return True
+        except Exception as e:
+            print(f"Error saving message: {e}")
+            return False
+
+    def _save_locked(self, message: Message) -> None:
+        with self._lock(message.session_id):
+            session_dir = self._session_dir(message.session_id)
+            position = self._count(session_dir)
+            self._append(session_dir, self._encode(message))
+            self.index.add(message.message_id, message.session_id, position)
+
+    async def get_messages(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Message]:
+        """Retrieve messages for a session in the order they were saved."""
+        try:
+            # The first read of a legacy session imports it under the lock file, so read in a thread
+            return await asyncio.to_thread(self._get_messages, session_id, limit, offset)
+        except Exception as e:
+            print(f"Error retrieving messages: {e}")
+            return []
+
+    def _get_messages(self, session_id: str, limit: Optional[int], offset: int) -> List[Message]:
+        session_dir = self._session_dir(session_id)
+        total = self._count(session_dir)
+        stop = total if not limit else min(total, offset + limit)
+        return self._read(session_dir, offset, stop)
+
+    async def get_recent_messages(self, session_id: str, count: int = 10) -> List[Message]:
+        """Get the most recent messages from a session without reading older segments."""
+        try:
+            return await asyncio.to_thread(self._get_recent_messages, session_id, count)
+        except Exception as e:
+            print(f"Error retrieving messages: {e}")
+            return []
+
+    def _get_recent_messages(self, session_id: str, count: int) -> List[Message]:
+        session_dir = self._session_dir(session_id)
+        total = self._count(session_dir)
+        return self._read(session_dir, max(0, total - count), total)
+
+    async def delete_session_messages(self, session_id: str) -> bool:
+        """Delete all messages for a session."""
+        try:
+            async with self._write_locks(session_id):
+                await asyncio.to_thread(self._delete_locked, session_id)
+            return True
+        except Exception as e:
+            print(f"Error deleting session messages: {e}")
+            return False
+
+    def _delete_locked(self, session_id: str) -> None:
+        with self._lock(session_id):
+            shutil.rmtree(self.log_dir / session_id, ignore_errors=True)
+            legacy_file = self.data_dir / f"session_{session_id}.json"
+            if legacy_file.exists():
+                legacy_file.unlink()
+            self.index.remove_session(session_id)
+
+    async def update_message(self, message_id: str, content: str) -> bool:
+        """Update message content by appending a patch to its session."""
+        try:
+            location = self.index.lookup(message_id)
+            if location is None:
+                return False
+            session_id = location[0]
+
+            patch = {'message_id': message_id, 'content': content, 'timestamp': datetime.now().isoformat()}
+            async with self._write_locks(session_id):
+                await asyncio.to_thread(self._patch_locked, session_id, patch)
+            return True
+        except Exception as e:
+            print(f"Error updating message: {e}")
+            return False
+
+    def _patch_locked(self, session_id: str, patch: Dict) -> None:
+        with self._lock(session_id):
+            with open(self.log_dir / session_id / "patches.jsonl", 'a', encoding='utf-8') as f:
+                f.write(json.dumps(patch, ensure_ascii=False) + "\n")
+
+    def compact(self, session_id: str) -> int:
+        """
+        Rewrite a session's log into full segments with patches applied and any
+        unindexed (torn) lines dropped. Returns the number of messages kept.
+        """
+        with self._lock(session_id):
+            session_dir = self._session_dir(session_id)
+            if not session_dir.exists():
+                return 0
+
+            patches = self._load_patches(session_dir)
+            tmp_dir = self.log_dir / f".{session_id}.compact"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir()
+
+            kept = 0
+            for line in self._iter_lines(session_dir, 0, self._count(session_dir)):
+                data = json.loads(line)
+                patch = patches.get(data.get('message_id'))
+                if patch:
+                    data.update(patch)
+                self._append(tmp_dir, json.dumps(data, ensure_ascii=False))
+                kept += 1
+
+            old_dir = self.log_dir / f".{session_id}.old"
+            session_dir.rename(old_dir)
+            tmp_dir.rename(session_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            return kept
+
+    def session_ids(self) -> List[str]:
+        """Sessions stored in the log, including legacy JSON files not yet imported."""
+        ids = {p.name for p in self.log_dir.iterdir() if p.is_dir() and not p.name.startswith('.')}
+        ids.update(p.stem[len("session_"):] for p in self.data_dir.glob("session_*.json"))
+        return sorted(ids)
+
+    # Layout helpers
+
+    def _lock(self, session_id: str) -> InterProcessLock:
+        return self._locks(session_id)
+
+    def _session_dir(self, session_id: str) -> Path:
+        """The session's log directory, importing a legacy JSON session file on first use."""
+        session_dir = self.log_dir / session_id
+        legacy_file = self.data_dir / f"session_{session_id}.json"
+        if not session_dir.exists() and legacy_file.exists():
+            with self._lock(session_id):
+                if not session_dir.exists():
+                    self._import_legacy(legacy_file, session_dir)
+        return session_dir
+
+    def _import_legacy(self, legacy_file: Path, session_dir: Path) -> None:
+        with open(legacy_file, 'r') as f:
+            messages = json.load(f).get('messages', [])
+        messages.sort(key=lambda m: m.get('timestamp', ''))
+
+        tmp_dir = session_dir.with_name(f".{session_dir.name}.import")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for message in messages:
+            self._append(tmp_dir, json.dumps(message, ensure_ascii=False))
+        # The legacy file is left in place; once the log directory exists it takes precedence
+        tmp_dir.rename(session_dir)
+        self.index.add_many(
+            (message['message_id'], session_dir.name, position)
+            for position, message in enumerate(messages)
+            if message.get('message_id')
+        )
+
+    @staticmethod
+    def _segment_paths(session_dir: Path, segment: int) -> Tuple[Path, Path]:
+        return session_dir / f"seg_{segment:06d}.jsonl", session_dir / f"seg_{segment:06d}.idx"
+
+    def _segments(self, session_dir: Path) -> int:
+        """Number of segments in a session (the last one may be partially filled)."""
+        segment = 0
+        while self._segment_paths(session_dir, segment)[1].exists():
+            segment += 1
+        return segment
+
+    def _segment_size(self, session_dir: Path, segments: int) -> int:
+        """Segment size a session was written with: the length of its first full segment."""
+        if segments > 1:
+            return self._segment_paths(session_dir, 0)[1].stat().st_size // OFFSET_BYTES
+        return self.segment_size
+
+    def _count(self, session_dir: Path) -> int:
+        if not session_dir.exists():
+            return 0
+        segments = self._segments(session_dir)
+        if not segments:
+            return 0
+        last_index = self._segment_paths(session_dir, segments - 1)[1]
+        return (segments - 1) * self._segment_size(session_dir, segments) + last_index.stat().st_size // OFFSET_BYTES
+
+    def _append(self, session_dir: Path, line: str) -> None:
+        """Write one message line, then its offset; a line without an offset is ignored by readers."""
+        session_dir.mkdir(parents=True, exist_ok=True)
+        segments = self._segments(session_dir)
+        segment = max(segments - 1, 0)
+        index_path = self._segment_paths(session_dir, segment)[1]
+        if segments and index_path.stat().st_size // OFFSET_BYTES >= self._segment_size(session_dir, segments):
+            segment += 1
+        log_path, index_path = self._segment_paths(session_dir, segment)
+
+        with open(log_path, 'ab') as log:
+            position = log.seek(0, 2)
+            log.write(line.encode('utf-8') + b"\n")
+        with open(index_path, 'ab') as index:
+            index.write(position.to_bytes(OFFSET_BYTES, 'little'))
+
+    def _iter_lines(self, session_dir: Path, start: int, stop: int) -> Iterator[bytes]:
+        """Raw lines for messages [start, stop), seeking to the first one."""
+        segment_size = self._segment_size(session_dir, self._segments(session_dir))
+        position = start
+        while position < stop:
+            segment, first = divmod(position, segment_size)
+            count = min(stop - position, segment_size - first)
+            log_path, index_path = self._segment_paths(session_dir, segment)
+
+            offsets = array('Q')
+            with open(index_path, 'rb') as index:
+                index.seek(first * OFFSET_BYTES)
+                offsets.frombytes(index.read(count * OFFSET_BYTES))
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+
+            with open(log_path, 'rb') as log:
+                log.seek(offsets[0])
+                for offset in offsets:
+                    # Lines are normally contiguous; torn writes leave unindexed gaps
+                    if log.tell() != offset:
+                        log.seek(offset)
+                    yield log.readline()
+            position += count
+
+    def _read(self, session_dir: Path, start: int, stop: int) -> List[Message]:
+        if start >= stop:
+            return []
+        patches = self._load_patches(session_dir)
+        messages = []
+        for line in self._iter_lines(session_dir, start, stop):
+            data = json.loads(line)
+            patch = patches.get(data.get('message_id'))
+            if patch:
+                data.update(patch)
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+            messages.append(Message(**data))
+        return messages
+
+    @staticmethod
+    def _load_patches(session_dir: Path) -> Dict[str, dict]:
+        patches_file = session_dir / "patches.jsonl"
+        if not patches_file.exists():
+            return {}
+        patches = {}
+        with open(patches_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    patch = json.loads(line)
+                    patches[patch.pop('message_id')] = patch
+        return patches
+
+    @staticmethod
+    def _encode(message: Message) -> str:
+        message_dict = message.dict()
+        message_dict['timestamp'] = message.timestamp.isoformat()
+        return json.dumps(message_dict, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact chat message logs (also imports legacy session files)")
+    parser.add_argument("--data-dir", default="data/chat")
+    parser.add_argument("--session", action="append", help="Session ID to compact (default: all)")
+    parser.add_argument("--segment-size", type=int, default=1000)
+    parser.add_argument("--rebuild-index", action="store_true", help="Also rebuild the message_id index")
+    args = parser.parse_args()
+
+    store = LogMessageStore(args.data_dir, segment_size=args.segment_size)
+    for session_id in args.session or store.session_ids():
+        kept = store.compact(session_id)
+        print(f"{session_id}: {kept} messages")
+    if args.rebuild_index:
+        store.rebuild_index()
+        print("Rebuilt message index")
+
+
+if __name__ == "__main__":
+    main()
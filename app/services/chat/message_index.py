@@ -0,0 +1,64 @@
+"""
+SQLite sidecar index from message_id to (session_id, position).
+
+Lets message stores find a single message without opening every session.
+"""
+
+from typing import Iterable, Optional, Tuple
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class MessageIndex:
+    """Persistent message_id -> (session_id, position) map."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.created = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS message_index (
+                message_id TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                position INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_message_index_session ON message_index(session_id)")
+        self._conn.commit()
+
+    def add(self, message_id: str, session_id: str, position: int) -> None:
+        self.add_many([(message_id, session_id, position)])
+
+    def add_many(self, rows: Iterable[Tuple[str, str, int]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO message_index (message_id, session_id, position) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def lookup(self, message_id: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, position FROM message_index WHERE message_id = ?",
+                (message_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def remove_session(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM message_index WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM message_index")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,24 +1,85 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import json
 import asyncio
 from pathlib import Path
 
 from .models import Message, ChatSession, MessageRole
+from .message_index import MessageIndex
+from .locking import InterProcessLock, KeyedLocks, async_locks, atomic_write_json
+
+
+class _PendingWrite:
+    """Messages queued for one session file rewrite."""
+    
+    def __init__(self):
+        self.messages: List[Message] = []
+        self.error: Optional[Exception] = None
 
 
 class MessageStore:
-    """Handles persistence of chat messages and sessions."""
+    """
+    Handles persistence of chat messages and sessions.
+    
+    Each session file is rewritten atomically under a per-session lock file,
+    so concurrent workers cannot interleave writes or lose messages. Within a
+    process, saves for a session queue on an asyncio lock and every save that
+    queued while a rewrite was running is written by the next single rewrite.
+    """
     
     def __init__(self, data_dir: str = "data/chat"):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._file_locks = KeyedLocks(
+            lambda session_id: InterProcessLock(self.data_dir / ".locks" / f"session_{session_id}.lock")
+        )
+        self._write_locks = async_locks()
+        self._pending: Dict[str, _PendingWrite] = {}
+        self.index = MessageIndex(self._index_path())
+        if self.index.created:
+            self.rebuild_index()
+    
+    def _index_path(self) -> Path:
+        return self.data_dir / "message_index.db"
+    
+    def rebuild_index(self) -> None:
+        """Re-create the message_id index from the session files."""
+        self.index.clear()
+        for session_file in self.data_dir.glob("session_*.json"):
+            with open(session_file, 'r') as f:
+                data = json.load(f)
+            session_id = session_file.stem[len("session_"):]
+            self.index.add_many(
+                (msg['message_id'], session_id, position)
+                for position, msg in enumerate(data.get('messages', []))
+                if msg.get('message_id')
+            )
     
     async def save_message(self, message: Message) -> bool:
         """Save a message to storage."""
-        try:
-            session_file = self.data_dir / f"session_{message.session_id}.json"
-            
+        session_id = message.session_id
+        pending = self._pending.get(session_id)
+        if pending is None:
+            pending = self._pending[session_id] = _PendingWrite()
+        pending.messages.append(message)
+        
+        async with self._write_locks(session_id):
+            # The first caller to get the lock writes everything queued so far
+            if self._pending.get(session_id) is pending:
+                del self._pending[session_id]
+                try:
+                    await asyncio.to_thread(self._append_messages, session_id, pending.messages)
+                except Exception as e:
+                    pending.error = e
+        
+        if pending.error is not None:
+            print(f"Error saving message: {pending.error}")
+            return False
+        return True
+    
+    def _append_messages(self, session_id: str, new_messages: List[Message]) -> None:
+        session_file = self.data_dir / f"session_{session_id}.json"
+        with self._file_locks(session_id):
             # Load existing messages
             messages = []
             if session_file.exists():
@@ -26,25 +87,25 @@ class MessageStore:
                     data = json.load(f)
                     messages = data.get('messages', [])
             
-            # Add new message
-            message_dict = message.dict()
-            message_dict['timestamp'] = message.timestamp.isoformat()
-            messages.append(message_dict)
+            # Add new messages
+            first_position = len(messages)
+            for message in new_messages:
+                message_dict = message.dict()
+                message_dict['timestamp'] = message.timestamp.isoformat()
+                messages.append(message_dict)
             
             # Save back to file
             session_data = {
-                'session_id': message.session_id,
+                'session_id': session_id,
                 'messages': messages,
                 'last_updated': datetime.now().isoformat()
             }
+            atomic_write_json(session_file, session_data, indent=2)
             
-            with open(session_file, 'w') as f:
-                json.dump(session_data, f, indent=2)
-            
-            return True
-        except Exception as e:
-            print(f"Error saving message: {e}")
-            return False
+            self.index.add_many(
+                (message.message_id, session_id, first_position + i)
+                for i, message in enumerate(new_messages)
+            )
     
     async def get_messages(
         self, 
@@ -87,39 +148,59 @@ class MessageStore:
         """Delete all messages for a session."""
         try:
             session_file = self.data_dir / f"session_{session_id}.json"
-            if session_file.exists():
-                session_file.unlink()
+            async with self._write_locks(session_id):
+                await asyncio.to_thread(self._delete_locked, session_id, session_file)
             return True
         except Exception as e:
             print(f"Error deleting session messages: {e}")
             return False
     
+    def _delete_locked(self, session_id: str, session_file: Path) -> None:
+        with self._file_locks(session_id):
+            if session_file.exists():
+                session_file.unlink()
+            self.index.remove_session(session_id)
+    
     async def update_message(self, message_id: str, content: str) -> bool:
         """Update message content (for partial responses)."""
         try:
             # Find the session containing this message
-            for session_file in self.data_dir.glob("session_*.json"):
-                with open(session_file, 'r') as f:
-                    data = json.load(f)
-                    messages = data.get('messages', [])
-                
-                # Find and update the message
-                for msg in messages:
-                    if msg.get('message_id') == message_id:
-                        msg['content'] = content
-                        msg['timestamp'] = datetime.now().isoformat()
-                        
-                        # Save back to file
-                        data['last_updated'] = datetime.now().isoformat()
-                        with open(session_file, 'w') as f:
-                            json.dump(data, f, indent=2)
-                        return True
+            location = self.index.lookup(message_id)
+            if location is None:
+                return False
+            session_id, position = location
             
-            return False
+            async with self._write_locks(session_id):
+                return await asyncio.to_thread(self._update_message, session_id, position, message_id, content)
         except Exception as e:
             print(f"Error updating message: {e}")
             return False
     
+    def _update_message(self, session_id: str, position: int, message_id: str, content: str) -> bool:
+        session_file = self.data_dir / f"session_{session_id}.json"
+        with self._file_locks(session_id):
+            if not session_file.exists():
+                return False
+            with open(session_file, 'r') as f:
+                data = json.load(f)
+                messages = data.get('messages', [])
+            
+            # The indexed position is checked first; fall back to a scan of this session only
+            if position < len(messages) and messages[position].get('message_id') == message_id:
+                msg = messages[position]
+            else:
+                msg = next((m for m in messages if m.get('message_id') == message_id), None)
+                if msg is None:
+                    return False
+            
+            msg['content'] = content
+            msg['timestamp'] = datetime.now().isoformat()
+            
+            # Save back to file
+            data['last_updated'] = datetime.now().isoformat()
+            atomic_write_json(session_file, data, indent=2)
+            return True
+    
     async def get_recent_messages(self, session_id: str, count: int = 10) -> List[Message]:
         """Get the most recent messages from a session."""
         messages = await self.get_messages(session_id)
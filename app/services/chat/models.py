@@ -53,6 +53,10 @@ class ChatContext(BaseModel):
     digital_twin_summary: Dict[str, Any]
     relevant_documents: List[Dict[str, Any]] = Field(default_factory=list)
     research_context: Optional[str] = None
+    # Pre-rendered conversation history (see context_window.py); used instead of recent_messages
+    history: Optional[str] = None
+    # Language code the reply should be written in
+    language: str = "en"
 
 
 class StreamEvent(BaseModel):
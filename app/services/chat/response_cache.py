@@ -0,0 +1,186 @@
+"""
+Response cache and in-flight request coalescing for LLM generations.
+
+Completed generations are cached under a key built from the normalized
+prompt, model id, temperature and a hash of the digital twin summary, so a
+repeated question against unchanged health data is answered without calling
+Bedrock. Identical requests that arrive while a generation is running share
+its upstream stream: every caller receives every event, and only one request
+is sent. The shared stream is read as fast as the model produces it and
+its events are kept until it finishes, so subscribers never slow it down.
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from contextlib import aclosing
+import asyncio
+import hashlib
+import json
+import re
+import unicodedata
+
+from app.storage.cache import LRUCache
+
+from .models import StreamEvent, StreamEventType
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Events replayed on a cache hit; progress messages such as THINKING are not
+_CACHED_EVENT_TYPES = (StreamEventType.TOKEN, StreamEventType.COMPLETE)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, Unicode form and whitespace differences do not change the key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", prompt).casefold()).strip()
+
+
+def summary_hash(digital_twin_summary: Dict[str, Any]) -> str:
+    payload = json.dumps(digital_twin_summary, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _events_size(events: List[Tuple[StreamEventType, str]]) -> int:
+    return sum(len(data) for _, data in events) + 64 * len(events)
+
+
+class _Broadcast:
+    """Events of one upstream generation, replayed to every subscriber."""
+
+    def __init__(self):
+        self.events: List[StreamEvent] = []
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: StreamEvent) -> None:
+        self.events.append(event)
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self, on_abandoned: Callable[[], None]) -> AsyncIterator[StreamEvent]:
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(self.events):
+                    yield self.events[position]
+                    position += 1
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done:
+                on_abandoned()
+
+
+class ResponseCache:
+    """LRU/TTL cache of completed generations plus a registry of in-flight ones."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, max_bytes: int = 8 * 1024 * 1024):
+        self._cache = LRUCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+            size_of=_events_size
+        )
+        self._in_flight: Dict[str, _Broadcast] = {}
+        self.coalesced = 0
+        self.upstream_requests = 0
+
+    @staticmethod
+    def make_key(prompt: str, model_id: str, temperature: float, digital_twin_summary: Dict[str, Any]) -> str:
+        parts = [normalize_prompt(prompt), model_id, repr(float(temperature)), summary_hash(digital_twin_summary)]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    async def stream(
+        self,
+        key: str,
+        generate: Callable[[], AsyncIterator[StreamEvent]]
+    ) -> AsyncIterator[StreamEvent]:
+        """Serve ``key`` from the cache, from a running generation, or by starting ``generate``."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            for event_type, data in cached:
+                yield StreamEvent(event_type=event_type, data=data)
+            return
+
+        broadcast = self._in_flight.get(key)
+        if broadcast is None:
+            broadcast = self._in_flight[key] = _Broadcast()
+            broadcast.task = asyncio.create_task(self._run(key, broadcast, generate))
+        else:
+            self.coalesced += 1
+
+        async with aclosing(broadcast.subscribe(lambda: self._abandon(key, broadcast))) as events:
+            async for event in events:
+                yield event
+
+    async def _run(self, key: str, broadcast: _Broadcast, generate: Callable[[], AsyncIterator[StreamEvent]]) -> None:
+        self.upstream_requests += 1
+        try:
+            async for event in generate():
+                broadcast.publish(event)
+            types = {event.event_type for event in broadcast.events}
+            if StreamEventType.COMPLETE in types and StreamEventType.ERROR not in types:
+                self._cache.put(key, [
+                    (event.event_type, event.data)
+                    for event in broadcast.events
+                    if event.event_type in _CACHED_EVENT_TYPES
+                ])
+        except Exception as e:
+            broadcast.publish(StreamEvent(
+                event_type=StreamEventType.ERROR,
+                data=f"Error generating response: {str(e)}"
+            ))
+        finally:
+            if self._in_flight.get(key) is broadcast:
+                del self._in_flight[key]
+            broadcast.finish()
+
+    def _abandon(self, key: str, broadcast: _Broadcast) -> None:
+        """Every caller went away before the generation finished: stop it."""
+        if self._in_flight.get(key) is broadcast:
+            del self._in_flight[key]
+        if broadcast.task is not None:
+            broadcast.task.cancel()
+
+    def invalidate(self, key: str) -> bool:
+        return self._cache.invalidate(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        requests = stats['hits'] + stats['misses']
+        stats.update({
+            'coalesced': self.coalesced,
+            'in_flight': len(self._in_flight),
+            'upstream_requests': self.upstream_requests,
+            # Share of requests answered without a Bedrock call of their own
+            'served_without_upstream_rate': round((stats['hits'] + self.coalesced) / requests, 4) if requests else 0.0
+        })
+        return stats
+
+
+_shared_cache: Optional[ResponseCache] = None
+
+
+def shared_response_cache(config: Dict[str, Any]) -> ResponseCache:
+    """The process-wide cache, created from the first configuration seen."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResponseCache(
+            max_entries=config.get("max_entries", 512),
+            ttl_seconds=config.get("ttl_seconds", 3600),
+            max_bytes=config.get("max_bytes", 8 * 1024 * 1024)
+        )
+    return _shared_cache
@@ -0,0 +1,324 @@
+"""
+Per-user document retrieval for chat context.
+
+Each user's health records (biomarker readings, conditions, medications,
+family history, goals, lifestyle) and past chat turns are stored as short
+documents in an on-disk inverted index (SQLite, ``<data_dir>/retrieval.db``)
+and ranked with BM25. Documents are added and replaced one at a time, so the
+index follows new records and messages without being rebuilt. A query reads
+only the postings of its own terms, and only the top-k texts are loaded.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import Counter
+import math
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in into is it
+its me my of on or our should so than that the their them then there these they this to was we were
+what when which who why will with would you your
+""".split())
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and number tokens, without stopwords, with plural 's' stripped."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS or (len(token) == 1 and not token.isdigit()):
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def snippet(text: str, terms: Iterable[str], width: int = 300) -> str:
+    """Up to ``width`` characters of ``text`` around the first query term it contains."""
+    if len(text) <= width:
+        return text
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    start = min((p for p in positions if p >= 0), default=0)
+    start = max(0, min(start - width // 4, len(text) - width))
+    prefix = "..." if start else ""
+    suffix = "..." if start + width < len(text) else ""
+    return prefix + text[start:start + width].strip() + suffix
+
+
+class RetrievalIndex:
+    """BM25 inverted index partitioned by user."""
+
+    def __init__(self, db_path: str = "data/chat/retrieval.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS retrieval_documents (
+                user_id TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                text TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (user_id, doc_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS retrieval_postings (
+                user_id TEXT NOT NULL,
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (user_id, term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS retrieval_users (
+                user_id TEXT PRIMARY KEY,
+                doc_count INTEGER NOT NULL DEFAULT 0,
+                total_length INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._conn.commit()
+
+    def add(self, user_id: str, doc_id: str, source: str, text: str) -> None:
+        """Index a document, replacing any previous version with the same id."""
+        self.add_many(user_id, [(doc_id, source, text)])
+
+    def add_many(self, user_id: str, documents: Iterable[Tuple[str, str, str]]) -> int:
+        """Index (doc_id, source, text) tuples in one transaction; returns how many changed."""
+        batch = {doc_id: (source, text) for doc_id, source, text in documents}
+        documents_rows, postings_rows = [], []
+        doc_delta = length_delta = 0
+        with self._lock:
+            try:
+                for doc_id, (source, text) in batch.items():
+                    existing = self._conn.execute(
+                        "SELECT source, text, length FROM retrieval_documents WHERE user_id = ? AND doc_id = ?",
+                        (user_id, doc_id)
+                    ).fetchone()
+                    if existing is not None:
+                        if existing[:2] == (source, text):
+                            continue
+                        self._delete_postings(user_id, doc_id, existing[1])
+                        doc_delta -= 1
+                        length_delta -= existing[2]
+
+                    counts = Counter(tokenize(text))
+                    length = sum(counts.values())
+                    documents_rows.append((user_id, doc_id, source, text, length))
+                    postings_rows.extend((user_id, term, doc_id, tf, length) for term, tf in counts.items())
+                    doc_delta += 1
+                    length_delta += length
+
+                if documents_rows:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO retrieval_documents (user_id, doc_id, source, text, length) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        documents_rows
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO retrieval_postings (user_id, term, doc_id, tf, length) VALUES (?, ?, ?, ?, ?)",
+                        postings_rows
+                    )
+                    self._update_totals(user_id, doc_delta, length_delta)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return len(documents_rows)
+
+    def remove(self, user_id: str, doc_id: str) -> bool:
+        with self._lock:
+            removed = self._delete(user_id, doc_id)
+            self._conn.commit()
+        return removed
+
+    def sync_source(self, user_id: str, source: str, documents: Sequence[Tuple[str, str]]) -> int:
+        """
+        Make the user's documents from ``source`` exactly (doc_id, text) pairs
+        given: unchanged documents are left alone, stale ones removed.
+        Returns the number of documents added, changed or removed.
+        """
+        wanted = dict(documents)
+        with self._lock:
+            stale = [
+                doc_id for (doc_id,) in self._conn.execute(
+                    "SELECT doc_id FROM retrieval_documents WHERE user_id = ? AND source = ?",
+                    (user_id, source)
+                )
+                if doc_id not in wanted
+            ]
+            for doc_id in stale:
+                self._delete(user_id, doc_id)
+            self._conn.commit()
+        return len(stale) + self.add_many(user_id, ((doc_id, source, text) for doc_id, text in wanted.items()))
+
+    def remove_user(self, user_id: str) -> None:
+        with self._lock:
+            for table in ("retrieval_documents", "retrieval_postings", "retrieval_users"):
+                self._conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+
+    def document_count(self, user_id: str, source: Optional[str] = None) -> int:
+        with self._lock:
+            if source is None:
+                row = self._conn.execute(
+                    "SELECT doc_count FROM retrieval_users WHERE user_id = ?", (user_id,)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM retrieval_documents WHERE user_id = ? AND source = ?",
+                    (user_id, source)
+                ).fetchone()
+        return row[0] if row else 0
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 5,
+        exclude: Iterable[str] = (),
+        snippet_chars: int = 300
+    ) -> List[Dict[str, Any]]:
+        """Top-``k`` documents for ``query`` by BM25, as {doc_id, source, text, score}."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+        excluded = list(set(exclude))
+
+        with self._lock:
+            stats = self._conn.execute(
+                "SELECT doc_count, total_length FROM retrieval_users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if not stats or not stats[0] or not stats[1]:
+                return []
+            doc_count, total_length = stats
+
+            document_frequencies = self._conn.execute(
+                f"SELECT term, COUNT(*) FROM retrieval_postings "
+                f"WHERE user_id = ? AND term IN ({_marks(terms)}) GROUP BY term",
+                (user_id, *terms)
+            ).fetchall()
+            if not document_frequencies:
+                return []
+
+            # BM25 is summed per document inside SQLite so only the top k rows come back:
+            # idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average_length))
+            idf_cases, idf_params = [], []
+            for term, df in document_frequencies:
+                idf_cases.append("WHEN ? THEN ?")
+                idf_params += [term, math.log(1 + (doc_count - df + 0.5) / (df + 0.5))]
+            matched = [term for term, _ in document_frequencies]
+            exclude_clause = f"AND doc_id NOT IN ({_marks(excluded)})" if excluded else ""
+
+            rows = self._conn.execute(f"""
+                SELECT top.doc_id, d.source, d.text, top.score
+                FROM (
+                    SELECT doc_id, SUM(
+                        (CASE term {' '.join(idf_cases)} END) * tf * ? / (tf + ? + ? * length)
+                    ) AS score
+                    FROM retrieval_postings
+                    WHERE user_id = ? AND term IN ({_marks(matched)}) {exclude_clause}
+                    GROUP BY doc_id
+                    ORDER BY score DESC
+                    LIMIT ?
+                ) AS top
+                JOIN retrieval_documents d ON d.user_id = ? AND d.doc_id = top.doc_id
+                ORDER BY top.score DESC
+            """, (
+                *idf_params,
+                BM25_K1 + 1, BM25_K1 * (1 - BM25_B), BM25_K1 * BM25_B * doc_count / total_length,
+                user_id, *matched, *excluded,
+                k,
+                user_id
+            )).fetchall()
+
+        return [
+            {'doc_id': doc_id, 'source': source, 'text': snippet(text, terms, snippet_chars), 'score': round(score, 4)}
+            for doc_id, source, text, score in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _delete(self, user_id: str, doc_id: str) -> bool:
+        row = self._conn.execute(
+            "SELECT text, length FROM retrieval_documents WHERE user_id = ? AND doc_id = ?",
+            (user_id, doc_id)
+        ).fetchone()
+        if row is None:
+            return False
+        self._delete_postings(user_id, doc_id, row[0])
+        self._conn.execute(
+            "DELETE FROM retrieval_documents WHERE user_id = ? AND doc_id = ?", (user_id, doc_id)
+        )
+        self._update_totals(user_id, -1, -row[1])
+        return True
+
+    def _delete_postings(self, user_id: str, doc_id: str, text: str) -> None:
+        self._conn.executemany(
+            "DELETE FROM retrieval_postings WHERE user_id = ? AND term = ? AND doc_id = ?",
+            [(user_id, term, doc_id) for term in set(tokenize(text))]
+        )
+
+    def _update_totals(self, user_id: str, doc_delta: int, length_delta: int) -> None:
+        self._conn.execute("""
+            INSERT INTO retrieval_users (user_id, doc_count, total_length) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                doc_count = doc_count + excluded.doc_count,
+                total_length = total_length + excluded.total_length
+        """, (user_id, doc_delta, length_delta))
+
+
+def _marks(values: Sequence) -> str:
+    return ",".join("?" * len(values))
+
+
+def record_documents(digital_twin) -> List[Tuple[str, str]]:
+    """(doc_id, text) pairs for a recommendations DigitalTwin's health records."""
+    documents = []
+    for snapshot in digital_twin.biomarker_history or (
+        [digital_twin.latest_biomarkers] if digital_twin.latest_biomarkers else []
+    ):
+        test_date = snapshot.test_date.date().isoformat()
+        for category, markers in snapshot.categories.items():
+            for name, marker in markers.items():
+                documents.append((
+                    f"biomarker:{test_date}:{name}",
+                    f"Biomarker {name} ({category}) on {test_date}: {marker.value} {marker.unit}, "
+                    f"{marker.status} (reference {marker.ref_range}), {snapshot.lab_name}"
+                ))
+    for condition in digital_twin.conditions:
+        severity = f", {condition.severity}" if condition.severity else ""
+        documents.append((f"condition:{condition.condition}",
+                          f"Condition: {condition.condition} ({condition.status}{severity})"))
+    for medication in digital_twin.medications:
+        documents.append((f"medication:{medication.name}",
+                          f"Medication: {medication.name} {medication.dosage}, {medication.frequency}"))
+    for supplement in digital_twin.supplements:
+        documents.append((f"supplement:{supplement.name}",
+                          f"Supplement: {supplement.name} {supplement.dosage}, {supplement.frequency}"))
+    for family_condition in digital_twin.family_history:
+        documents.append((f"family:{family_condition.relation}:{family_condition.condition}",
+                          f"Family history: {family_condition.condition} ({family_condition.relation})"))
+    for goal in digital_twin.goals:
+        documents.append((f"goal:{goal.goal}", f"Health goal: {goal.goal} (priority {goal.priority})"))
+    if digital_twin.lifestyle:
+        details = ", ".join(
+            f"{key.replace('_', ' ')} {value}"
+            for key, value in digital_twin.lifestyle.dict().items()
+            if value is not None
+        )
+        if details:
+            documents.append(("lifestyle", f"Lifestyle: {details}"))
+    # Later snapshots of the same reading id win
+    return list(dict(documents).items())
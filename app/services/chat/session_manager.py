@@ -1,18 +1,35 @@
-from typing import List, Optional
+from typing import Callable, List, Optional, TypeVar
 from datetime import datetime, timedelta
+import asyncio
 import json
 from pathlib import Path
 
 from .models import ChatSession, ChatSessionSummary
+from .locking import InterProcessLock, atomic_write_json
+
+T = TypeVar("T")
+
+# Session fields callers may change in place; counters and timestamps have their own updates
+UPDATABLE_FIELDS = ('title', 'is_archived', 'metadata')
 
 
 class SessionManager:
-    """Manages chat session lifecycle and metadata."""
+    """
+    Manages chat session lifecycle and metadata.
+    
+    Every change is a read-modify-write of sessions.json under an asyncio lock
+    (in-process) and a lock file (across workers), finished by an atomic
+    rename, so concurrent updates are never lost or half-written.
+    """
     
-    def __init__(self, data_dir: str = "data/chat"):
+    def __init__(self, data_dir: str = "data/chat", message_store=None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.sessions_file = self.data_dir / "sessions.json"
+        self._write_lock = asyncio.Lock()
+        self._file_lock = InterProcessLock(self.data_dir / ".locks" / "sessions.lock")
+        # Used for last-message previews; without it the session files are read directly
+        self.message_store = message_store
     
     async def create_session(
         self, 
@@ -43,14 +60,13 @@ class SessionManager:
     
     async def update_session_activity(self, session_id: str) -> None:
         """Update last_activity timestamp for a session."""
-        sessions = await self._load_sessions()
-        
-        for session_data in sessions:
-            if session_data.get('session_id') == session_id:
-                session_data['last_activity'] = datetime.now().isoformat()
-                break
+        def update(sessions: List[dict]) -> None:
+            for session_data in sessions:
+                if session_data.get('session_id') == session_id:
+                    session_data['last_activity'] = datetime.now().isoformat()
+                    break
         
-        await self._save_sessions(sessions)
+        await self._update_sessions(update)
     
     async def list_user_sessions(
         self, 
@@ -83,62 +99,74 @@ class SessionManager:
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session and mark for cleanup."""
-        sessions = await self._load_sessions()
-        
-        # Remove session from list
-        sessions = [s for s in sessions if s.get('session_id') != session_id]
-        await self._save_sessions(sessions)
+        def update(sessions: List[dict]) -> None:
+            # Remove session from list
+            sessions[:] = [s for s in sessions if s.get('session_id') != session_id]
         
+        await self._update_sessions(update)
         return True
     
     async def archive_inactive_sessions(self, days_inactive: int = 30) -> int:
         """Archive sessions inactive for specified days."""
-        sessions = await self._load_sessions()
         cutoff_date = datetime.now() - timedelta(days=days_inactive)
-        archived_count = 0
         
-        for session_data in sessions:
-            last_activity = datetime.fromisoformat(session_data['last_activity'])
-            if last_activity < cutoff_date and not session_data.get('is_archived', False):
-                session_data['is_archived'] = True
-                archived_count += 1
+        def update(sessions: List[dict]) -> int:
+            archived_count = 0
+            for session_data in sessions:
+                last_activity = datetime.fromisoformat(session_data['last_activity'])
+                if last_activity < cutoff_date and not session_data.get('is_archived', False):
+                    session_data['is_archived'] = True
+                    archived_count += 1
+            return archived_count
         
-        await self._save_sessions(sessions)
-        return archived_count
+        return await self._update_sessions(update) or 0
+    
+    async def update_session_fields(self, session_id: str, **fields) -> bool:
+        """Set ``fields`` on the stored session, leaving its other fields as they are."""
+        unknown = set(fields) - set(UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot update session fields: {sorted(unknown)}")
+        
+        def update(sessions: List[dict]) -> bool:
+            for session_data in sessions:
+                if session_data.get('session_id') == session_id:
+                    session_data.update(fields)
+                    return True
+            return False
+        
+        return bool(await self._update_sessions(update))
     
     async def increment_message_count(self, session_id: str) -> None:
         """Increment message count for a session."""
-        sessions = await self._load_sessions()
-        
-        for session_data in sessions:
-            if session_data.get('session_id') == session_id:
-                session_data['message_count'] = session_data.get('message_count', 0) + 1
-                break
-        
-        await self._save_sessions(sessions)
+        await self.record_message(session_id, count=1)
+    
+    async def record_message(self, session_id: str, preview: Optional[str] = None, count: int = 1) -> None:
+        """Bump activity and message count for ``count`` new messages in one write."""
+        def update(sessions: List[dict]) -> None:
+            for session_data in sessions:
+                if session_data.get('session_id') == session_id:
+                    session_data['last_activity'] = datetime.now().isoformat()
+                    session_data['message_count'] = session_data.get('message_count', 0) + count
+                    break
+        
+        await self._update_sessions(update)
     
     async def _save_session(self, session: ChatSession) -> None:
         """Save a single session to storage."""
-        sessions = await self._load_sessions()
-        
         # Convert session to dict
         session_dict = session.dict()
         session_dict['created_at'] = session.created_at.isoformat()
         session_dict['last_activity'] = session.last_activity.isoformat()
         
-        # Add or update session
-        existing_index = None
-        for i, s in enumerate(sessions):
-            if s.get('session_id') == session.session_id:
-                existing_index = i
-                break
-        
-        if existing_index is not None:
-            sessions[existing_index] = session_dict
-        else:
+        def update(sessions: List[dict]) -> None:
+            # Add or update session
+            for i, s in enumerate(sessions):
+                if s.get('session_id') == session.session_id:
+                    sessions[i] = session_dict
+                    return
             sessions.append(session_dict)
         
-        await self._save_sessions(sessions)
+        await self._update_sessions(update)
     
     async def _load_sessions(self) -> List[dict]:
         """Load all sessions from storage."""
@@ -151,17 +179,36 @@ class SessionManager:
             print(f"Error loading sessions: {e}")
             return []
     
-    async def _save_sessions(self, sessions: List[dict]) -> None:
-        """Save sessions to storage."""
+    async def _update_sessions(self, update: Callable[[List[dict]], T]) -> Optional[T]:
+        """Apply ``update`` to the session list in place and save it, as one locked step."""
         try:
-            with open(self.sessions_file, 'w') as f:
-                json.dump(sessions, f, indent=2)
+            async with self._write_lock:
+                return await asyncio.to_thread(self._update_sessions_locked, update)
         except Exception as e:
             print(f"Error saving sessions: {e}")
+            return None
+    
+    def _update_sessions_locked(self, update: Callable[[List[dict]], T]) -> T:
+        with self._file_lock:
+            sessions = []
+            if self.sessions_file.exists():
+                # A corrupt file raises here rather than being overwritten with a partial list
+                with open(self.sessions_file, 'r') as f:
+                    sessions = json.load(f)
+            result = update(sessions)
+            atomic_write_json(self.sessions_file, sessions, indent=2)
+            return result
     
     async def _get_last_message_preview(self, session_id: str) -> str:
         """Get preview of last message in session."""
         try:
+            if self.message_store is not None:
+                messages = await self.message_store.get_recent_messages(session_id, count=1)
+                if messages:
+                    content = messages[-1].content
+                    return content[:100] + "..." if len(content) > 100 else content
+                return "No messages yet"
+            
             session_file = self.data_dir / f"session_{session_id}.json"
             if session_file.exists():
                 with open(session_file, 'r') as f:
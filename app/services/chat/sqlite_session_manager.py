@@ -0,0 +1,233 @@
+"""
+SQLite-backed chat session store.
+
+Sessions live in one table indexed on (user_id, last_activity), so listing a
+user's sessions is a single indexed query. The last-message preview is kept
+on the session row, which means listing never opens message files. Counters
+are incremented in SQL, so concurrent turns cannot lose updates. Statements
+run in a worker thread, so a write-locked database never stalls the event loop.
+"""
+
+from typing import List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
+import sqlite3
+import threading
+
+from .models import ChatSession, ChatSessionSummary
+from .session_manager import UPDATABLE_FIELDS, SessionManager
+
+PREVIEW_LENGTH = 100
+
+
+def _preview(content: str) -> str:
+    return content[:PREVIEW_LENGTH] + "..." if len(content) > PREVIEW_LENGTH else content
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO strings so that text ordering matches time ordering
+    return value.isoformat(timespec='microseconds')
+
+
+class SQLiteSessionManager(SessionManager):
+    """SessionManager storing sessions in ``<data_dir>/sessions.db``."""
+
+    def __init__(self, data_dir: str = "data/chat", message_store=None):
+        super().__init__(data_dir, message_store)
+        self.db_path = self.data_dir / "sessions.db"
+        created = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                title TEXT,
+                created_at TEXT NOT NULL,
+                last_activity TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                is_archived INTEGER NOT NULL DEFAULT 0,
+                metadata TEXT NOT NULL DEFAULT '{}',
+                last_message_preview TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_activity
+            ON chat_sessions(user_id, last_activity)
+        """)
+        self._conn.commit()
+        if created and self.sessions_file.exists():
+            self._import_sessions_file()
+
+    async def create_session(self, user_id: str, title: Optional[str] = None) -> ChatSession:
+        """Create a new chat session."""
+        session = ChatSession(
+            user_id=user_id,
+            title=title or f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        )
+        await self._save_session(session)
+        return session
+
+    async def get_session(self, session_id: str) -> Optional[ChatSession]:
+        """Retrieve session by ID."""
+        row = await self._fetchone("SELECT * FROM chat_sessions WHERE session_id = ?", (session_id,))
+        return self._to_session(row) if row else None
+
+    async def update_session_activity(self, session_id: str) -> None:
+        """Update last_activity timestamp for a session."""
+        await self._execute(
+            "UPDATE chat_sessions SET last_activity = ? WHERE session_id = ?",
+            (_timestamp(datetime.now()), session_id)
+        )
+
+    async def update_session_fields(self, session_id: str, **fields) -> bool:
+        """Set ``fields`` on the session row, leaving its other columns as they are."""
+        unknown = set(fields) - set(UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot update session fields: {sorted(unknown)}")
+        if not fields:
+            return await self.get_session(session_id) is not None
+        values = {
+            'title': fields.get('title'),
+            'is_archived': int(fields.get('is_archived', False)),
+            'metadata': json.dumps(fields.get('metadata'))
+        }
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        return bool(await self._execute(
+            f"UPDATE chat_sessions SET {assignments} WHERE session_id = ?",
+            (*(values[name] for name in fields), session_id)
+        ))
+
+    async def increment_message_count(self, session_id: str) -> None:
+        """Increment message count for a session."""
+        await self._execute(
+            "UPDATE chat_sessions SET message_count = message_count + 1 WHERE session_id = ?",
+            (session_id,)
+        )
+
+    async def record_message(self, session_id: str, preview: Optional[str] = None, count: int = 1) -> None:
+        """Bump activity, message count and preview for new messages in one statement."""
+        await self._execute("""
+            UPDATE chat_sessions
+            SET last_activity = ?,
+                message_count = message_count + ?,
+                last_message_preview = COALESCE(?, last_message_preview)
+            WHERE session_id = ?
+        """, (_timestamp(datetime.now()), count, _preview(preview) if preview is not None else None, session_id))
+
+    async def list_user_sessions(self, user_id: str, limit: int = 50) -> List[ChatSessionSummary]:
+        """List a user's active sessions, most recent first."""
+        rows = await self._fetchall("""
+            SELECT session_id, title, last_activity, message_count, last_message_preview
+            FROM chat_sessions
+            WHERE user_id = ? AND is_archived = 0
+            ORDER BY last_activity DESC
+            LIMIT ?
+        """, (user_id, limit))
+
+        summaries = []
+        for row in rows:
+            preview = row['last_message_preview']
+            if preview is None and row['message_count']:
+                # Sessions imported from sessions.json have no stored preview yet
+                preview = await self._get_last_message_preview(row['session_id'])
+                await self._execute(
+                    "UPDATE chat_sessions SET last_message_preview = ? WHERE session_id = ?",
+                    (preview, row['session_id'])
+                )
+            summaries.append(ChatSessionSummary(
+                session_id=row['session_id'],
+                title=row['title'],
+                last_message_preview=preview or "No messages yet",
+                last_activity=datetime.fromisoformat(row['last_activity']),
+                message_count=row['message_count']
+            ))
+        return summaries
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session."""
+        await self._execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+        return True
+
+    async def archive_inactive_sessions(self, days_inactive: int = 30) -> int:
+        """Archive sessions inactive for specified days."""
+        cutoff = _timestamp(datetime.now() - timedelta(days=days_inactive))
+        return await self._execute(
+            "UPDATE chat_sessions SET is_archived = 1 WHERE last_activity < ? AND is_archived = 0",
+            (cutoff,)
+        )
+
+    async def _save_session(self, session: ChatSession) -> None:
+        """Insert or update a session's metadata (counters and preview are left alone)."""
+        await self._execute("""
+            INSERT INTO chat_sessions
+                (session_id, user_id, title, created_at, last_activity, message_count, is_archived, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                title = excluded.title,
+                last_activity = excluded.last_activity,
+                is_archived = excluded.is_archived,
+                metadata = excluded.metadata
+        """, self._to_row(session))
+
+    def _import_sessions_file(self) -> None:
+        """Import the legacy sessions.json into a new database, leaving the file as it is."""
+        with open(self.sessions_file, 'r') as f:
+            sessions = json.load(f)
+        rows = []
+        for data in sessions:
+            data['created_at'] = datetime.fromisoformat(data['created_at'])
+            data['last_activity'] = datetime.fromisoformat(data['last_activity'])
+            rows.append(self._to_row(ChatSession(**data)))
+        with self._lock:
+            self._conn.executemany("""
+                INSERT OR IGNORE INTO chat_sessions
+                    (session_id, user_id, title, created_at, last_activity, message_count, is_archived, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self._conn.commit()
+
+    async def _execute(self, sql: str, params: tuple = ()) -> int:
+        return await asyncio.to_thread(self._execute_locked, sql, params)
+
+    async def _fetchone(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        return await asyncio.to_thread(self._fetch_locked, sql, params, False)
+
+    async def _fetchall(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(self._fetch_locked, sql, params, True)
+
+    def _execute_locked(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _fetch_locked(self, sql: str, params: tuple, many: bool):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return cursor.fetchall() if many else cursor.fetchone()
+
+    @staticmethod
+    def _to_row(session: ChatSession) -> tuple:
+        return (
+            session.session_id, session.user_id, session.title,
+            _timestamp(session.created_at), _timestamp(session.last_activity),
+            session.message_count, int(session.is_archived), json.dumps(session.metadata)
+        )
+
+    @staticmethod
+    def _to_session(row: sqlite3.Row) -> ChatSession:
+        return ChatSession(
+            session_id=row['session_id'],
+            user_id=row['user_id'],
+            title=row['title'],
+            created_at=datetime.fromisoformat(row['created_at']),
+            last_activity=datetime.fromisoformat(row['last_activity']),
+            message_count=row['message_count'],
+            is_archived=bool(row['is_archived']),
+            metadata=json.loads(row['metadata'])
+        )
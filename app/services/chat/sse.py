@@ -0,0 +1,84 @@
+"""
+Server-Sent Events framing for chat streams.
+
+``coalesce_tokens`` sends at most one TOKEN frame per ``flush_interval``:
+a token arriving at least that long after the previous frame goes out at
+once (so the first token and slow streams are not delayed), and tokens
+arriving sooner are held and merged into the next frame, which is sent
+with the first token after the interval or once ``max_chars`` are held.
+Every other event is passed through in order and sends held text first.
+There is no timer or extra task per stream, so if generation pauses, held
+text waits for the next event; COMPLETE and ERROR always flush it.
+
+Upstream events are read only while the client keeps up: while a frame is
+being sent nothing is read, and the events queued meanwhile come out as
+larger frames. Without the response cache this holds back generation
+(through the bounded Bedrock stream queue). With it, generation runs in a
+task of its own at the model's pace and every event is kept for replay to
+later subscribers (see response_cache.py), so a slow client delays only
+its own frames and costs memory up to the length of the response. Closing
+the stream, which Starlette does when the client disconnects, closes the
+upstream stream and cancels generation that nobody else is waiting on.
+"""
+
+from typing import Any, AsyncIterator, Dict, List
+from contextlib import aclosing
+import asyncio
+import json
+
+from .models import StreamEvent, StreamEventType
+
+
+def sse_frame(payload: Dict[str, Any]) -> bytes:
+    """One SSE ``data:`` frame."""
+    return b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n"
+
+
+def event_frame(event: StreamEvent) -> bytes:
+    return sse_frame({
+        "type": event.event_type.value,
+        "data": event.data,
+        "timestamp": event.timestamp.isoformat()
+    })
+
+
+def _merge(tokens: List[StreamEvent]) -> StreamEvent:
+    if len(tokens) == 1:
+        return tokens[0]
+    return StreamEvent(
+        event_type=StreamEventType.TOKEN,
+        data="".join(token.data for token in tokens),
+        timestamp=tokens[-1].timestamp
+    )
+
+
+async def coalesce_tokens(
+    events: AsyncIterator[StreamEvent],
+    flush_interval: float = 0.05,
+    max_chars: int = 1024
+) -> AsyncIterator[StreamEvent]:
+    """Pass ``events`` through, merging runs of TOKEN events (see module docstring)."""
+    loop = asyncio.get_running_loop()
+    pending: List[StreamEvent] = []
+    pending_chars = 0
+    next_frame = 0.0
+
+    async with aclosing(events):
+        async for event in events:
+            if event.event_type == StreamEventType.TOKEN:
+                pending.append(event)
+                pending_chars += len(event.data)
+                now = loop.time()
+                if pending_chars >= max_chars or now >= next_frame:
+                    next_frame = now + flush_interval
+                    yield _merge(pending)
+                    pending, pending_chars = [], 0
+                continue
+
+            if pending:
+                yield _merge(pending)
+                pending, pending_chars = [], 0
+            yield event
+
+        if pending:
+            yield _merge(pending)
@@ -9,7 +9,7 @@ from datetime import datetime
 from app.models.digital_twin import DigitalTwin, FieldState
 from app.services.user_db_service import user_db_service
 from app.database import SessionLocal
-from app.models.computed_models import ComputedData
+from app.models.computed_models import ComputedData, PIPELINE_STATE_TYPE
 
 
 class DigitalTwinDBService:
@@ -17,11 +17,31 @@ class DigitalTwinDBService:
     
     def get_or_create_digital_twin(self, user_id: str, auto_compute: bool = True) -> Optional[DigitalTwin]:
         """Get or create a digital twin from database data."""
-        user = user_db_service.get_user(user_id)
-        if not user:
+        full_data = user_db_service.get_user_full_data(user_id)
+        if not full_data:
             return None
         
-        # Create digital twin
+        twin = self._build_twin(user_id, full_data)
+        
+        # Auto-compute derived data
+        if auto_compute:
+            self.compute_derived_data(user_id)
+            computed = self.get_computed_data(user_id)
+            if computed:
+                twin.set_value('computed', 'daily_routine', computed.get('daily_routine'))
+                twin.set_value('computed', 'weekly_routine', computed.get('weekly_routine'))
+                twin.set_value('computed', 'health_scores', computed.get('health_scores'))
+        
+        return twin
+    
+    def get_digital_twins(self, user_ids: List[str]) -> Dict[str, DigitalTwin]:
+        """Build twins for many users from one bulk load (no derived data)."""
+        full_data = user_db_service.get_users_full_data(user_ids)
+        return {uid: self._build_twin(uid, data) for uid, data in full_data.items()}
+    
+    def _build_twin(self, user_id: str, full_data: Dict[str, Any]) -> DigitalTwin:
+        """Populate a digital twin from the get_user_full_data dict shape."""
+        user = full_data['profile']
         twin = DigitalTwin(user_id=user_id)
         
         # Populate demographics
@@ -34,16 +54,16 @@ class DigitalTwinDBService:
         twin.set_value('demographics', 'blood_type', user['blood_type'])
         
         # Populate biomarkers
-        biomarkers = user_db_service.get_user_biomarkers(user_id)
-        for b in biomarkers:
-            twin.set_value('biomarkers', b['name'], b['value'], unit=b['unit'], metadata={
-                'normal_range': b['normal_range'],
-                'status': b['status'],
-                'category': b['category']
-            })
+        for markers in full_data['biomarkers'].values():
+            for b in markers:
+                twin.set_value('biomarkers', b['name'], b['value'], unit=b['unit'], metadata={
+                    'normal_range': b['normal_range'],
+                    'status': b['status'],
+                    'category': b['category']
+                })
         
         # Populate medical history
-        history = user_db_service.get_user_medical_history(user_id)
+        history = full_data['medical_history']
         
         for condition in history.get('conditions', []):
             twin.set_value('medical_history', f"condition_{condition['name']}", condition['details'])
@@ -54,28 +74,25 @@ class DigitalTwinDBService:
         for fam in history.get('family_history', []):
             twin.set_value('family_history', fam['name'], fam['details'])
         
-        # Auto-compute derived data
-        if auto_compute:
-            self.compute_derived_data(user_id)
-            computed = self.get_computed_data(user_id)
-            if computed:
-                twin.set_value('computed', 'daily_routine', computed.get('daily_routine'))
-                twin.set_value('computed', 'weekly_routine', computed.get('weekly_routine'))
-                twin.set_value('computed', 'health_scores', computed.get('health_scores'))
-        
         return twin
     
-    def compute_derived_data(self, user_id: str) -> Dict[str, Any]:
-        """Trigger computation of all derived data for a user."""
+    def compute_derived_data(self, user_id: str, force: bool = False) -> Dict[str, Any]:
+        """Bring derived data up to date; a no-op beyond a version check when nothing changed."""
         from compute_health_data import HealthDataComputer
         computer = HealthDataComputer()
-        return computer.compute_all_for_user(user_id)
+        try:
+            return computer.compute_all_for_user(user_id, force=force)
+        finally:
+            computer.close()
     
     def get_computed_data(self, user_id: str) -> Dict[str, Any]:
         """Get all computed data for a user from DB."""
         db = SessionLocal()
         try:
-            records = db.query(ComputedData).filter(ComputedData.user_id == user_id).all()
+            records = db.query(ComputedData).filter(
+                ComputedData.user_id == user_id,
+                ComputedData.data_type != PIPELINE_STATE_TYPE
+            ).all()
             return {r.data_type: r.data for r in records}
         finally:
             db.close()
@@ -102,21 +119,18 @@ class DigitalTwinDBService:
     
     def list_available_twins(self) -> List[Dict[str, Any]]:
         """List all users that can have digital twins."""
-        users = user_db_service.get_all_users()
-        result = []
-        
-        for user in users:
-            biomarkers = user_db_service.get_user_biomarkers(user['user_id'])
-            result.append({
+        users = user_db_service.get_users_with_biomarker_counts()
+        return [
+            {
                 'user_id': user['user_id'],
                 'age': user['age'],
                 'gender': user['gender'],
                 'data_source': user['data_source'],
-                'biomarker_count': len(biomarkers),
-                'has_data': len(biomarkers) > 0
-            })
-        
-        return result
+                'biomarker_count': user['biomarker_count'],
+                'has_data': user['biomarker_count'] > 0
+            }
+            for user in users
+        ]
 
 
 # Global instance
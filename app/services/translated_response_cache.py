@@ -0,0 +1,87 @@
+"""
+Cache of translated JSON responses for per-user read endpoints.
+
+Entries are keyed by ``(endpoint, user_id, language)`` and stored with the
+versions they were built from: the user's data version (see
+``twin_summary_cache.version``, bumped by every ORM commit that touches the
+user's rows) and a version of the translation tables the endpoint reads.
+A hit whose versions no longer match is rebuilt, so invalidation needs no
+bookkeeping beyond those counters. Entries also expire after
+``ttl_seconds``, which bounds staleness from writers the version hooks do
+not see (another worker without the Redis backend, raw SQL). While the
+version backend is unreachable (version -1) responses are built but not
+cached.
+
+Responses are stored as encoded JSON bytes and served as they are, so a
+hit skips translation and serialization entirely.
+"""
+
+import logging
+import os
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from app.services.twin_summary_cache import twin_summary_cache
+from app.storage.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class TranslatedResponseCache:
+    """Bounded LRU of encoded responses, validated against data and translation versions."""
+
+    def __init__(
+        self,
+        max_entries: int = 2000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 300,
+        data_version: Optional[Callable[[str], Hashable]] = None
+    ):
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, size_of=lambda entry: len(entry[1]),
+                               ttl_seconds=ttl_seconds)
+        self._data_version = data_version or twin_summary_cache.version
+        self.builds = 0
+
+    def get_or_build(
+        self,
+        endpoint: str,
+        user_id: str,
+        language: str,
+        build: Callable[[], Any],
+        translation_version: Hashable = None
+    ) -> Response:
+        """
+        Cached response for this endpoint/user/language, calling ``build`` on a miss.
+
+        ``build`` returns the JSON-able payload; exceptions it raises (such as
+        HTTPException) propagate and nothing is cached.
+        """
+        key = (endpoint, user_id, language)
+        # Read before building, so a change during the build leaves the entry stale rather than current
+        data_version = self._data_version(user_id)
+        versions = (data_version, translation_version)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == versions:
+            return Response(content=entry[1], media_type="application/json")
+
+        body = JSONResponse(content=jsonable_encoder(build())).body
+        self.builds += 1
+        # A negative version means the version backend is unreachable: later changes could not be seen
+        if not (isinstance(data_version, int) and data_version < 0):
+            self._cache.put(key, (versions, body))
+        return Response(content=body, media_type="application/json")
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), 'builds': self.builds}
+
+
+# Global instance
+translated_response_cache = TranslatedResponseCache(
+    max_entries=int(os.getenv("TRANSLATED_RESPONSE_CACHE_SIZE", "2000")),
+    ttl_seconds=float(os.getenv("TRANSLATED_RESPONSE_CACHE_TTL", "300"))
+)
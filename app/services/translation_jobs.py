@@ -0,0 +1,519 @@
+"""
+Background translation precompute jobs.
+
+A ``TranslationJob`` asks for one user's content of one type (for example
+the strings of a daily routine) to be translated into the supported
+languages and stored in ``translation_db``. Jobs are put on a queue when
+the content changes and a ``TranslationWorker`` drains it:
+
+- a claimed batch keeps only the newest job per (user, content type);
+  older ones are superseded and dropped;
+- the strings of the whole batch are translated with one
+  ``translate_many`` call per language, at most ``max_concurrency`` at a
+  time, and the results are written in a single transaction;
+- a batch fails, and nothing of it is stored, if any string cannot be
+  translated or the write fails; its jobs are retried with backoff up to
+  ``max_attempts`` times.
+
+Two queues are available, chosen by TRANSLATION_QUEUE_URL:
+
+- unset: ``MemoryJobQueue``, drained by the asyncio worker started with
+  the API process (TRANSLATION_WORKER=1, the default). Scripts that
+  commit routines (compute_health_data.py) drain it before exiting;
+- ``sqlite:///path``: ``SQLiteJobQueue``, a broker stand-in shared through
+  a SQLite file. Scripts and other processes enqueue into it, and the API
+  process's worker or a standalone one (``python -m
+  app.services.translation_jobs``) claims from it. A claim expires after
+  ``visibility_timeout`` so a crashed worker's jobs are picked up again.
+
+ComputedData commits that change a user's daily routine enqueue its
+strings through a SQLAlchemy ``after_commit`` hook installed by this
+module.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGES = ('hi', 'ta')
+
+
+def content_key(text: str) -> str:
+    """Key under which a string's translations are stored when it has no named key."""
+    return f"text_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+def routine_texts(routine: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """content_key -> text for the step names, product names and descriptions of a routine."""
+    texts: Dict[str, str] = {}
+    for step in routine or []:
+        strings = [step.get('step')]
+        for product in step.get('products', []):
+            strings.extend((product.get('name'), product.get('description')))
+        for text in strings:
+            if isinstance(text, str) and text.strip():
+                texts[content_key(text)] = text
+    return texts
+
+
+class TranslationJob:
+    """Translate ``items`` (content_key -> English text) for one user's content type."""
+
+    def __init__(
+        self,
+        user_id: str,
+        content_type: str,
+        items: Dict[str, str],
+        languages: Sequence[str] = DEFAULT_LANGUAGES,
+        enqueued_at: Optional[float] = None,
+        attempts: int = 0,
+        job_id: Optional[int] = None
+    ):
+        self.user_id = user_id
+        self.content_type = content_type
+        self.items = dict(items)
+        self.languages = list(languages)
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        self.attempts = attempts
+        self.job_id = job_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'user_id': self.user_id,
+            'content_type': self.content_type,
+            'items': self.items,
+            'languages': self.languages,
+            'enqueued_at': self.enqueued_at,
+            'attempts': self.attempts
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], job_id: Optional[int] = None) -> "TranslationJob":
+        return cls(
+            data['user_id'], data['content_type'], data['items'], data.get('languages', DEFAULT_LANGUAGES),
+            enqueued_at=data.get('enqueued_at'), attempts=data.get('attempts', 0), job_id=job_id
+        )
+
+
+class MemoryJobQueue:
+    """In-process queue; jobs are lost when the process exits."""
+
+    def __init__(self):
+        self._pending: "deque[TranslationJob]" = deque()
+        self._delayed: List[Tuple[float, TranslationJob]] = []
+        self._in_flight: Dict[int, TranslationJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Call ``listener`` (from any thread) whenever a job is put."""
+        self._listeners.append(listener)
+
+    def put(self, job: TranslationJob) -> TranslationJob:
+        with self._lock:
+            job.job_id = next(self._ids)
+            self._pending.append(job)
+        for listener in self._listeners:
+            listener()
+        return job
+
+    def claim(self, max_jobs: int) -> List[TranslationJob]:
+        now = time.time()
+        with self._lock:
+            due = [job for available_at, job in self._delayed if available_at <= now]
+            if due:
+                self._delayed = [(t, job) for t, job in self._delayed if t > now]
+                self._pending.extend(due)
+            jobs = []
+            while self._pending and len(jobs) < max_jobs:
+                job = self._pending.popleft()
+                self._in_flight[job.job_id] = job
+                jobs.append(job)
+            return jobs
+
+    def ack(self, jobs: Iterable[TranslationJob]) -> None:
+        with self._lock:
+            for job in jobs:
+                self._in_flight.pop(job.job_id, None)
+
+    def retry(self, job: TranslationJob, delay: float) -> None:
+        with self._lock:
+            self._in_flight.pop(job.job_id, None)
+            job.attempts += 1
+            self._delayed.append((time.time() + delay, job))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = [*self._pending, *(job for _, job in self._delayed)]
+            return {
+                'depth': len(waiting),
+                'in_flight': len(self._in_flight),
+                'oldest_enqueued_at': min((job.enqueued_at for job in waiting), default=None)
+            }
+
+
+class SQLiteJobQueue:
+    """Queue in a SQLite file, shared by every process that opens it."""
+
+    def __init__(self, db_path: str, visibility_timeout: float = 300):
+        self.db_path = Path(db_path)
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translation_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    claimed_until REAL
+                )
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Puts from other processes are not signalled; workers poll."""
+
+    def put(self, job: TranslationJob) -> TranslationJob:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO translation_jobs (payload, enqueued_at, available_at) VALUES (?, ?, ?)",
+                (json.dumps(job.to_dict(), ensure_ascii=False), job.enqueued_at, job.enqueued_at)
+            )
+            job.job_id = cursor.lastrowid
+        return job
+
+    def claim(self, max_jobs: int) -> List[TranslationJob]:
+        now = time.time()
+        conn = self._connection()
+        # IMMEDIATE takes the write lock first, so two workers cannot claim the same rows
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, payload FROM translation_jobs "
+                "WHERE available_at <= ? AND (claimed_until IS NULL OR claimed_until < ?) "
+                "ORDER BY id LIMIT ?",
+                (now, now, max_jobs)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE translation_jobs SET claimed_until = ? WHERE id = ?",
+                [(now + self.visibility_timeout, job_id) for job_id, _ in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [TranslationJob.from_dict(json.loads(payload), job_id=job_id) for job_id, payload in rows]
+
+    def ack(self, jobs: Iterable[TranslationJob]) -> None:
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM translation_jobs WHERE id = ?", [(job.job_id,) for job in jobs])
+
+    def retry(self, job: TranslationJob, delay: float) -> None:
+        job.attempts += 1
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE translation_jobs SET payload = ?, available_at = ?, claimed_until = NULL WHERE id = ?",
+                (json.dumps(job.to_dict(), ensure_ascii=False), time.time() + delay, job.job_id)
+            )
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        depth, in_flight, oldest = self._connection().execute(
+            "SELECT "
+            "COALESCE(SUM(claimed_until IS NULL OR claimed_until < ?), 0), "
+            "COALESCE(SUM(claimed_until >= ?), 0), "
+            "MIN(CASE WHEN claimed_until IS NULL OR claimed_until < ? THEN enqueued_at END) "
+            "FROM translation_jobs",
+            (now, now, now)
+        ).fetchone()
+        return {'depth': depth, 'in_flight': in_flight, 'oldest_enqueued_at': oldest}
+
+
+class TranslationWorker:
+    """Drains a job queue on the running event loop (see module docstring)."""
+
+    def __init__(
+        self,
+        queue,
+        translator=None,
+        store=None,
+        max_concurrency: int = 2,
+        batch_size: int = 20,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0
+    ):
+        self.queue = queue
+        self._translator = translator
+        self._store = store
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.processed = 0
+        self.superseded = 0
+        self.failed = 0
+        self.last_batch_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    # Resolved on first use so importing this module does not open translations.db
+
+    @property
+    def translator(self):
+        if self._translator is None:
+            from app.utils.translation import translation_service
+            self._translator = translation_service
+        return self._translator
+
+    @property
+    def store(self):
+        if self._store is None:
+            from app.storage.translation_database import translation_db
+            self._store = translation_db
+        return self._store
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start draining the queue on the running event loop."""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        wake = self._wake = asyncio.Event()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+        self.queue.subscribe(notify)
+        self._task = loop.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            if not await self.run_once():
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self) -> int:
+        """Claim and process one batch; returns the number of jobs claimed."""
+        try:
+            jobs = await asyncio.to_thread(self.queue.claim, self.batch_size)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to claim translation jobs: {e}")
+            return 0
+        if jobs:
+            await self.process(jobs)
+        return len(jobs)
+
+    async def drain(self, wait_for_retries: bool = False) -> None:
+        """Process jobs until the queue has none ready, or with ``wait_for_retries`` none at all."""
+        while True:
+            if await self.run_once():
+                continue
+            if not wait_for_retries or not self.queue.status()['depth']:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def process(self, jobs: List[TranslationJob]) -> None:
+        """Translate and store a batch of claimed jobs, then ack or retry them."""
+        start = time.perf_counter()
+        latest: Dict[Tuple[str, str], TranslationJob] = {}
+        for job in sorted(jobs, key=lambda j: (j.enqueued_at, j.job_id or 0)):
+            latest[(job.user_id, job.content_type)] = job
+        current = list(latest.values())
+        superseded = [job for job in jobs if latest[(job.user_id, job.content_type)] is not job]
+
+        try:
+            entries = await self._translate(current)
+            await asyncio.to_thread(self.store.store_user_translations_batch, entries)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Translation batch of {len(current)} jobs failed: {e}")
+            for job in current:
+                if job.attempts + 1 >= self.max_attempts:
+                    self.failed += 1
+                    logger.error(f"Dropping translation job for user {job.user_id}, {job.content_type} "
+                                 f"after {job.attempts + 1} attempts")
+                    await asyncio.to_thread(self.queue.ack, [job])
+                else:
+                    await asyncio.to_thread(self.queue.retry, job, self.retry_delay * 2 ** job.attempts)
+            await asyncio.to_thread(self.queue.ack, superseded)
+            self.superseded += len(superseded)
+            return
+
+        await asyncio.to_thread(self.queue.ack, jobs)
+        self.processed += len(current)
+        self.superseded += len(superseded)
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+
+    async def _translate(self, jobs: List[TranslationJob]) -> List[Tuple[str, str, Dict[str, Dict[str, str]]]]:
+        """One translate_many call per language for every string in ``jobs``."""
+        by_language: Dict[str, List[str]] = {}
+        for job in jobs:
+            for language in job.languages:
+                if language != 'en':
+                    by_language.setdefault(language, []).extend(job.items.values())
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def translate(language: str, texts: List[str]) -> Tuple[str, Dict[str, str]]:
+            unique = list(dict.fromkeys(texts))
+            async with semaphore:
+                # Strict: a string Translate could not handle fails the batch so it is retried
+                translated = await asyncio.to_thread(self.translator.translate_many, unique, language, strict=True)
+            return language, dict(zip(unique, translated))
+
+        results = dict(await asyncio.gather(*(
+            translate(language, texts) for language, texts in by_language.items()
+        )))
+
+        entries = []
+        for job in jobs:
+            translations = {}
+            for key, text in job.items.items():
+                lang_translations = {'en': text}
+                for language in job.languages:
+                    translated = results.get(language, {}).get(text)
+                    if language != 'en' and translated:
+                        lang_translations[language] = translated
+                translations[key] = lang_translations
+            entries.append((job.user_id, job.content_type, translations))
+        return entries
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            queue_status = self.queue.status()
+        except Exception as e:
+            queue_status = {'depth': None, 'in_flight': None, 'oldest_enqueued_at': None, 'error': str(e)}
+        oldest = queue_status.pop('oldest_enqueued_at', None)
+        return {
+            'backend': type(self.queue).__name__,
+            'worker_running': self.running,
+            **queue_status,
+            'lag_seconds': max(0.0, time.time() - oldest) if oldest is not None else 0.0,
+            'processed': self.processed,
+            'superseded': self.superseded,
+            'failed': self.failed,
+            'last_batch_ms': self.last_batch_ms,
+            'last_error': self.last_error
+        }
+
+
+def enqueue(
+    user_id: str,
+    content_type: str,
+    items: Dict[str, str],
+    languages: Sequence[str] = DEFAULT_LANGUAGES
+) -> Optional[TranslationJob]:
+    """Queue translation of ``items`` for a user; never raises, as callers are request or commit paths."""
+    if not items:
+        return None
+    try:
+        return translation_worker.queue.put(TranslationJob(user_id, content_type, items, languages))
+    except Exception as e:
+        logger.error(f"Failed to enqueue translations for user {user_id}, {content_type}: {e}")
+        return None
+
+
+def _create_default_worker() -> TranslationWorker:
+    queue_url = os.getenv("TRANSLATION_QUEUE_URL", "")
+    if queue_url.startswith("sqlite:///"):
+        queue = SQLiteJobQueue(queue_url[len("sqlite:///"):])
+    else:
+        if queue_url:
+            logger.warning(f"Unsupported TRANSLATION_QUEUE_URL {queue_url!r}; using the in-process queue")
+        queue = MemoryJobQueue()
+    return TranslationWorker(
+        queue,
+        max_concurrency=int(os.getenv("TRANSLATION_WORKER_CONCURRENCY", "2")),
+        batch_size=int(os.getenv("TRANSLATION_WORKER_BATCH_SIZE", "20"))
+    )
+
+
+# Global instance
+translation_worker = _create_default_worker()
+
+
+# ORM hook: enqueue the strings of daily routines changed by each commit
+
+_SESSION_KEY = "translation_jobs_routines"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_routines(session, flush_context):
+    from app.models.computed_models import ComputedData
+    changed: Dict[str, Any] = session.info.setdefault(_SESSION_KEY, {})
+    for instance in (*session.new, *session.dirty):
+        if isinstance(instance, ComputedData) and instance.data_type == 'daily_routine':
+            changed[instance.user_id] = instance.data
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_changed_routines(session):
+    for user_id, routine in session.info.pop(_SESSION_KEY, {}).items():
+        enqueue(user_id, 'daily_routine', routine_texts(routine))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_routines(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+async def _run_standalone() -> None:
+    logger.info(f"Translation worker draining {translation_worker.status()['backend']}")
+    translation_worker.start()
+    await translation_worker._task
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_run_standalone())
+    except KeyboardInterrupt:
+        pass
@@ -5,8 +5,8 @@ Generates and stores translations for user content to avoid real-time translatio
 
 import logging
 from typing import Dict, List, Optional
-from app.utils.translation import translation_service
 from app.storage.translation_database import translation_db
+from app.services.translation_jobs import enqueue
 
 logger = logging.getLogger(__name__)
 
@@ -21,60 +21,27 @@ class TranslationPrecomputeService:
                                              insights: List[str], 
                                              recommendations: List[str]) -> None:
         """
-        Pre-compute translations for biological age insights and recommendations.
+        Queue translations for biological age insights and recommendations.
+        
+        The background translation worker translates them and stores them
+        under insight_<i> / recommendation_<i>; until then readers get English.
         
         Args:
             user_id: User identifier
             insights: List of insight texts in English
             recommendations: List of recommendation texts in English
         """
-        try:
-            # Pre-compute insight translations
-            if insights:
-                insight_translations = {}
-                for i, insight in enumerate(insights):
-                    content_key = f"insight_{i}"
-                    lang_translations = {'en': insight}  # Original English
-                    
-                    # Translate to other languages
-                    for lang_code in self.supported_languages:
-                        if lang_code != 'en':
-                            translated = translation_service.translate_text(insight, lang_code)
-                            lang_translations[lang_code] = translated
-                    
-                    insight_translations[content_key] = lang_translations
-                
-                # Store insight translations
-                translation_db.store_user_translations(
-                    user_id, 'insights', insight_translations
-                )
-            
-            # Pre-compute recommendation translations
-            if recommendations:
-                recommendation_translations = {}
-                for i, recommendation in enumerate(recommendations):
-                    content_key = f"recommendation_{i}"
-                    lang_translations = {'en': recommendation}  # Original English
-                    
-                    # Translate to other languages
-                    for lang_code in self.supported_languages:
-                        if lang_code != 'en':
-                            translated = translation_service.translate_text(recommendation, lang_code)
-                            lang_translations[lang_code] = translated
-                    
-                    recommendation_translations[content_key] = lang_translations
-                
-                # Store recommendation translations
-                translation_db.store_user_translations(
-                    user_id, 'recommendations', recommendation_translations
-                )
-            
-            logger.info(f"Pre-computed translations for user {user_id}: "
-                       f"{len(insights)} insights, {len(recommendations)} recommendations")
-            
-        except Exception as e:
-            logger.error(f"Failed to pre-compute translations for user {user_id}: {e}")
-            # Don't raise - this is a background operation
+        languages = [lang_code for lang_code in self.supported_languages if lang_code != 'en']
+        if insights:
+            enqueue(user_id, 'insights',
+                    {f"insight_{i}": insight for i, insight in enumerate(insights)}, languages)
+        if recommendations:
+            enqueue(user_id, 'recommendations',
+                    {f"recommendation_{i}": recommendation for i, recommendation in enumerate(recommendations)},
+                    languages)
+        
+        logger.info(f"Queued translations for user {user_id}: "
+                   f"{len(insights)} insights, {len(recommendations)} recommendations")
     
     def get_translated_content(self, user_id: str, content_type: str, 
                              original_content: List[str], language_code: str) -> List[str]:
@@ -165,11 +132,11 @@ class TranslationPrecomputeService:
             
             # Pre-compute missing translations
             if not has_insights and insights:
-                logger.info(f"Pre-computing insight translations for user {user_id}")
+                logger.info(f"Queueing insight translations for user {user_id}")
                 self.precompute_biological_age_translations(user_id, insights, [])
             
             if not has_recommendations and recommendations:
-                logger.info(f"Pre-computing recommendation translations for user {user_id}")
+                logger.info(f"Queueing recommendation translations for user {user_id}")
                 self.precompute_biological_age_translations(user_id, [], recommendations)
             
         except Exception as e:
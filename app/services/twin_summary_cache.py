@@ -0,0 +1,224 @@
+"""
+Process-wide cache of digital twin summaries used as chat context.
+
+Summaries are kept in a bounded LRU shared by every ContextBuilder in the
+process and are evicted when the user's data changes:
+
+- ORM commits that touch a user's rows (UserDBService sessions, the
+  compute_health_data pipeline, user creation) invalidate that user through
+  a SQLAlchemy ``after_commit`` hook installed by this module;
+- other writers, such as the digital twin data endpoints, call
+  ``twin_summary_cache.invalidate(user_id)`` directly.
+
+Each user has a version number held by a backend. The default backend keeps
+versions in process memory. ``RedisSummaryBackend`` keeps versions and
+summaries in Redis, so invalidations from any worker or from a separate
+pipeline process reach every worker. It is enabled by setting
+TWIN_SUMMARY_CACHE_REDIS_URL. Other caches of per-user derived data key
+their entries on ``twin_summary_cache.version(user_id)``.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.storage.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSummaryBackend:
+    """Versions in process memory; summaries are not shared beyond the local LRU."""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> int:
+        with self._lock:
+            version = self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return version
+
+    def load(self, user_id: str, version: int) -> Optional[Dict[str, Any]]:
+        return None
+
+    def store(self, user_id: str, version: int, summary: Dict[str, Any]) -> None:
+        pass
+
+
+class RedisSummaryBackend:
+    """
+    Versions and summaries in Redis, shared by all workers.
+
+    Summaries are stored under versioned keys, so bumping the version is the
+    whole invalidation; superseded entries expire after ``ttl_seconds``.
+    """
+
+    def __init__(self, client, prefix: str = "twin_summary", ttl_seconds: int = 1800):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisSummaryBackend":
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def version(self, user_id: str) -> int:
+        value = self.client.get(f"{self.prefix}:version:{user_id}")
+        return int(value) if value is not None else 0
+
+    def bump(self, user_id: str) -> int:
+        return int(self.client.incr(f"{self.prefix}:version:{user_id}"))
+
+    def load(self, user_id: str, version: int) -> Optional[Dict[str, Any]]:
+        value = self.client.get(f"{self.prefix}:{user_id}:{version}")
+        return json.loads(value) if value is not None else None
+
+    def store(self, user_id: str, version: int, summary: Dict[str, Any]) -> None:
+        self.client.set(
+            f"{self.prefix}:{user_id}:{version}",
+            json.dumps(summary, default=str),
+            ex=self.ttl_seconds or None
+        )
+
+
+class TwinSummaryCache:
+    """
+    Bounded LRU of summaries, validated against the backend's per-user version.
+
+    Returned summaries are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 1800, backend=None):
+        self.backend = backend or LocalSummaryBackend()
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.shared_hits = 0
+        self.invalidations = 0
+
+    def get_or_build(self, user_id: str, build: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Cached summary for ``user_id``, building and caching it on a miss (errors are not cached)."""
+        version = self._version(user_id)
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        summary = self._load_shared(user_id, version)
+        if summary is not None:
+            self.shared_hits += 1
+        else:
+            # Stored under the version read before building, so a concurrent
+            # invalidation makes this result stale rather than current
+            summary = build(user_id)
+            self._store_shared(user_id, version, summary)
+        self._cache.put(user_id, (version, summary))
+        return summary
+
+    def version(self, user_id: str) -> int:
+        """The user's data version; -1 while the backend is unavailable."""
+        return self._version(user_id)
+    
+    def invalidate(self, user_id: str) -> None:
+        self._cache.invalidate(user_id)
+        self.invalidations += 1
+        try:
+            self.backend.bump(user_id)
+        except Exception as e:
+            logger.warning(f"Could not publish summary invalidation for {user_id}: {e}")
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            'backend': type(self.backend).__name__,
+            'shared_hits': self.shared_hits,
+            'invalidations': self.invalidations
+        }
+
+    # A backend outage degrades to local caching instead of failing chat requests
+
+    def _version(self, user_id: str) -> int:
+        try:
+            return self.backend.version(user_id)
+        except Exception as e:
+            logger.warning(f"Summary cache backend unavailable: {e}")
+            return -1
+
+    def _load_shared(self, user_id: str, version: int) -> Optional[Dict[str, Any]]:
+        if version < 0:
+            return None
+        try:
+            return self.backend.load(user_id, version)
+        except Exception as e:
+            logger.warning(f"Summary cache backend unavailable: {e}")
+            return None
+
+    def _store_shared(self, user_id: str, version: int, summary: Dict[str, Any]) -> None:
+        if version < 0:
+            return
+        try:
+            self.backend.store(user_id, version, summary)
+        except Exception as e:
+            logger.warning(f"Summary cache backend unavailable: {e}")
+
+
+def _create_default_cache() -> TwinSummaryCache:
+    ttl_seconds = int(os.getenv("TWIN_SUMMARY_CACHE_TTL", "1800"))
+    backend = None
+    redis_url = os.getenv("TWIN_SUMMARY_CACHE_REDIS_URL")
+    if redis_url:
+        try:
+            backend = RedisSummaryBackend.from_url(redis_url, ttl_seconds=ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Redis summary cache backend disabled: {e}")
+    return TwinSummaryCache(
+        max_entries=int(os.getenv("TWIN_SUMMARY_CACHE_SIZE", "1000")),
+        ttl_seconds=ttl_seconds,
+        backend=backend
+    )
+
+
+# Global instance
+twin_summary_cache = _create_default_cache()
+
+
+# ORM invalidation hook: collect the users touched by each flush, evict them on commit
+
+_SESSION_KEY = "twin_summary_dirty_users"
+
+
+def _user_id_of(instance) -> Optional[str]:
+    from app.models.db_models import User
+    if isinstance(instance, User):
+        return instance.id
+    return getattr(instance, 'user_id', None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed: Set[str] = session.info.setdefault(_SESSION_KEY, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        user_id = _user_id_of(instance)
+        if isinstance(user_id, str):
+            changed.add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop(_SESSION_KEY, ()):
+        twin_summary_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -2,36 +2,124 @@
 Database service for querying user health data.
 """
 
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional
+from fastapi import Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from app.database import SessionLocal, get_db
 from app.models.db_models import User, Biomarker, MedicalHistory, Goal
+# Installs the commit hook that evicts cached chat summaries for users whose rows change
+import app.services.twin_summary_cache  # noqa: F401
 
 
 class UserDBService:
-    """Service for database operations on user data."""
+    """
+    Service for database operations on user data.
     
-    def __init__(self):
-        self.db: Session = SessionLocal()
+    Constructed with a session, the service works inside that unit of work
+    (one session per request). Constructed without one, every call opens and
+    closes its own short-lived session, so the shared global instance is safe
+    to use from concurrent requests.
+    """
+    
+    def __init__(self, db: Optional[Session] = None):
+        self.db: Optional[Session] = db
+    
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        """Yield the bound session, or a fresh one scoped to this call."""
+        if self.db is not None:
+            yield self.db
+            return
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
     
     def get_all_users(self) -> List[Dict[str, Any]]:
         """Get all users."""
-        users = self.db.query(User).all()
-        return [self._user_to_dict(u) for u in users]
+        with self._session() as db:
+            users = db.query(User).all()
+            return [self._user_to_dict(u) for u in users]
     
     def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID."""
-        user = self.db.query(User).filter(User.id == user_id).first()
-        return self._user_to_dict(user) if user else None
+        with self._session() as db:
+            user = db.query(User).filter(User.id == user_id).first()
+            return self._user_to_dict(user) if user else None
     
     def get_user_biomarkers(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all biomarkers for a user."""
-        biomarkers = self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()
-        return [self._biomarker_to_dict(b) for b in biomarkers]
+        with self._session() as db:
+            biomarkers = db.query(Biomarker).filter(Biomarker.user_id == user_id).all()
+            return [self._biomarker_to_dict(b) for b in biomarkers]
     
     def get_user_biomarkers_by_category(self, user_id: str) -> Dict[str, List[Dict]]:
         """Get biomarkers grouped by category."""
-        biomarkers = self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()
+        with self._session() as db:
+            biomarkers = db.query(Biomarker).filter(Biomarker.user_id == user_id).all()
+        return self._group_biomarkers(biomarkers)
+    
+    def get_user_medical_history(self, user_id: str) -> Dict[str, List[Dict]]:
+        """Get medical history grouped by type."""
+        with self._session() as db:
+            entries = db.query(MedicalHistory).filter(MedicalHistory.user_id == user_id).all()
+        return self._group_medical_history(entries)
+    
+    def get_user_goals(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get user goals."""
+        with self._session() as db:
+            goals = db.query(Goal).filter(Goal.user_id == user_id).all()
+            return [self._goal_to_dict(g) for g in goals]
+    
+    def get_user_full_data(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get complete user data."""
+        return self.get_users_full_data([user_id]).get(user_id)
+    
+    def get_users_full_data(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Bulk load complete data for many users, keyed by user id.
+        
+        Uses selectin eager loading, so the cost is four queries no matter how
+        many users are requested. Unknown ids are omitted from the result.
+        """
+        if not user_ids:
+            return {}
+        with self._session() as db:
+            users = (
+                db.query(User)
+                .options(
+                    selectinload(User.biomarkers),
+                    selectinload(User.medical_history),
+                    selectinload(User.goals),
+                )
+                .filter(User.id.in_(list(user_ids)))
+                .all()
+            )
+            return {u.id: self._full_data_to_dict(u) for u in users}
+    
+    def get_users_with_biomarker_counts(self) -> List[Dict[str, Any]]:
+        """Get all users with their biomarker count from one aggregate query."""
+        with self._session() as db:
+            rows = (
+                db.query(User, func.count(Biomarker.id))
+                .outerjoin(Biomarker, Biomarker.user_id == User.id)
+                .group_by(User.id)
+                .all()
+            )
+            return [dict(self._user_to_dict(u), biomarker_count=count) for u, count in rows]
+    
+    def _full_data_to_dict(self, user: User) -> Dict[str, Any]:
+        return {
+            'profile': self._user_to_dict(user),
+            'biomarkers': self._group_biomarkers(user.biomarkers),
+            'medical_history': self._group_medical_history(user.medical_history),
+            'goals': [self._goal_to_dict(g) for g in user.goals]
+        }
+    
+    def _group_biomarkers(self, biomarkers: List[Biomarker]) -> Dict[str, List[Dict]]:
         result = {}
         for b in biomarkers:
             cat = b.category or 'other'
@@ -40,9 +128,7 @@ class UserDBService:
             result[cat].append(self._biomarker_to_dict(b))
         return result
     
-    def get_user_medical_history(self, user_id: str) -> Dict[str, List[Dict]]:
-        """Get medical history grouped by type."""
-        entries = self.db.query(MedicalHistory).filter(MedicalHistory.user_id == user_id).all()
+    def _group_medical_history(self, entries: List[MedicalHistory]) -> Dict[str, List[Dict]]:
         result = {'conditions': [], 'supplements': [], 'medications': [], 'family_history': []}
         for e in entries:
             entry_dict = self._medical_to_dict(e)
@@ -56,24 +142,6 @@ class UserDBService:
                 result['family_history'].append(entry_dict)
         return result
     
-    def get_user_goals(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get user goals."""
-        goals = self.db.query(Goal).filter(Goal.user_id == user_id).all()
-        return [self._goal_to_dict(g) for g in goals]
-    
-    def get_user_full_data(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get complete user data."""
-        user = self.get_user(user_id)
-        if not user:
-            return None
-        
-        return {
-            'profile': user,
-            'biomarkers': self.get_user_biomarkers_by_category(user_id),
-            'medical_history': self.get_user_medical_history(user_id),
-            'goals': self.get_user_goals(user_id)
-        }
-    
     def _user_to_dict(self, user: User) -> Dict[str, Any]:
         return {
             'user_id': user.id,
@@ -116,8 +184,14 @@ class UserDBService:
         }
     
     def close(self):
-        self.db.close()
+        if self.db is not None:
+            self.db.close()
+
+
+def get_user_db_service(db: Session = Depends(get_db)) -> UserDBService:
+    """Dependency providing a UserDBService bound to the request's session."""
+    return UserDBService(db)
 
 
-# Global instance
+# Global instance (per-call sessions)
 user_db_service = UserDBService()
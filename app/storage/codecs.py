@@ -0,0 +1,285 @@
+"""
+Serialization codecs for digital twin rows.
+
+Rows written by a binary codec start with a 4-byte header: the magic ``DT``,
+the format version and the codec id. Rows without the header are the original
+nested-dict JSON documents and are always readable, so existing databases keep
+working and can be migrated lazily as rows are read.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, repeat
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.models.digital_twin import DigitalTwin, FieldState, HealthDataPoint, HealthDomain, HealthField
+
+MAGIC = b"DT"
+FORMAT_VERSION = 1
+HEADER_SIZE = 4
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def timestamp_to_micros(timestamp: datetime) -> Tuple[int, Optional[int]]:
+    """Split a timestamp into UTC epoch microseconds and its UTC offset in seconds (None if naive)."""
+    offset = timestamp.utcoffset()
+    if offset is None:
+        return (timestamp - _EPOCH) // _ONE_MICROSECOND, None
+    return (timestamp.replace(tzinfo=None) - offset - _EPOCH) // _ONE_MICROSECOND, int(offset.total_seconds())
+
+
+def micros_to_timestamp(micros: int, offset: Optional[int] = None) -> datetime:
+    """Inverse of timestamp_to_micros."""
+    timestamp = _EPOCH + timedelta(microseconds=micros)
+    if offset is None:
+        return timestamp
+    return (timestamp + timedelta(seconds=offset)).replace(tzinfo=timezone(timedelta(seconds=offset)))
+
+
+class TwinCodec(ABC):
+    """Base class for digital twin codecs."""
+
+    name = ""
+    codec_id = 0
+
+    @abstractmethod
+    def encode(self, digital_twin: DigitalTwin) -> bytes:
+        """Serialize a twin to the codec's payload (without the row header)."""
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> DigitalTwin:
+        """Rebuild a twin from a payload written by ``encode``."""
+
+
+class JSONCodec(TwinCodec):
+    """The original layout: one JSON object per domain, field and data point."""
+
+    name = "json"
+    codec_id = 0
+
+    def encode(self, digital_twin: DigitalTwin) -> bytes:
+        return self.encode_text(digital_twin).encode("utf-8")
+
+    def decode(self, payload: Union[bytes, str]) -> DigitalTwin:
+        data = json.loads(payload)
+
+        digital_twin = DigitalTwin(user_id=data['user_id'], metadata=data.get('metadata', {}))
+        digital_twin.created_at = datetime.fromisoformat(data['created_at'])
+        digital_twin.updated_at = datetime.fromisoformat(data['updated_at'])
+
+        for domain_name, domain_data in data.get('domains', {}).items():
+            domain = HealthDomain(domain_name=domain_data['domain_name'])
+            for field_name, field_data in domain_data.get('fields', {}).items():
+                field = HealthField(
+                    field_name=field_data['field_name'],
+                    field_type=field_data['field_type'],
+                    state=FieldState(field_data['state'])
+                )
+                for point_data in field_data.get('values', []):
+                    field.values.append(HealthDataPoint(
+                        value=point_data['value'],
+                        timestamp=datetime.fromisoformat(point_data['timestamp']),
+                        unit=point_data.get('unit'),
+                        metadata=point_data.get('metadata', {})
+                    ))
+                domain.fields[field_name] = field
+            digital_twin.domains[domain_name] = domain
+
+        return digital_twin
+
+    @staticmethod
+    def encode_text(digital_twin: DigitalTwin) -> str:
+        data = {
+            'user_id': digital_twin.user_id,
+            'created_at': digital_twin.created_at.isoformat(),
+            'updated_at': digital_twin.updated_at.isoformat(),
+            'metadata': digital_twin.metadata,
+            'domains': {}
+        }
+        for domain_name, domain in digital_twin.domains.items():
+            domain_data = {'domain_name': domain.domain_name, 'fields': {}}
+            for field_name, field in domain.fields.items():
+                domain_data['fields'][field_name] = {
+                    'field_name': field.field_name,
+                    'field_type': field.field_type,
+                    'state': field.state.value,
+                    'values': [
+                        {
+                            'value': point.value,
+                            'timestamp': point.timestamp.isoformat(),
+                            'unit': point.unit,
+                            'metadata': point.metadata
+                        }
+                        for point in field.values
+                    ]
+                }
+            data['domains'][domain_name] = domain_data
+        return json.dumps(data, ensure_ascii=False)
+
+
+class ColumnarCodec(TwinCodec):
+    """
+    Column-per-attribute layout with interned strings.
+
+    Each field stores its timestamps as delta-encoded epoch microseconds, its
+    values as one list, and its units either as a single string-table index or
+    one index per point. Point metadata is stored sparsely because it is almost
+    always empty. Timezone-aware timestamps keep their UTC offset in an extra
+    column that is only present when needed.
+    """
+
+    name = "columnar"
+    codec_id = 1
+
+    def encode(self, digital_twin: DigitalTwin) -> bytes:
+        strings: List[Any] = []
+        index: Dict[Any, int] = {}
+
+        def intern(value: Any) -> int:
+            position = index.get(value)
+            if position is None:
+                position = index[value] = len(strings)
+                strings.append(value)
+            return position
+
+        domains = []
+        for domain_name, domain in digital_twin.domains.items():
+            fields = []
+            for field_name, field in domain.fields.items():
+                points = field.values
+                micros = []
+                offsets = None
+                for i, point in enumerate(points):
+                    timestamp = point.timestamp
+                    if timestamp.tzinfo is None:
+                        micros.append((timestamp - _EPOCH) // _ONE_MICROSECOND)
+                        continue
+                    us, offset = timestamp_to_micros(timestamp)
+                    if offsets is None:
+                        offsets = [None] * len(points)
+                    offsets[i] = offset
+                    micros.append(us)
+
+                units = [intern(point.unit) for point in points]
+                if units and units.count(units[0]) == len(units):
+                    units = units[0]
+
+                metadata = {str(i): point.metadata for i, point in enumerate(points) if point.metadata}
+
+                column = [
+                    intern(field_name),
+                    intern(field.field_type),
+                    intern(field.state.value),
+                    [b - a for a, b in zip([0] + micros, micros)],
+                    [point.value for point in points],
+                    units,
+                    metadata or 0,
+                ]
+                if offsets is not None:
+                    column.append(offsets)
+                fields.append(column)
+            domains.append([intern(domain_name), fields])
+
+        data = {
+            'user_id': digital_twin.user_id,
+            'created_at': digital_twin.created_at.isoformat(),
+            'updated_at': digital_twin.updated_at.isoformat(),
+            'metadata': digital_twin.metadata,
+            'strings': strings,
+            'domains': domains
+        }
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, payload: bytes) -> DigitalTwin:
+        data = json.loads(payload)
+        strings = data['strings']
+
+        digital_twin = DigitalTwin(user_id=data['user_id'], metadata=data.get('metadata', {}))
+        digital_twin.created_at = datetime.fromisoformat(data['created_at'])
+        digital_twin.updated_at = datetime.fromisoformat(data['updated_at'])
+        states = {value: FieldState(value) for value in strings if isinstance(value, str) and value in _STATE_VALUES}
+
+        domains = {}
+        for domain_idx, fields_data in data['domains']:
+            domain = HealthDomain(domain_name=strings[domain_idx])
+            for column in fields_data:
+                name_idx, type_idx, state_idx, deltas, values, units, metadata = column[:7]
+                field = HealthField(strings[name_idx], strings[type_idx], states[strings[state_idx]])
+
+                timestamps = list(map(_EPOCH.__add__, map(timedelta, repeat(0), repeat(0), accumulate(deltas))))
+                if len(column) > 7:
+                    timestamps = [
+                        micros_to_timestamp(us, offset) if offset is not None else ts
+                        for ts, us, offset in zip(timestamps, accumulate(deltas), column[7])
+                    ]
+
+                unit_list = repeat(strings[units]) if isinstance(units, int) else map(strings.__getitem__, units)
+                field.values = list(map(HealthDataPoint, values, timestamps, unit_list))
+                if metadata:
+                    for position, point_metadata in metadata.items():
+                        point = field.values[int(position)]
+                        field.values[int(position)] = HealthDataPoint(point.value, point.timestamp, point.unit,
+                                                                      point_metadata)
+                domain.fields[field.field_name] = field
+            domains[domain.domain_name] = domain
+
+        digital_twin.domains = domains
+        return digital_twin
+
+
+_STATE_VALUES = {state.value for state in FieldState}
+
+_CODECS_BY_NAME: Dict[str, TwinCodec] = {}
+_CODECS_BY_ID: Dict[int, TwinCodec] = {}
+
+
+def register_codec(codec: TwinCodec) -> None:
+    """Make a codec available for writing by name and for reading by id."""
+    _CODECS_BY_NAME[codec.name] = codec
+    _CODECS_BY_ID[codec.codec_id] = codec
+
+
+def get_codec(name: str) -> TwinCodec:
+    try:
+        return _CODECS_BY_NAME[name]
+    except KeyError:
+        raise ValueError(f"Unknown digital twin codec '{name}' (available: {', '.join(_CODECS_BY_NAME)})")
+
+
+register_codec(JSONCodec())
+register_codec(ColumnarCodec())
+
+
+def encode_twin(digital_twin: DigitalTwin, codec: TwinCodec) -> Union[str, bytes]:
+    """
+    Encode a twin for storage.
+
+    The JSON codec writes the original header-less text so that databases
+    written with it stay readable by older releases.
+    """
+    if isinstance(codec, JSONCodec):
+        return codec.encode_text(digital_twin)
+    return MAGIC + bytes((FORMAT_VERSION, codec.codec_id)) + codec.encode(digital_twin)
+
+
+def stored_codec(data: Union[str, bytes]) -> Tuple[TwinCodec, Union[str, bytes]]:
+    """Identify the codec a stored row was written with; returns (codec, payload)."""
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        return _CODECS_BY_ID[JSONCodec.codec_id], data
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Truncated digital twin header")
+    version, codec_id = data[2], data[3]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported digital twin format version {version}")
+    codec = _CODECS_BY_ID.get(codec_id)
+    if codec is None:
+        raise ValueError(f"Unknown digital twin codec id {codec_id}")
+    return codec, data[HEADER_SIZE:]
+
+
+def decode_twin(data: Union[str, bytes]) -> DigitalTwin:
+    codec, payload = stored_codec(data)
+    return codec.decode(payload)
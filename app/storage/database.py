@@ -4,14 +4,18 @@ Provides SQLite-based persistent storage for digital twin data.
 """
 
 import sqlite3
+import threading
 import json
 import logging
-from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Any, Union
 from contextlib import contextmanager
 
-from app.models.digital_twin import DigitalTwin
+from app.models.digital_twin import DigitalTwin, FieldState, HealthDataPoint, HealthDomain
+from app.storage.codecs import (
+    decode_twin, encode_twin, get_codec, micros_to_timestamp, stored_codec, timestamp_to_micros
+)
 
 logger = logging.getLogger(__name__)
 
@@ -37,16 +41,44 @@ class DigitalTwinSerializationError(DatabaseError):
 
 
 class DigitalTwinDatabase:
-    """SQLite database manager for digital twin data."""
+    """
+    SQLite database manager for digital twin data.
+    
+    Twins are written with ``codec`` (see app.storage.codecs) and read with
+    whichever codec the row was written by. With ``migrate_on_read`` rows in
+    an older format are rewritten in the current one the first time they are
+    loaded.
     
-    def __init__(self, db_path: str = "digital_twins.db"):
+    With ``pooled`` each thread keeps one long-lived connection (WAL,
+    synchronous=NORMAL) so the sqlite3 statement cache survives between
+    calls; otherwise every operation opens and closes its own connection.
+    
+    Besides the per-user snapshot, single values can be appended to the
+    ``twin_datapoints`` table without touching the snapshot. Reads merge the
+    appended points in; once ``compact_after`` of them are pending (0 never)
+    a full read folds them back into the snapshot.
+    """
+    
+    def __init__(self, db_path: str = "digital_twins.db", codec: str = "columnar",
+                 migrate_on_read: bool = True, pooled: bool = True, timeout: float = 30,
+                 compact_after: int = 1000):
         self.db_path = Path(db_path)
+        self.codec = get_codec(codec)
+        self.migrate_on_read = migrate_on_read
+        self.compact_after = compact_after
+        self.pooled = pooled
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self._init_database()
     
     def _init_database(self) -> None:
         """Initialize the database schema if it doesn't exist."""
         try:
             with self._get_connection() as conn:
+                # WAL is a property of the database file, so setting it once is enough
+                conn.execute("PRAGMA journal_mode=WAL")
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS digital_twins (
                         user_id TEXT PRIMARY KEY,
@@ -63,19 +95,57 @@ class DigitalTwinDatabase:
                     ON digital_twins(updated_at)
                 """)
                 
+                # Values appended since the user's snapshot was last written
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS twin_datapoints (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id TEXT NOT NULL,
+                        domain TEXT NOT NULL,
+                        field TEXT NOT NULL,
+                        field_type TEXT NOT NULL,
+                        ts INTEGER NOT NULL,
+                        tz_offset INTEGER,
+                        value TEXT NOT NULL,
+                        unit TEXT,
+                        metadata TEXT,
+                        recorded_at TEXT NOT NULL
+                    )
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_twin_datapoints_user_domain
+                    ON twin_datapoints(user_id, domain)
+                """)
+                
                 conn.commit()
                 logger.info(f"Database initialized at {self.db_path}")
         except sqlite3.Error as e:
             logger.error(f"Failed to initialize database: {e}")
             raise DatabaseError(f"Database initialization failed: {e}")
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with cheap (WAL-safe) commits."""
+        # check_same_thread is off only so close() can run from the shutdown
+        # thread; each pooled connection is otherwise used by a single thread
+        conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, check_same_thread=not self.pooled)
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
     @contextmanager
     def _get_connection(self):
         """Get a database connection with proper error handling."""
         conn = None
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            conn.row_factory = sqlite3.Row  # Enable dict-like access
+            conn = self._thread_connection() if self.pooled else self._connect()
             yield conn
         except sqlite3.Error as e:
             if conn:
@@ -84,7 +154,22 @@ class DigitalTwinDatabase:
             raise DatabaseError(f"Database operation failed: {e}")
         finally:
             if conn:
+                if not self.pooled:
+                    conn.close()
+                elif conn.in_transaction:
+                    # Never leave a half-finished transaction on a reused connection
+                    conn.rollback()
+    
+    def close(self) -> None:
+        """Close every pooled connection; they are reopened on next use."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
                 conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to close digital twin database connection: {e}")
+        self._local = threading.local()
     
     def create_user(self, user_id: str, display_name: str) -> DigitalTwin:
         """Create a new user with an empty digital twin."""
@@ -98,72 +183,209 @@ class DigitalTwinDatabase:
         digital_twin = DigitalTwin(user_id=user_id)
         
         try:
-            digital_twin_json = self._serialize_digital_twin(digital_twin)
+            digital_twin_data = self._serialize_digital_twin(digital_twin)
             
             with self._get_connection() as conn:
-                # Check if user already exists
-                cursor = conn.execute(
-                    "SELECT user_id FROM digital_twins WHERE user_id = ?",
-                    (user_id,)
-                )
-                if cursor.fetchone():
-                    raise UserAlreadyExistsError(f"User '{user_id}' already exists")
-                
-                # Insert new user
-                conn.execute("""
+                cursor = conn.execute("""
                     INSERT INTO digital_twins (user_id, display_name, digital_twin_data)
                     VALUES (?, ?, ?)
-                """, (user_id, display_name, digital_twin_json))
+                    ON CONFLICT(user_id) DO NOTHING
+                """, (user_id, display_name, digital_twin_data))
+                if cursor.rowcount == 0:
+                    raise UserAlreadyExistsError(f"User '{user_id}' already exists")
                 
                 conn.commit()
                 logger.info(f"Created user '{user_id}' with display name '{display_name}'")
                 return digital_twin
                 
-        except sqlite3.IntegrityError:
-            raise UserAlreadyExistsError(f"User '{user_id}' already exists")
+        except UserAlreadyExistsError:
+            raise
         except Exception as e:
             logger.error(f"Failed to create user '{user_id}': {e}")
             raise DatabaseError(f"Failed to create user: {e}")
     
-    def get_digital_twin(self, user_id: str) -> Optional[DigitalTwin]:
-        """Retrieve a digital twin by user ID."""
+    def get_digital_twin(self, user_id: str, domains: Optional[Iterable[str]] = None) -> Optional[DigitalTwin]:
+        """
+        Retrieve a digital twin by user ID.
+        
+        With ``domains`` only those domains are loaded and returned. Such a
+        partial twin is for reading only and must not be saved back.
+        """
         try:
             with self._get_connection() as conn:
-                cursor = conn.execute(
-                    "SELECT digital_twin_data FROM digital_twins WHERE user_id = ?",
-                    (user_id,)
-                )
-                row = cursor.fetchone()
-                
-                if not row:
+                loaded = self._load_twin(conn, user_id, domains)
+                if loaded is None:
                     return None
                 
-                return self._deserialize_digital_twin(row['digital_twin_data'])
+                stored, digital_twin, last_point_id, point_count = loaded
+                if domains is not None:
+                    return digital_twin
+                
+                # The rewritten snapshot includes the merged points, so they are always folded in
+                if (self.compact_after and point_count >= self.compact_after) or \
+                        (self.migrate_on_read and stored_codec(stored)[0] is not self.codec):
+                    self._rewrite_row(conn, user_id, stored, digital_twin, compact_up_to=last_point_id)
+                return digital_twin
                 
         except Exception as e:
             logger.error(f"Failed to get digital twin for user '{user_id}': {e}")
             raise DatabaseError(f"Failed to retrieve digital twin: {e}")
     
-    def save_digital_twin(self, user_id: str, digital_twin: DigitalTwin) -> None:
-        """Save a digital twin to the database."""
+    def _load_twin(self, conn: sqlite3.Connection, user_id: str, domains: Optional[Iterable[str]] = None):
+        """Load the snapshot and merge appended points; returns (stored, twin, last_point_id, point_count)."""
+        row = conn.execute(
+            "SELECT digital_twin_data FROM digital_twins WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        if not row:
+            return None
+        
+        stored = row['digital_twin_data']
+        digital_twin = self._deserialize_digital_twin(stored)
+        
+        query = "SELECT * FROM twin_datapoints WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if domains is not None:
+            wanted = list(dict.fromkeys(domains))
+            digital_twin.domains = {name: domain for name, domain in digital_twin.domains.items() if name in wanted}
+            query += f" AND domain IN ({', '.join('?' * len(wanted))})"
+            params.extend(wanted)
+        points = conn.execute(query + " ORDER BY id", params).fetchall()
+        
+        if points:
+            self._merge_datapoints(digital_twin, points)
+            digital_twin.last_point_id = points[-1]['id']
+        return stored, digital_twin, digital_twin.last_point_id, len(points)
+    
+    @staticmethod
+    def _merge_datapoints(digital_twin: DigitalTwin, points: List[sqlite3.Row]) -> None:
+        """Apply appended rows to a twin, sorting each touched field once."""
+        touched = {}
+        for point in points:
+            domain = digital_twin.domains.get(point['domain'])
+            if domain is None:
+                domain = digital_twin.domains[point['domain']] = HealthDomain(domain_name=point['domain'])
+            field = domain.fields.get(point['field'])
+            if field is None:
+                domain.add_field(point['field'], point['field_type'])
+                field = domain.fields[point['field']]
+            field.values.append(HealthDataPoint(
+                value=json.loads(point['value']),
+                timestamp=micros_to_timestamp(point['ts'], point['tz_offset']),
+                unit=point['unit'],
+                metadata=json.loads(point['metadata']) if point['metadata'] else {}
+            ))
+            touched[id(field)] = field
+        
+        for field in touched.values():
+            field.values.sort(key=lambda x: x.timestamp)
+            field.state = FieldState.POPULATED
+        digital_twin.updated_at = max(digital_twin.updated_at, datetime.fromisoformat(points[-1]['recorded_at']))
+    
+    def append_datapoint(self, user_id: str, domain: str, field: str, value: Any,
+                         timestamp: Optional[datetime] = None, unit: Optional[str] = None,
+                         metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Record one value without rewriting the user's snapshot; returns the new point's id."""
+        return self._append_datapoints(user_id, [(domain, field, value, timestamp, unit, metadata)])
+    
+    def append_datapoints(self, user_id: str, points: Iterable[tuple]) -> int:
+        """
+        Append ``(domain, field, value, timestamp, unit, metadata)`` tuples in one
+        transaction. Cost is independent of the length of the user's history.
+        """
+        points = list(points)
+        self._append_datapoints(user_id, points)
+        return len(points)
+    
+    def has_datapoints_between(self, user_id: str, after_id: int, before_id: int) -> bool:
+        """Whether the user has appended points with ``after_id < id < before_id``."""
+        try:
+            with self._get_connection() as conn:
+                return conn.execute(
+                    "SELECT 1 FROM twin_datapoints WHERE user_id = ? AND id > ? AND id < ? LIMIT 1",
+                    (user_id, after_id, before_id)
+                ).fetchone() is not None
+        except Exception as e:
+            logger.error(f"Failed to check data points for user '{user_id}': {e}")
+            raise DatabaseError(f"Failed to check data points: {e}")
+    
+    def _append_datapoints(self, user_id: str, points: List[tuple]) -> int:
+        """Insert the points in one transaction; returns the id of the last one."""
+        recorded_at = datetime.now()
         try:
-            digital_twin_json = self._serialize_digital_twin(digital_twin)
+            rows = []
+            for domain, field, value, timestamp, unit, metadata in points:
+                micros, tz_offset = timestamp_to_micros(timestamp or recorded_at)
+                rows.append((
+                    user_id, domain, field, type(value).__name__, micros, tz_offset,
+                    json.dumps(value, ensure_ascii=False), unit,
+                    json.dumps(metadata, ensure_ascii=False) if metadata else None,
+                    recorded_at.isoformat()
+                ))
             
             with self._get_connection() as conn:
-                # Check if user exists
                 cursor = conn.execute(
-                    "SELECT user_id FROM digital_twins WHERE user_id = ?",
+                    "UPDATE digital_twins SET updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
                     (user_id,)
                 )
-                if not cursor.fetchone():
+                if cursor.rowcount == 0:
                     raise UserNotFoundError(f"User '{user_id}' not found")
                 
-                # Update digital twin data and timestamp
-                conn.execute("""
+                conn.executemany("""
+                    INSERT INTO twin_datapoints
+                        (user_id, domain, field, field_type, ts, tz_offset, value, unit, metadata, recorded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                conn.commit()
+                return last_id
+                
+        except UserNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to append data points for user '{user_id}': {e}")
+            raise DatabaseError(f"Failed to append data points: {e}")
+    
+    def compact_datapoints(self, user_ids: Optional[Iterable[str]] = None) -> int:
+        """Fold appended points into the snapshots of the given (default: all) users; returns users compacted."""
+        try:
+            with self._get_connection() as conn:
+                if user_ids is None:
+                    user_ids = [row['user_id'] for row in conn.execute("SELECT DISTINCT user_id FROM twin_datapoints")]
+                
+                compacted = 0
+                for user_id in user_ids:
+                    loaded = self._load_twin(conn, user_id)
+                    if loaded is None or not loaded[3]:
+                        continue
+                    stored, digital_twin, last_point_id, _ = loaded
+                    compacted += self._rewrite_row(conn, user_id, stored, digital_twin, compact_up_to=last_point_id)
+                return compacted
+                
+        except Exception as e:
+            logger.error(f"Failed to compact data points: {e}")
+            raise DatabaseError(f"Failed to compact data points: {e}")
+    
+    def save_digital_twin(self, user_id: str, digital_twin: DigitalTwin) -> None:
+        """Save a digital twin to the database."""
+        try:
+            digital_twin_data = self._serialize_digital_twin(digital_twin)
+            
+            with self._get_connection() as conn:
+                # Update digital twin data and timestamp; no row means no user
+                cursor = conn.execute("""
                     UPDATE digital_twins 
                     SET digital_twin_data = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE user_id = ?
-                """, (digital_twin_json, user_id))
+                """, (digital_twin_data, user_id))
+                if cursor.rowcount == 0:
+                    raise UserNotFoundError(f"User '{user_id}' not found")
+                
+                # The saved twin contains the points merged when it was loaded; later ones stay pending
+                conn.execute(
+                    "DELETE FROM twin_datapoints WHERE user_id = ? AND id <= ?",
+                    (user_id, digital_twin.last_point_id)
+                )
                 
                 conn.commit()
                 logger.debug(f"Saved digital twin for user '{user_id}'")
@@ -174,6 +396,41 @@ class DigitalTwinDatabase:
             logger.error(f"Failed to save digital twin for user '{user_id}': {e}")
             raise DatabaseError(f"Failed to save digital twin: {e}")
     
+    def save_many(self, digital_twins: Dict[str, DigitalTwin],
+                  display_names: Optional[Dict[str, str]] = None) -> int:
+        """
+        Upsert many digital twins in a single transaction.
+        
+        Users that do not exist yet are created with their entry in
+        ``display_names`` (default ``"User <id>"``). Returns the number of twins
+        written.
+        """
+        display_names = display_names or {}
+        try:
+            rows = [
+                (user_id, display_names.get(user_id) or f"User {user_id}", self._serialize_digital_twin(digital_twin))
+                for user_id, digital_twin in digital_twins.items()
+            ]
+            with self._get_connection() as conn:
+                conn.executemany("""
+                    INSERT INTO digital_twins (user_id, display_name, digital_twin_data)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        digital_twin_data = excluded.digital_twin_data,
+                        updated_at = CURRENT_TIMESTAMP
+                """, rows)
+                conn.executemany(
+                    "DELETE FROM twin_datapoints WHERE user_id = ? AND id <= ?",
+                    [(user_id, digital_twin.last_point_id) for user_id, digital_twin in digital_twins.items()]
+                )
+                conn.commit()
+                logger.debug(f"Saved {len(rows)} digital twins")
+                return len(rows)
+                
+        except Exception as e:
+            logger.error(f"Failed to save {len(digital_twins)} digital twins: {e}")
+            raise DatabaseError(f"Failed to save digital twins: {e}")
+    
     def list_users(self) -> List[Dict[str, Any]]:
         """List all users with their basic information."""
         try:
@@ -207,6 +464,7 @@ class DigitalTwinDatabase:
                     "DELETE FROM digital_twins WHERE user_id = ?",
                     (user_id,)
                 )
+                conn.execute("DELETE FROM twin_datapoints WHERE user_id = ?", (user_id,))
                 
                 deleted = cursor.rowcount > 0
                 conn.commit()
@@ -222,106 +480,49 @@ class DigitalTwinDatabase:
             logger.error(f"Failed to delete user '{user_id}': {e}")
             raise DatabaseError(f"Failed to delete user: {e}")
     
-    def _serialize_digital_twin(self, digital_twin: DigitalTwin) -> str:
-        """Serialize a digital twin to JSON string."""
+    def _serialize_digital_twin(self, digital_twin: DigitalTwin) -> Union[str, bytes]:
+        """Serialize a digital twin with the configured codec."""
         try:
-            # Convert digital twin to dictionary
-            data = {
-                'user_id': digital_twin.user_id,
-                'created_at': digital_twin.created_at.isoformat(),
-                'updated_at': digital_twin.updated_at.isoformat(),
-                'metadata': digital_twin.metadata,
-                'domains': {}
-            }
-            
-            # Serialize each domain
-            for domain_name, domain in digital_twin.domains.items():
-                domain_data = {
-                    'domain_name': domain.domain_name,
-                    'fields': {}
-                }
-                
-                # Serialize each field in the domain
-                for field_name, field in domain.fields.items():
-                    field_data = {
-                        'field_name': field.field_name,
-                        'field_type': field.field_type,
-                        'state': field.state.value,
-                        'values': []
-                    }
-                    
-                    # Serialize each data point
-                    for data_point in field.values:
-                        point_data = {
-                            'value': data_point.value,
-                            'timestamp': data_point.timestamp.isoformat(),
-                            'unit': data_point.unit,
-                            'metadata': data_point.metadata
-                        }
-                        field_data['values'].append(point_data)
-                    
-                    domain_data['fields'][field_name] = field_data
-                
-                data['domains'][domain_name] = domain_data
-            
-            return json.dumps(data, ensure_ascii=False)
-            
+            return encode_twin(digital_twin, self.codec)
         except Exception as e:
             logger.error(f"Failed to serialize digital twin: {e}")
             raise DigitalTwinSerializationError(f"Serialization failed: {e}")
     
-    def _deserialize_digital_twin(self, json_data: str) -> DigitalTwin:
-        """Deserialize a digital twin from JSON string."""
+    def _deserialize_digital_twin(self, data: Union[str, bytes]) -> DigitalTwin:
+        """Deserialize a digital twin written by any registered codec."""
         try:
-            data = json.loads(json_data)
-            
-            # Create digital twin with metadata
-            digital_twin = DigitalTwin(
-                user_id=data['user_id'],
-                metadata=data.get('metadata', {})
-            )
-            
-            # Set timestamps
-            digital_twin.created_at = datetime.fromisoformat(data['created_at'])
-            digital_twin.updated_at = datetime.fromisoformat(data['updated_at'])
-            
-            # Deserialize domains
-            for domain_name, domain_data in data.get('domains', {}).items():
-                # Import here to avoid circular imports
-                from app.models.digital_twin import HealthDomain, HealthField, HealthDataPoint, FieldState
-                
-                domain = HealthDomain(domain_name=domain_data['domain_name'])
-                
-                # Deserialize fields
-                for field_name, field_data in domain_data.get('fields', {}).items():
-                    field = HealthField(
-                        field_name=field_data['field_name'],
-                        field_type=field_data['field_type'],
-                        state=FieldState(field_data['state'])
-                    )
-                    
-                    # Deserialize data points
-                    for point_data in field_data.get('values', []):
-                        data_point = HealthDataPoint(
-                            value=point_data['value'],
-                            timestamp=datetime.fromisoformat(point_data['timestamp']),
-                            unit=point_data.get('unit'),
-                            metadata=point_data.get('metadata', {})
-                        )
-                        field.values.append(data_point)
-                    
-                    domain.fields[field_name] = field
-                
-                digital_twin.domains[domain_name] = domain
-            
-            return digital_twin
-            
+            return decode_twin(data)
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON data: {e}")
             raise DigitalTwinSerializationError(f"Invalid JSON: {e}")
         except KeyError as e:
-            logger.error(f"Missing required field in JSON: {e}")
+            logger.error(f"Missing required field in stored digital twin: {e}")
             raise DigitalTwinSerializationError(f"Missing field: {e}")
         except Exception as e:
             logger.error(f"Failed to deserialize digital twin: {e}")
-            raise DigitalTwinSerializationError(f"Deserialization failed: {e}")
\ No newline at end of file
+            raise DigitalTwinSerializationError(f"Deserialization failed: {e}")
+    
+    def _rewrite_row(self, conn: sqlite3.Connection, user_id: str, stored: Union[str, bytes],
+                     digital_twin: DigitalTwin, compact_up_to: int = 0) -> bool:
+        """
+        Rewrite a snapshot in the current codec, optionally folding in appended
+        points up to ``compact_up_to``. Skipped if the row changed since it was
+        read; returns whether it was rewritten.
+        """
+        try:
+            cursor = conn.execute(
+                "UPDATE digital_twins SET digital_twin_data = ? WHERE user_id = ? AND digital_twin_data = ?",
+                (encode_twin(digital_twin, self.codec), user_id, stored)
+            )
+            rewritten = cursor.rowcount > 0
+            if rewritten and compact_up_to:
+                conn.execute("DELETE FROM twin_datapoints WHERE user_id = ? AND id <= ?", (user_id, compact_up_to))
+            conn.commit()
+            if rewritten:
+                logger.debug(f"Rewrote digital twin for user '{user_id}' with codec '{self.codec.name}'")
+            return rewritten
+        except Exception as e:
+            # The row and its points are still readable as they are; try again next time
+            conn.rollback()
+            logger.warning(f"Failed to rewrite digital twin for user '{user_id}': {e}")
+            return False
@@ -1,5 +1,6 @@
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 from app.models.digital_twin import DigitalTwin
+from app.storage.database import UserNotFoundError
 from app.storage.persistent_storage import persistent_storage
 import logging
 
@@ -16,11 +17,11 @@ class DigitalTwinStorage:
         self._use_persistent = True
         logger.info("Initialized enhanced digital twin storage")
     
-    def get(self, user_id: str) -> Optional[DigitalTwin]:
-        """Get a digital twin by user ID."""
+    def get(self, user_id: str, domains: Optional[List[str]] = None) -> Optional[DigitalTwin]:
+        """Get a digital twin by user ID, optionally loading only some domains (read-only)."""
         if self._use_persistent:
             try:
-                return persistent_storage.get_digital_twin(user_id)
+                return persistent_storage.get_digital_twin(user_id, domains)
             except Exception as e:
                 logger.error(f"Persistent storage failed, falling back to in-memory: {e}")
                 self._use_persistent = False
@@ -47,6 +48,25 @@ class DigitalTwinStorage:
         # Fallback to in-memory storage
         _legacy_digital_twins[user_id] = digital_twin
     
+    def add_value(self, user_id: str, domain: str, field: str, value: Any,
+                  unit: Optional[str] = None, metadata: Dict[str, Any] = None) -> None:
+        """Add one value, creating the digital twin if it doesn't exist."""
+        if self._use_persistent:
+            try:
+                try:
+                    persistent_storage.add_data_point(user_id, domain, field, value, unit=unit, metadata=metadata)
+                except UserNotFoundError:
+                    persistent_storage.create_user_digital_twin(user_id, f"User {user_id}")
+                    persistent_storage.add_data_point(user_id, domain, field, value, unit=unit, metadata=metadata)
+                return
+            except Exception as e:
+                logger.error(f"Persistent storage failed, falling back to in-memory: {e}")
+                self._use_persistent = False
+        
+        # Fallback to in-memory storage
+        digital_twin = _legacy_digital_twins.setdefault(user_id, DigitalTwin(user_id=user_id))
+        digital_twin.set_value(domain, field, value, unit=unit, metadata=metadata)
+    
     def delete(self, user_id: str) -> bool:
         """Delete a digital twin."""
         if self._use_persistent:
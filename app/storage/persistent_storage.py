@@ -3,15 +3,30 @@ Persistent storage layer for digital twins with caching.
 """
 
 import logging
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
 from app.models.digital_twin import DigitalTwin
+from app.storage.cache import LRUCache
 from app.storage.database import DigitalTwinDatabase, UserNotFoundError, UserAlreadyExistsError
 from app.config.database import db_config
 
 logger = logging.getLogger(__name__)
 
+# Rough per-object costs used to keep the cache within its byte budget
+_FIELD_OVERHEAD_BYTES = 400
+_DATA_POINT_BYTES = 200
+
+
+def estimate_twin_bytes(digital_twin: DigitalTwin) -> int:
+    """Cheap approximation of a digital twin's in-memory footprint."""
+    total = 1024
+    for domain in digital_twin.domains.values():
+        for field in domain.fields.values():
+            total += _FIELD_OVERHEAD_BYTES + _DATA_POINT_BYTES * len(field.values)
+    return total
+
 
 class UserInfo:
     """Basic user information."""
@@ -25,27 +40,61 @@ class UserInfo:
 
 
 class PersistentDigitalTwinStorage:
-    """Persistent storage for digital twins with in-memory caching."""
+    """
+    Persistent storage for digital twins with in-memory caching.
+    
+    The cache is a bounded LRU (entry count, byte budget, optional TTL) that
+    holds private snapshots: twins are copied on the way in and on the way
+    out, so callers can mutate what they get without touching shared state.
+    Copies are cheap: data points are frozen and shared, and a field's value
+    list is only copied when one side writes to it. Changes only become
+    visible to others through save_digital_twin.
+    """
     
     def __init__(self, database: Optional[DigitalTwinDatabase] = None):
-        self.database = database or DigitalTwinDatabase(db_config.database_path)
-        self._cache: Dict[str, DigitalTwin] = {}
+        self.database = database or DigitalTwinDatabase(
+            db_config.database_path,
+            codec=db_config.codec,
+            migrate_on_read=db_config.migrate_on_read,
+            pooled=db_config.pooled_connections,
+            timeout=db_config.connection_timeout,
+            compact_after=db_config.compact_after
+        )
+        self._append_only = db_config.storage_mode == "datapoints"
+        self._cache = LRUCache(
+            max_entries=db_config.cache_size,
+            ttl_seconds=db_config.cache_ttl_seconds,
+            max_bytes=db_config.cache_max_bytes,
+            size_of=estimate_twin_bytes
+        )
         self._cache_enabled = db_config.enable_cache
-        self._max_cache_size = db_config.cache_size
+        # Guards cached twins, which add_data_point updates in place
+        self._lock = threading.RLock()
         logger.info(f"Initialized persistent storage with cache {'enabled' if self._cache_enabled else 'disabled'}")
     
-    def get_digital_twin(self, user_id: str) -> Optional[DigitalTwin]:
-        """Get a digital twin by user ID, using cache if available."""
+    def get_digital_twin(self, user_id: str, domains: Optional[List[str]] = None) -> Optional[DigitalTwin]:
+        """
+        Get a digital twin by user ID, using cache if available.
+        
+        In datapoints mode a cache miss with ``domains`` loads only those
+        domains (and does not cache them); the result may then be partial and
+        must not be saved back.
+        """
         if not user_id:
             return None
         
         # Try cache first
-        if self._cache_enabled and user_id in self._cache:
-            logger.debug(f"Cache hit for user '{user_id}'")
-            return self._cache[user_id]
+        if self._cache_enabled:
+            with self._lock:
+                cached = self._cache.get(user_id)
+                if cached is not None:
+                    logger.debug(f"Cache hit for user '{user_id}'")
+                    return cached.copy()
         
         # Load from database
         try:
+            if domains is not None and self._append_only:
+                return self.database.get_digital_twin(user_id, domains)
             digital_twin = self.database.get_digital_twin(user_id)
             if digital_twin and self._cache_enabled:
                 self._save_to_cache(user_id, digital_twin)
@@ -76,6 +125,57 @@ class PersistentDigitalTwinStorage:
             logger.error(f"Failed to save digital twin for user '{user_id}': {e}")
             raise
     
+    def add_data_point(self, user_id: str, domain: str, field: str, value: Any,
+                       timestamp: Optional[datetime] = None, unit: Optional[str] = None,
+                       metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record one value for a user.
+        
+        In datapoints mode this is a single appended row; otherwise the twin is
+        loaded, updated and saved. Raises UserNotFoundError for unknown users.
+        """
+        timestamp = timestamp or datetime.now()
+        
+        if not self._append_only:
+            digital_twin = self.get_digital_twin(user_id)
+            if digital_twin is None:
+                raise UserNotFoundError(f"User '{user_id}' not found")
+            digital_twin.set_value(domain, field, value, timestamp=timestamp, unit=unit, metadata=metadata)
+            self.save_digital_twin(user_id, digital_twin)
+            return
+        
+        point_id = self.database.append_datapoint(user_id, domain, field, value, timestamp, unit, metadata)
+        
+        if self._cache_enabled:
+            with self._lock:
+                cached = self._cache.get(user_id)
+                if cached is not None and self.database.has_datapoints_between(user_id, cached.last_point_id, point_id):
+                    # Another writer appended since the snapshot was cached; reload next time
+                    self._cache.invalidate(user_id)
+                elif cached is not None:
+                    # In place: copies handed out share the field's values only until this write
+                    cached.set_value(domain, field, value, timestamp=timestamp, unit=unit, metadata=metadata)
+                    cached.last_point_id = point_id
+                    self._cache.put(user_id, cached)  # refreshes its size estimate
+        
+        logger.debug(f"Appended {domain}.{field} for user '{user_id}'")
+    
+    def save_digital_twins(self, digital_twins: Dict[str, DigitalTwin],
+                           display_names: Optional[Dict[str, str]] = None) -> int:
+        """Save many digital twins in one transaction, creating missing users."""
+        now = datetime.now()
+        for digital_twin in digital_twins.values():
+            digital_twin.updated_at = now
+        
+        saved = self.database.save_many(digital_twins, display_names)
+        
+        if self._cache_enabled:
+            for user_id, digital_twin in digital_twins.items():
+                self._save_to_cache(user_id, digital_twin)
+        
+        logger.debug(f"Saved {saved} digital twins")
+        return saved
+    
     def create_user_digital_twin(self, user_id: str, display_name: str) -> DigitalTwin:
         """Create a new user with an empty digital twin."""
         if not db_config.validate_user_id(user_id):
@@ -135,8 +235,8 @@ class PersistentDigitalTwinStorage:
         
         try:
             # Remove from cache
-            if self._cache_enabled and user_id in self._cache:
-                del self._cache[user_id]
+            if self._cache_enabled:
+                self._cache.invalidate(user_id)
             
             # Delete from database
             deleted = self.database.delete_user(user_id)
@@ -155,18 +255,13 @@ class PersistentDigitalTwinStorage:
         return self.get_digital_twin(user_id) is not None
     
     def _save_to_cache(self, user_id: str, digital_twin: DigitalTwin) -> None:
-        """Save digital twin to cache with size management."""
+        """Cache a private snapshot of the twin; the LRU enforces the size limits."""
         if not self._cache_enabled:
             return
         
-        # Manage cache size (simple LRU-like behavior)
-        if len(self._cache) >= self._max_cache_size and user_id not in self._cache:
-            # Remove oldest entry (first in dict)
-            oldest_key = next(iter(self._cache))
-            del self._cache[oldest_key]
-            logger.debug(f"Evicted '{oldest_key}' from cache")
-        
-        self._cache[user_id] = digital_twin
+        snapshot = digital_twin.copy()
+        with self._lock:
+            self._cache.put(user_id, snapshot)
         logger.debug(f"Cached digital twin for user '{user_id}'")
     
     def clear_cache(self) -> None:
@@ -179,9 +274,8 @@ class PersistentDigitalTwinStorage:
         """Get cache statistics."""
         return {
             'enabled': self._cache_enabled,
-            'size': len(self._cache),
-            'max_size': self._max_cache_size,
-            'cached_users': list(self._cache.keys()) if self._cache_enabled else []
+            **self._cache.stats(),
+            'cached_users': self._cache.keys() if self._cache_enabled else []
         }
 
 
@@ -8,7 +8,7 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
@@ -143,25 +143,39 @@ class TranslationDatabase:
             content_type: Type of content ('insights', 'recommendations', 'health_status')
             translations: Dict with content_key -> {lang_code: translated_text}
         """
+        self.store_user_translations_batch([(user_id, content_type, translations)])
+    
+    def store_user_translations_batch(self, entries: List[Tuple[str, str, Dict[str, Dict[str, str]]]]) -> None:
+        """
+        Store translations for several users/content types in one transaction.
+        
+        Args:
+            entries: (user_id, content_type, translations) tuples, with translations
+                as accepted by store_user_translations
+        """
+        rows = [
+            (user_id, content_type, content_key, lang_code, lang_translations.get('en', ''), translated_text)
+            for user_id, content_type, translations in entries
+            for content_key, lang_translations in translations.items()
+            for lang_code, translated_text in lang_translations.items()
+        ]
+        if not rows:
+            return
         try:
             with self._get_connection() as conn:
-                for content_key, lang_translations in translations.items():
-                    original_text = lang_translations.get('en', '')
-                    
-                    for lang_code, translated_text in lang_translations.items():
-                        conn.execute("""
-                            INSERT OR REPLACE INTO user_translations 
-                            (user_id, content_type, content_key, language_code, 
-                             original_text, translated_text, updated_at)
-                            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                        """, (user_id, content_type, content_key, lang_code, 
-                              original_text, translated_text))
+                conn.executemany("""
+                    INSERT OR REPLACE INTO user_translations 
+                    (user_id, content_type, content_key, language_code, 
+                     original_text, translated_text, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, rows)
                 
                 conn.commit()
-                logger.info(f"Stored translations for user {user_id}, type {content_type}")
+                for user_id, content_type, _ in entries:
+                    logger.info(f"Stored translations for user {user_id}, type {content_type}")
                 
         except Exception as e:
-            logger.error(f"Failed to store translations for user {user_id}: {e}")
+            logger.error(f"Failed to store translations for {len(entries)} entries: {e}")
             raise
     
     def get_user_translations(self, user_id: str, content_type: str, 
@@ -220,6 +234,14 @@ class TranslationDatabase:
             logger.error(f"Failed to check translations for user {user_id}: {e}")
             return False
     
+    def version(self) -> tuple:
+        """Stamp of the database file, which changes on every commit from any process."""
+        try:
+            stat = self.db_path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return (0, 0)
+    
     def delete_user_translations(self, user_id: str) -> None:
         """Delete all translations for a user."""
         try:
@@ -0,0 +1,91 @@
+"""
+Minimal dependency-graph runner for multi-step computations
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class DagStep:
+    """A named unit of work with declared input and output resources."""
+
+    def __init__(self, name: str, func: Callable[..., Any],
+                 inputs: Iterable[str] = (), outputs: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+
+class DagRunner:
+    """
+    Orders steps by their declared inputs and outputs and runs them in waves.
+
+    A step depends on whichever step produces one of its inputs; inputs that no
+    step produces are treated as external. Steps in the same wave are
+    independent of each other and, with ``max_workers > 1``, run concurrently.
+    """
+
+    def __init__(self, steps: List[DagStep], max_workers: int = 1):
+        self.steps = steps
+        self.max_workers = max_workers
+        self.waves = self._plan(steps)
+        self.timings: Dict[str, float] = {}
+
+    @staticmethod
+    def _plan(steps: List[DagStep]) -> List[List[DagStep]]:
+        """Group steps into dependency waves (Kahn's algorithm)."""
+        producers = {}
+        for step in steps:
+            for resource in step.outputs:
+                if resource in producers:
+                    raise ValueError(
+                        f"Resource '{resource}' is produced by both '{producers[resource]}' and '{step.name}'"
+                    )
+                producers[resource] = step.name
+
+        depends_on = {
+            step.name: {producers[r] for r in step.inputs if r in producers and producers[r] != step.name}
+            for step in steps
+        }
+
+        waves = []
+        done = set()
+        remaining = list(steps)
+        while remaining:
+            ready = [s for s in remaining if depends_on[s.name] <= done]
+            if not ready:
+                raise ValueError(f"Dependency cycle between steps: {', '.join(s.name for s in remaining)}")
+            waves.append(ready)
+            done.update(s.name for s in ready)
+            remaining = [s for s in remaining if s.name not in done]
+        return waves
+
+    def run(self, *args, **kwargs) -> Dict[str, Any]:
+        """Call every step with the same arguments; return results keyed by step name."""
+        self.timings = {}
+        results = {}
+        for wave in self.waves:
+            if self.max_workers > 1 and len(wave) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(wave))) as pool:
+                    futures = {step.name: pool.submit(self._run_step, step, args, kwargs) for step in wave}
+                    for name, future in futures.items():
+                        results[name] = future.result()
+            else:
+                for step in wave:
+                    results[step.name] = self._run_step(step, args, kwargs)
+        return results
+
+    def _run_step(self, step: DagStep, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            return step.func(*args, **kwargs)
+        finally:
+            self.timings[step.name] = (time.perf_counter() - start) * 1000
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Render step timings (milliseconds) as a single line, slowest first."""
+    ordered = sorted(timings.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{name} {ms:.1f}ms" for name, ms in ordered)
@@ -2,7 +2,7 @@
 Database-backed translation service for user-specific content
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 import logging
@@ -49,48 +49,102 @@ class DatabaseTranslationService:
         Returns:
             Translated content
         """
+        return self.get_user_translations(user_id, [(content, content_type)], target_language, db)[0]
+    
+    def get_user_translations(
+        self,
+        user_id: str,
+        items: List[Tuple[str, str]],
+        target_language: str,
+        db: Session
+    ) -> List[str]:
+        """
+        Bulk version of get_user_translation
+        
+        Existing translations are fetched in one query, misses are translated
+        as one batch and stored in one transaction.
+        
+        Args:
+            user_id: User ID
+            items: (content, content_type) pairs
+            target_language: Target language code
+            db: Database session
+            
+        Returns:
+            Translated content for each item, in order
+        """
         # Return original if English or unsupported language
         if target_language == 'en' or target_language not in self.supported_languages:
-            return content
+            return [content for content, _ in items]
         
-        content_key = self._generate_content_key(content, content_type)
+        keys = [self._generate_content_key(content, content_type) for content, content_type in items]
+        translations = self._load_translations(user_id, keys, target_language, db)
         
-        # Try to get existing translation from database
-        existing_translation = db.query(UserTranslation).filter(
-            and_(
-                UserTranslation.user_id == user_id,
-                UserTranslation.content_key == content_key,
-                UserTranslation.language == target_language
-            )
-        ).first()
+        # One entry per missing key, in first-seen order
+        missing: Dict[str, Tuple[str, str]] = {}
+        for key, item in zip(keys, items):
+            if key not in translations:
+                missing.setdefault(key, item)
         
-        if existing_translation:
-            logger.debug(f"Found cached translation for user {user_id}, content_type {content_type}")
-            return existing_translation.translated_text
+        if missing:
+            try:
+                created = self._create_translations(user_id, missing, target_language, db)
+                translations.update(created)
+                logger.info(f"Created {len(created)} translations for user {user_id}, language {target_language}")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Translation failed for user {user_id}: {e}")
         
-        # Create new translation using AWS Translate
-        try:
-            translated_text = translation_service.translate_text(content, target_language)
-            
-            # Store in database for future use
-            new_translation = UserTranslation(
+        # Content without a stored translation is returned as is
+        return [translations.get(key, content) for key, (content, _) in zip(keys, items)]
+    
+    def _load_translations(self, user_id: str, keys: List[str], language: str, db: Session) -> Dict[str, str]:
+        """content_key -> translated_text for the keys already stored"""
+        unique_keys = list(dict.fromkeys(keys))
+        translations: Dict[str, str] = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique_keys), 500):
+            rows = db.query(UserTranslation.content_key, UserTranslation.translated_text).filter(
+                and_(
+                    UserTranslation.user_id == user_id,
+                    UserTranslation.language == language,
+                    UserTranslation.content_key.in_(unique_keys[start:start + 500])
+                )
+            ).all()
+            translations.update((key, text) for key, text in rows)
+        return translations
+    
+    def _create_translations(
+        self,
+        user_id: str,
+        missing: Dict[str, Tuple[str, str]],
+        language: str,
+        db: Session
+    ) -> Dict[str, str]:
+        """Translate ``missing`` (content_key -> (content, content_type)) in one batch and store the results."""
+        contents = [content for content, _ in missing.values()]
+        translated_texts = translation_service.translate_many(contents, language)
+        
+        created: Dict[str, str] = {}
+        rows = []
+        for (key, (content, content_type)), translated_text in zip(missing.items(), translated_texts):
+            # An unchanged string is usually a failed translation; it is not stored so it is retried
+            if translated_text == content:
+                continue
+            created[key] = translated_text
+            rows.append(UserTranslation(
                 user_id=user_id,
                 content_type=content_type,
-                content_key=content_key,
-                language=target_language,
+                content_key=key,
+                language=language,
                 original_text=content,
                 translated_text=translated_text
-            )
-            
-            db.add(new_translation)
+            ))
+        
+        if rows:
+            db.bulk_save_objects(rows)
             db.commit()
-            
-            logger.info(f"Created new translation for user {user_id}, content_type {content_type}, language {target_language}")
-            return translated_text
-            
-        except Exception as e:
-            logger.error(f"Translation failed for user {user_id}: {e}")
-            return content  # Return original on failure
+        return created
     
     def translate_user_content(
         self, 
@@ -118,19 +172,7 @@ class DatabaseTranslationService:
         if target_language == 'en':
             return data
         
-        translated_data = data.copy()
-        
-        for field in fields_to_translate:
-            if field in translated_data and isinstance(translated_data[field], str):
-                translated_data[field] = self.get_user_translation(
-                    user_id=user_id,
-                    content=translated_data[field],
-                    content_type=f"{content_type}_{field}",
-                    target_language=target_language,
-                    db=db
-                )
-        
-        return translated_data
+        return self.translate_user_list(user_id, [data], content_type, fields_to_translate, target_language, db)[0]
     
     def translate_user_list(
         self, 
@@ -158,17 +200,24 @@ class DatabaseTranslationService:
         if target_language == 'en':
             return data_list
         
-        return [
-            self.translate_user_content(
-                user_id=user_id,
-                data=item,
-                content_type=content_type,
-                fields_to_translate=fields_to_translate,
-                target_language=target_language,
-                db=db
-            )
-            for item in data_list
+        # Every field of every item is looked up, translated and stored together
+        translated_list = [item.copy() for item in data_list]
+        targets = [
+            (item, field)
+            for item in translated_list
+            for field in fields_to_translate
+            if field in item and isinstance(item[field], str)
         ]
+        translations = self.get_user_translations(
+            user_id,
+            [(item[field], f"{content_type}_{field}") for item, field in targets],
+            target_language,
+            db
+        )
+        for (item, field), translated in zip(targets, translations):
+            item[field] = translated
+        
+        return translated_list
     
     def precompute_user_translations(
         self, 
@@ -190,46 +239,28 @@ class DatabaseTranslationService:
             Number of translations created
         """
         translations_created = 0
+        keys = [self._generate_content_key(item['content'], item['content_type']) for item in content_items]
         
-        for item in content_items:
-            content = item['content']
-            content_type = item['content_type']
+        for lang in target_languages:
+            if lang == 'en':  # Skip English
+                continue
             
-            for lang in target_languages:
-                if lang == 'en':  # Skip English
-                    continue
-                
-                # Check if translation already exists
-                content_key = self._generate_content_key(content, content_type)
-                existing = db.query(UserTranslation).filter(
-                    and_(
-                        UserTranslation.user_id == user_id,
-                        UserTranslation.content_key == content_key,
-                        UserTranslation.language == lang
-                    )
-                ).first()
-                
-                if not existing:
-                    try:
-                        translated_text = translation_service.translate_text(content, lang)
-                        
-                        new_translation = UserTranslation(
-                            user_id=user_id,
-                            content_type=content_type,
-                            content_key=content_key,
-                            language=lang,
-                            original_text=content,
-                            translated_text=translated_text
-                        )
-                        
-                        db.add(new_translation)
-                        translations_created += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to precompute translation for user {user_id}: {e}")
+            # Check which translations already exist, in one query per language
+            existing = self._load_translations(user_id, keys, lang, db)
+            missing: Dict[str, Tuple[str, str]] = {}
+            for key, item in zip(keys, content_items):
+                if key not in existing:
+                    missing.setdefault(key, (item['content'], item['content_type']))
+            if not missing:
+                continue
+            
+            try:
+                translations_created += len(self._create_translations(user_id, missing, lang, db))
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to precompute translation for user {user_id}: {e}")
         
         if translations_created > 0:
-            db.commit()
             logger.info(f"Precomputed {translations_created} translations for user {user_id}")
         
         return translations_created
@@ -7,36 +7,41 @@ import boto3
 import json
 import os
 from typing import Dict, Optional, List
-from functools import lru_cache
 import logging
 
+from app.utils.translation_batch import BatchTranslator, TranslationCache, TranslationFailedError
+
 logger = logging.getLogger(__name__)
 
 class TranslationService:
-    def __init__(self):
+    def __init__(self, translate_client=None, cache_path: Optional[str] = None):
         """Initialize Amazon Translate client"""
+        # Supported languages
+        self.supported_languages = {
+            'en': 'English',
+            'hi': 'Hindi', 
+            'ta': 'Tamil'
+        }
+        
         try:
             # Initialize AWS Translate client
-            self.translate_client = boto3.client(
+            self.translate_client = translate_client or boto3.client(
                 'translate',
-                region_name='ap-south-1'  # Mumbai region for better latency
+                region_name=os.getenv('TRANSLATE_REGION', 'ap-south-1'),  # Mumbai region for better latency
+                endpoint_url=os.getenv('TRANSLATE_ENDPOINT_URL') or None
             )
-            
-            # Supported languages
-            self.supported_languages = {
-                'en': 'English',
-                'hi': 'Hindi', 
-                'ta': 'Tamil'
-            }
-            
-            # Cache for translations to reduce API calls
-            self._translation_cache = {}
-            
         except Exception as e:
             logger.error(f"Failed to initialize translation service: {e}")
             self.translate_client = None
+        
+        # Translations are shared by every worker through the on-disk cache
+        self.batch_translator = BatchTranslator(
+            self.translate_client,
+            TranslationCache(cache_path or os.getenv('TRANSLATION_CACHE_PATH', 'data/translation_cache.db')),
+            max_concurrency=int(os.getenv('TRANSLATE_MAX_CONCURRENCY', '8')),
+            requests_per_second=float(os.getenv('TRANSLATE_REQUESTS_PER_SECOND', '10'))
+        )
     
-    @lru_cache(maxsize=1000)
     def translate_text(self, text: str, target_language: str, source_language: str = 'en') -> str:
         """
         Translate text using Amazon Translate with caching
@@ -49,41 +54,34 @@ class TranslationService:
         Returns:
             Translated text or original text if translation fails
         """
+        return self.translate_many([text], target_language, source_language)[0]
+    
+    def translate_many(self, texts: List[str], target_language: str, source_language: str = 'en',
+                       strict: bool = False) -> List[str]:
+        """
+        Translate several strings with as few Amazon Translate calls as possible
+        
+        Args:
+            texts: Texts to translate (duplicates are translated once)
+            target_language: Target language code (hi, ta, en)
+            source_language: Source language code (default: en)
+            strict: Raise TranslationFailedError instead of falling back to the original text
+            
+        Returns:
+            Translations in the same order; original text where translation fails
+        """
         # Return original text if same language or translation not needed
         if source_language == target_language or target_language == 'en':
-            return text
+            return list(texts)
             
         # Check if translation service is available
         if not self.translate_client:
+            if strict:
+                raise TranslationFailedError("Translation service not available")
             logger.warning("Translation service not available, returning original text")
-            return text
-            
-        # Create cache key
-        cache_key = f"{source_language}:{target_language}:{text}"
+            return list(texts)
         
-        # Check cache first
-        if cache_key in self._translation_cache:
-            return self._translation_cache[cache_key]
-            
-        try:
-            # Call Amazon Translate
-            response = self.translate_client.translate_text(
-                Text=text,
-                SourceLanguageCode=source_language,
-                TargetLanguageCode=target_language
-            )
-            
-            translated_text = response['TranslatedText']
-            
-            # Cache the result
-            self._translation_cache[cache_key] = translated_text
-            
-            logger.info(f"Translated '{text[:50]}...' from {source_language} to {target_language}")
-            return translated_text
-            
-        except Exception as e:
-            logger.error(f"Translation failed for '{text}': {e}")
-            return text  # Return original text on failure
+        return self.batch_translator.translate_many(texts, target_language, source_language, strict=strict)
     
     def translate_dict(self, data: Dict, target_language: str, fields_to_translate: List[str]) -> Dict:
         """
@@ -100,16 +98,7 @@ class TranslationService:
         if target_language == 'en':
             return data
             
-        translated_data = data.copy()
-        
-        for field in fields_to_translate:
-            if field in translated_data and isinstance(translated_data[field], str):
-                translated_data[field] = self.translate_text(
-                    translated_data[field], 
-                    target_language
-                )
-                
-        return translated_data
+        return self.translate_list_of_dicts([data], target_language, fields_to_translate)[0]
     
     def translate_list_of_dicts(self, data_list: List[Dict], target_language: str, fields_to_translate: List[str]) -> List[Dict]:
         """
@@ -125,11 +114,20 @@ class TranslationService:
         """
         if target_language == 'en':
             return data_list
-            
-        return [
-            self.translate_dict(item, target_language, fields_to_translate)
-            for item in data_list
+        
+        # Every field of every item goes out in one batch
+        translated_list = [item.copy() for item in data_list]
+        targets = [
+            (item, field)
+            for item in translated_list
+            for field in fields_to_translate
+            if field in item and isinstance(item[field], str)
         ]
+        translations = self.translate_many([item[field] for item, field in targets], target_language)
+        for (item, field), translated in zip(targets, translations):
+            item[field] = translated
+        
+        return translated_list
     
     def get_language_from_header(self, accept_language_header: str) -> str:
         """
@@ -0,0 +1,295 @@
+"""
+Batched Amazon Translate client with a shared on-disk cache.
+
+``BatchTranslator.translate_many`` translates a list of strings with as few
+TranslateText calls as possible:
+
+- duplicates and strings already cached are translated once / not at all;
+- the remaining strings are packed into multi-segment requests (segments
+  joined by a blank line, up to ``max_request_bytes``) and the reply is
+  split on the same separator; if the segment count does not survive
+  translation, that batch is retried one string per request;
+- requests run concurrently on a thread pool, paced by a token-bucket
+  ``RateLimiter`` so bursts stay under the account's TranslateText quota.
+
+``TranslationCache`` is content-addressed: rows are keyed by
+``(source, target, sha256(text))`` in a SQLite file that every worker
+process opens, fronted by a per-process LRU. Failed translations fall back
+to the original text and are not cached; with ``strict=True`` they raise
+``TranslationFailedError`` instead, after the successful ones are cached.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.storage.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SEPARATOR = "\n\n"
+
+
+class TranslationFailedError(Exception):
+    """Some strings could not be translated (raised by ``strict`` calls only)."""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Translations keyed by (source, target, sha256(text)), shared through SQLite."""
+
+    def __init__(self, db_path: Optional[str] = None, memory_entries: int = 10000):
+        # Without a path only the in-process LRU is used
+        self.db_path = Path(db_path) if db_path else None
+        self._memory = LRUCache(max_entries=memory_entries)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing the translation service creates no files
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    source_language TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    translated_text TEXT NOT NULL,
+                    PRIMARY KEY (source_language, target_language, text_hash)
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, source: str, target: str, texts: Iterable[str]) -> Dict[str, str]:
+        """Cached translations for ``texts``; missing ones are absent from the result."""
+        found: Dict[str, str] = {}
+        missing: Dict[str, str] = {}
+        for text in texts:
+            translated = self._memory.get((source, target, text))
+            if translated is not None:
+                found[text] = translated
+            else:
+                missing[text_hash(text)] = text
+        if not missing or self.db_path is None:
+            return found
+
+        hashes = list(missing)
+        with self._lock:
+            conn = self._connection()
+            rows = []
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows.extend(conn.execute(
+                    f"SELECT text_hash, translated_text FROM translations "
+                    f"WHERE source_language = ? AND target_language = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    (source, target, *chunk)
+                ).fetchall())
+        for digest, translated in rows:
+            text = missing[digest]
+            found[text] = translated
+            self._memory.put((source, target, text), translated)
+        return found
+
+    def put_many(self, source: str, target: str, translations: Dict[str, str]) -> None:
+        for text, translated in translations.items():
+            self._memory.put((source, target, text), translated)
+        if not translations or self.db_path is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(source_language, target_language, text_hash, translated_text) VALUES (?, ?, ?, ?)",
+                [(source, target, text_hash(text), translated) for text, translated in translations.items()]
+            )
+            conn.commit()
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self.db_path is not None and self.db_path.exists():
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM translations")
+                conn.commit()
+
+    def stats(self) -> Dict[str, object]:
+        return {"memory": self._memory.stats(), "db_path": str(self.db_path) if self.db_path else None}
+
+
+class RateLimiter:
+    """Token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BatchTranslator:
+    """Deduplicating, packing, concurrent TranslateText client (see module docstring)."""
+
+    def __init__(
+        self,
+        client,
+        cache: Optional[TranslationCache] = None,
+        max_concurrency: int = 8,
+        requests_per_second: float = 10,
+        max_request_bytes: int = 9000
+    ):
+        self.client = client
+        self.cache = cache or TranslationCache()
+        self.max_request_bytes = max_request_bytes
+        self.limiter = RateLimiter(requests_per_second, burst=max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="translate")
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.segments = 0
+        self.split_mismatches = 0
+        self.failures = 0
+
+    def translate_many(self, texts: Sequence[str], target: str, source: str = "en", strict: bool = False) -> List[str]:
+        """
+        Translations of ``texts`` in order. A string that cannot be translated
+        is returned unchanged, or with ``strict`` raises TranslationFailedError.
+        """
+        if source == target or not texts:
+            return list(texts)
+
+        unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+        translations = self.cache.get_many(source, target, unique)
+        misses = [text for text in unique if text not in translations]
+
+        if misses:
+            batches = self._pack(misses)
+            if len(batches) == 1:
+                results = [self._translate_batch(batches[0], source, target)]
+            else:
+                results = list(self._executor.map(
+                    lambda batch: self._translate_batch(batch, source, target), batches
+                ))
+            fresh: Dict[str, str] = {}
+            for result in results:
+                fresh.update(result)
+            self.cache.put_many(source, target, fresh)
+            translations.update(fresh)
+
+            failed = len(misses) - len(fresh)
+            if strict and failed:
+                raise TranslationFailedError(f"{failed} of {len(unique)} strings could not be translated to '{target}'")
+
+        return [translations.get(text, text) for text in texts]
+
+    def translate(self, text: str, target: str, source: str = "en") -> str:
+        return self.translate_many([text], target, source)[0]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "requests": self.requests,
+            "segments": self.segments,
+            "split_mismatches": self.split_mismatches,
+            "failures": self.failures,
+            "cache": self.cache.stats()
+        }
+
+    def _pack(self, texts: List[str]) -> List[List[str]]:
+        """Group texts into requests under the size limit; texts containing the separator go alone."""
+        separator_bytes = len(SEGMENT_SEPARATOR.encode("utf-8"))
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_bytes = 0
+        for text in texts:
+            size = len(text.encode("utf-8"))
+            if SEGMENT_SEPARATOR in text.strip() or size >= self.max_request_bytes:
+                batches.append([text])
+                continue
+            if current and current_bytes + separator_bytes + size > self.max_request_bytes:
+                batches.append(current)
+                current, current_bytes = [], 0
+            current_bytes += size + (separator_bytes if current else 0)
+            current.append(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _translate_batch(self, batch: List[str], source: str, target: str) -> Dict[str, str]:
+        """Translations for the strings in one packed request (failed strings are left out)."""
+        if len(batch) == 1:
+            translated = self._call(batch[0], source, target)
+            return {batch[0]: translated} if translated is not None else {}
+
+        # Segments are sent stripped so their own edge whitespace cannot merge with the separator
+        stripped = [text.strip() for text in batch]
+        translated = self._call(SEGMENT_SEPARATOR.join(stripped), source, target)
+        if translated is not None:
+            parts = translated.split(SEGMENT_SEPARATOR)
+            if len(parts) == len(batch):
+                return {
+                    text: _restore_edges(text, part.strip())
+                    for text, part in zip(batch, parts)
+                }
+            with self._stats_lock:
+                self.split_mismatches += 1
+            logger.warning(f"Translated batch of {len(batch)} came back as {len(parts)} segments; retrying singly")
+
+        results: Dict[str, str] = {}
+        for text in batch:
+            results.update(self._translate_batch([text], source, target))
+        return results
+
+    def _call(self, text: str, source: str, target: str) -> Optional[str]:
+        self.limiter.acquire()
+        with self._stats_lock:
+            self.requests += 1
+            self.segments += text.count(SEGMENT_SEPARATOR) + 1
+        try:
+            response = self.client.translate_text(
+                Text=text,
+                SourceLanguageCode=source,
+                TargetLanguageCode=target
+            )
+            return response['TranslatedText']
+        except Exception as e:
+            with self._stats_lock:
+                self.failures += 1
+            logger.error(f"Translation failed for '{text[:50]}...': {e}")
+            return None
+
+
+def _restore_edges(original: str, translated: str) -> str:
+    """Put back the leading/trailing whitespace stripped before packing."""
+    stripped = original.strip()
+    if not stripped:
+        return original
+    start = original.index(stripped)
+    return original[:start] + translated + original[start + len(stripped):]
@@ -0,0 +1,135 @@
+"""
+Stress test: concurrent chat writers across worker processes.
+
+Starts --processes worker processes, each running --writers coroutines that
+save --messages messages apiece, spread over --sessions shared sessions, and
+record each message in the session manager, as uvicorn workers would.
+Afterwards it checks that every message is stored exactly once and that
+every session's message_count matches, then reports throughput.
+
+Usage:
+    python -m benchmarks.chat_concurrency [--processes 4] [--writers 8] [--messages 50] [--sessions 4]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import tempfile
+import time
+
+from app.services.chat.log_message_store import LogMessageStore
+from app.services.chat.message_store import MessageStore
+from app.services.chat.models import ChatSession, Message, MessageRole
+from app.services.chat.session_manager import SessionManager
+from app.services.chat.sqlite_session_manager import SQLiteSessionManager
+
+STORES = {"json": MessageStore, "log": LogMessageStore}
+SESSION_MANAGERS = {"json": SessionManager, "sqlite": SQLiteSessionManager}
+
+
+async def write(store_cls, manager_cls, data_dir: str, worker: int, writers: int, messages: int, sessions: int):
+    store = store_cls(data_dir)
+    manager = manager_cls(data_dir, message_store=store)
+
+    async def writer(w: int):
+        for i in range(messages):
+            session_id = f"s{(w + i) % sessions}"
+            content = f"p{worker}-w{w}-m{i}"
+            if not await store.save_message(Message(session_id=session_id, role=MessageRole.USER, content=content)):
+                raise RuntimeError(f"save failed for {content}")
+            await manager.record_message(session_id, preview=content)
+
+    await asyncio.gather(*(writer(w) for w in range(writers)))
+
+
+def worker_main(store_name: str, manager_name: str, data_dir: str, worker: int, writers: int, messages: int, sessions: int):
+    asyncio.run(write(
+        STORES[store_name], SESSION_MANAGERS[manager_name], data_dir, worker, writers, messages, sessions
+    ))
+
+
+async def verify(store_name: str, manager_name: str, data_dir: str, processes: int, writers: int,
+                 messages: int, sessions: int) -> list:
+    """Problems found in the stored data (empty when nothing was lost)."""
+    store = STORES[store_name](data_dir)
+    manager = SESSION_MANAGERS[manager_name](data_dir, message_store=store)
+    expected = {f"p{p}-w{w}-m{i}" for p in range(processes) for w in range(writers) for i in range(messages)}
+    problems = []
+
+    seen = []
+    for s in range(sessions):
+        session_id = f"s{s}"
+        stored = await store.get_messages(session_id)
+        seen.extend(m.content for m in stored)
+        if len({m.message_id for m in stored}) != len(stored):
+            problems.append(f"{session_id}: duplicate message ids")
+        session = await manager.get_session(session_id)
+        count = session.message_count if session else 0
+        if count != len(stored):
+            problems.append(f"{session_id}: message_count {count} != {len(stored)} stored")
+
+    missing = expected - set(seen)
+    if missing:
+        problems.append(f"{len(missing)} messages lost, e.g. {sorted(missing)[:3]}")
+    if len(seen) != len(set(seen)):
+        problems.append(f"{len(seen) - len(set(seen))} messages stored twice")
+    return problems
+
+
+async def create_sessions(manager_name: str, data_dir: str, sessions: int) -> None:
+    manager = SESSION_MANAGERS[manager_name](data_dir)
+    for s in range(sessions):
+        await manager._save_session(ChatSession(session_id=f"s{s}", user_id="stress"))
+
+
+def run(store_name: str, manager_name: str, processes: int, writers: int, messages: int, sessions: int) -> list:
+    data_dir = tempfile.mkdtemp(prefix=f"stress_chat_{store_name}_{manager_name}_")
+    asyncio.run(create_sessions(manager_name, data_dir, sessions))
+    # Stores are created before forking so the workers start from an existing index
+    STORES[store_name](data_dir)
+
+    start = time.perf_counter()
+    workers = [
+        multiprocessing.Process(
+            target=worker_main,
+            args=(store_name, manager_name, data_dir, p, writers, messages, sessions)
+        )
+        for p in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    problems = [f"worker exited with {p.exitcode}" for p in workers if p.exitcode != 0]
+    problems += asyncio.run(verify(store_name, manager_name, data_dir, processes, writers, messages, sessions))
+    total = processes * writers * messages
+    status = "ok" if not problems else "FAILED"
+    print(f"{store_name:>6} {manager_name:>8} {total:>9} {elapsed:>8.2f} {total / elapsed:>9.0f}  {status}")
+    for problem in problems:
+        print(f"         {problem}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=8, help="concurrent writers per process")
+    parser.add_argument("--messages", type=int, default=50, help="messages per writer")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--store", choices=sorted(STORES), action="append")
+    parser.add_argument("--session-manager", choices=sorted(SESSION_MANAGERS), action="append")
+    args = parser.parse_args()
+
+    print(f"{'store':>6} {'sessions':>8} {'messages':>9} {'time s':>8} {'msgs/s':>9}  result")
+    failed = False
+    for store_name in args.store or sorted(STORES):
+        for manager_name in args.session_manager or sorted(SESSION_MANAGERS):
+            failed |= bool(run(store_name, manager_name, args.processes, args.writers, args.messages, args.sessions))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: chat message storage, JSON session files vs segmented log.
+
+Appends N messages to one session with each store, then times reading the
+most recent 10 messages and a 50-message page from the middle.
+
+The JSON store rewrites the whole session per append, so it is limited to
+--json-messages (default 2000) to keep the run short; its per-append cost is
+reported at that history length.
+
+Usage:
+    python -m benchmarks.chat_message_store [--messages 10000] [--json-messages 2000]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from app.services.chat.log_message_store import LogMessageStore
+from app.services.chat.message_store import MessageStore
+from app.services.chat.models import Message, MessageRole
+
+CONTENT = "How does my LDL compare with last quarter, and should I change anything? " * 3
+
+
+async def fill(store, session_id: str, count: int) -> float:
+    """Append ``count`` messages; return the mean append latency in ms over the last 100."""
+    tail_start = None
+    for i in range(count):
+        if i == max(0, count - 100):
+            tail_start = time.perf_counter()
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        await store.save_message(Message(session_id=session_id, role=role, content=CONTENT))
+    return (time.perf_counter() - tail_start) * 1000 / min(count, 100)
+
+
+async def timed(coro_factory, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await coro_factory()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+async def run(messages: int, json_messages: int):
+    print(f"{'store':>6} {'history':>8} {'fill s':>8} {'append ms':>10} {'recent10 ms':>12} {'page50 ms':>10}")
+    for name, store, count in (
+        ("json", MessageStore(tempfile.mkdtemp(prefix="bench_chat_json_")), json_messages),
+        ("log", LogMessageStore(tempfile.mkdtemp(prefix="bench_chat_log_")), messages),
+    ):
+        start = time.perf_counter()
+        append_ms = await fill(store, "bench", count)
+        fill_s = time.perf_counter() - start
+        recent_ms = await timed(lambda: store.get_recent_messages("bench", count=10))
+        page_ms = await timed(lambda: store.get_messages("bench", limit=50, offset=count // 2))
+        print(f"{name:>6} {count:>8} {fill_s:>8.1f} {append_ms:>10.3f} {recent_ms:>12.3f} {page_ms:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--json-messages", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.json_messages))
+
+
+if __name__ == "__main__":
+    main()
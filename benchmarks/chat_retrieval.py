@@ -0,0 +1,99 @@
+"""
+Benchmark: BM25 retrieval latency and prompt size for chat context.
+
+Indexes --documents synthetic health records and chat turns for one user
+(word frequencies follow a Zipf distribution, so some query terms match a
+large share of the corpus), then reports:
+  - bulk indexing time and single-document (incremental) add latency,
+  - query latency percentiles over --queries mixed queries,
+  - prompt tokens for the top-k snippets vs listing every record.
+
+Usage:
+    python -m benchmarks.chat_retrieval [--documents 100000] [--queries 200] [--k 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.chat.context_window import estimate_tokens
+from app.services.chat.retrieval import RetrievalIndex
+
+MARKERS = [
+    "LDL cholesterol", "HDL cholesterol", "triglycerides", "HbA1c", "fasting glucose", "vitamin D",
+    "vitamin B12", "ferritin", "hemoglobin", "TSH", "free T4", "creatinine", "ALT", "AST", "uric acid",
+    "CRP", "homocysteine", "insulin", "sodium", "potassium", "calcium", "magnesium", "eGFR", "platelets",
+]
+STATUSES = ["normal", "high", "low", "borderline"]
+FILLER = [f"word{i}" for i in range(5000)]
+QUERIES = [
+    "how is my LDL cholesterol", "is my vitamin D still low", "what was my HbA1c trend",
+    "should I worry about ferritin and hemoglobin", "thyroid TSH free T4 results",
+    "kidney creatinine eGFR", "liver enzymes ALT AST", "word12 word7 insulin",
+]
+
+
+def make_document(rng: random.Random, i: int, weights) -> str:
+    marker = rng.choices(MARKERS, weights=weights)[0]
+    if i % 3:
+        return (f"Biomarker {marker} on 2024-{1 + i % 12:02d}-{1 + i % 28:02d}: "
+                f"{rng.uniform(1, 250):.1f} units, {rng.choice(STATUSES)} (reference range), Lab {i % 40}")
+    words = rng.choices(FILLER, weights=[1 / (rank + 1) for rank in range(len(FILLER))], k=20)
+    return f"User asked about {marker}: " + " ".join(words)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(documents: int, queries: int, k: int):
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(MARKERS))]
+    corpus = [(f"doc{i}", "record" if i % 3 else "chat:bench", make_document(rng, i, weights))
+              for i in range(documents)]
+
+    index = RetrievalIndex(os.path.join(tempfile.mkdtemp(prefix="bench_retrieval_"), "retrieval.db"))
+    start = time.perf_counter()
+    for offset in range(0, documents, 10000):
+        index.add_many("bench", corpus[offset:offset + 10000])
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(100):
+        index.add("bench", f"new{i}", "record", make_document(rng, i, weights))
+    add_ms = (time.perf_counter() - start) * 1000 / 100
+
+    latencies, prompt_tokens = [], []
+    for i in range(queries):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        results = index.search("bench", query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        prompt_tokens.append(sum(estimate_tokens(r['text']) for r in results))
+
+    records = [text for _, source, text in corpus if source == "record"]
+    full_listing = sum(estimate_tokens(text) for text in records)
+
+    print(f"documents: {documents}  bulk index: {build_s:.1f}s  incremental add: {add_ms:.3f} ms")
+    print(f"query latency (k={k}): p50 {percentile(latencies, 0.5):.2f} ms  "
+          f"p95 {percentile(latencies, 0.95):.2f} ms  max {max(latencies):.2f} ms")
+    print(f"prompt tokens: top-{k} snippets {statistics.mean(prompt_tokens):.0f}  "
+          f"vs all {len(records)} records {full_listing}")
+    index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    run(args.documents, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
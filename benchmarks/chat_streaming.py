@@ -0,0 +1,170 @@
+"""
+Benchmark: SSE chat streaming at many concurrent streams.
+
+Starts the chat router under uvicorn in a subprocess, with the chat service
+replaced by a fake LLM that emits --tokens tokens per response, one every
+--token-interval-ms, and opens --streams concurrent requests to
+POST /api/chat/sessions/{id}/messages. For each mode it reports:
+  - SSE events/s received and tokens/s delivered,
+  - server CPU ms per stream (from /proc, so Linux only),
+  - p95 time to first token.
+
+Modes: "per-token" sends one SSE event per token (coalescing off);
+"coalesced" merges tokens into frames per the router's sse config.
+
+Usage:
+    python -m benchmarks.chat_streaming [--streams 500] [--tokens 200] [--token-interval-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+EVENT_MARKER = b"data: "
+TOKEN_MARKER = b"ldl"
+
+
+class FakeChatService:
+    """Streams a fixed response, paced like a model generating tokens."""
+
+    def __init__(self, tokens: int, interval: float):
+        self.tokens = tokens
+        self.interval = interval
+
+    async def send_message(self, user_id, session_id, message):
+        from app.services.chat.models import StreamEvent, StreamEventType
+
+        parts = []
+        for i in range(self.tokens):
+            await asyncio.sleep(self.interval)
+            text = f"ldl{i % 10} "
+            parts.append(text)
+            yield StreamEvent(event_type=StreamEventType.TOKEN, data=text)
+        yield StreamEvent(event_type=StreamEventType.COMPLETE, data="".join(parts))
+
+
+def create_app():
+    """App factory for the server subprocess, configured through BENCH_* variables."""
+    # The JSON backends leave existing chat data as it is (the SQLite session backend would import it)
+    os.environ.setdefault("CHAT_SESSION_BACKEND", "json")
+    os.environ.setdefault("CHAT_MESSAGE_BACKEND", "json")
+    from fastapi import FastAPI
+    from app.routers import chat as chat_router
+
+    chat_router.chat_service = FakeChatService(
+        int(os.environ["BENCH_TOKENS"]), float(os.environ["BENCH_TOKEN_INTERVAL"])
+    )
+    chat_router.stream_config["coalesce"] = os.environ["BENCH_COALESCE"] == "1"
+    app = FastAPI()
+    app.include_router(chat_router.router)
+    return app
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def one_stream(port: int, i: int) -> dict:
+    """One request over a raw socket; frames are counted in the bytes, so the client stays cheap."""
+    body = json.dumps({"message": "How is my LDL?"}).encode()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start = time.perf_counter()
+    writer.write(
+        f"POST /api/chat/sessions/s{i}/messages?user_id=bench HTTP/1.1\r\nHost: bench\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+    stats = {"events": 0, "tokens": 0, "first_token": None}
+    # Each count keeps the bytes a marker split across reads could start with
+    events_tail = tokens_tail = b""
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            break
+        data = events_tail + chunk
+        stats["events"] += data.count(EVENT_MARKER)
+        events_tail = data[-(len(EVENT_MARKER) - 1):]
+        data = tokens_tail + chunk
+        stats["tokens"] += data.count(TOKEN_MARKER)
+        tokens_tail = data[-(len(TOKEN_MARKER) - 1):]
+        if stats["first_token"] is None and stats["tokens"]:
+            stats["first_token"] = time.perf_counter() - start
+    writer.close()
+    # The COMPLETE event repeats every token; count the streamed ones only
+    stats["tokens"] //= 2
+    return stats
+
+
+async def load(port: int, streams: int) -> dict:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_stream(port, i) for i in range(streams)))
+    elapsed = time.perf_counter() - start
+    first_tokens = sorted(r["first_token"] for r in results if r["first_token"] is not None)
+    return {
+        "elapsed": elapsed,
+        "events_per_s": sum(r["events"] for r in results) / elapsed,
+        "tokens_per_s": sum(r["tokens"] for r in results) / elapsed,
+        "ttft_p95_ms": first_tokens[int(len(first_tokens) * 0.95) - 1] * 1000 if first_tokens else float("nan"),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_mode(coalesce: bool, streams: int, tokens: int, token_interval: float) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ, PYTHONPATH=os.getcwd(), BENCH_TOKENS=str(tokens),
+        BENCH_TOKEN_INTERVAL=str(token_interval), BENCH_COALESCE="1" if coalesce else "0"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.chat_streaming:create_app", "--factory",
+         "--port", str(port), "--log-level", "warning", "--backlog", str(streams * 2)],
+        env=env
+    )
+    try:
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+        cpu_start = cpu_seconds(server.pid)
+        result = asyncio.run(load(port, streams))
+        result["cpu_ms_per_stream"] = (cpu_seconds(server.pid) - cpu_start) * 1000 / streams
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(streams: int, tokens: int, token_interval: float):
+    print(f"{streams} streams x {tokens} tokens, one token every {token_interval * 1000:g} ms")
+    print(f"{'mode':>10} {'time s':>8} {'events/s':>10} {'tokens/s':>10} {'server cpu ms/stream':>21} {'ttft p95 ms':>12}")
+    for mode, coalesce in (("per-token", False), ("coalesced", True)):
+        result = run_mode(coalesce, streams, tokens, token_interval)
+        print(f"{mode:>10} {result['elapsed']:>8.2f} {result['events_per_s']:>10.0f} {result['tokens_per_s']:>10.0f}"
+              f" {result['cpu_ms_per_stream']:>21.2f} {result['ttft_p95_ms']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-interval-ms", type=float, default=20)
+    args = parser.parse_args()
+    run(args.streams, args.tokens, args.token_interval_ms / 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load benchmark for GET /api/db/users/{id}/biomarkers.
+
+Seeds a throwaway SQLite database with synthetic users, then starts N worker
+processes (the equivalent of ``uvicorn --workers N``). Each worker mounts the
+database router on a bare FastAPI app with its own engine and pool and keeps
+``--concurrency`` requests in flight. Reports aggregate requests/sec per
+worker count.
+
+Usage:
+    python -m benchmarks.db_users_throughput --users 50 --requests 4000 --workers 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_db_users_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_tmp_dir) / 'bench.db'}")
+# Measure the database path, not translated response cache hits
+os.environ.setdefault("TRANSLATED_RESPONSE_CACHE_SIZE", "0")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.database import SessionLocal, init_db  # noqa: E402
+from app.models.db_models import User, Biomarker  # noqa: E402
+from app.models import computed_models  # noqa: E402,F401  (registers computed_data table)
+from app.routers.db_users import router as db_users_router  # noqa: E402
+
+CATEGORIES = ["lipids", "metabolic", "vitamins", "kidney", "liver", "thyroid"]
+
+
+def seed(user_count: int, biomarkers_per_user: int) -> list:
+    """Create synthetic users with biomarkers and return their ids."""
+    init_db()
+    db = SessionLocal()
+    user_ids = []
+    try:
+        for i in range(user_count):
+            user_id = f"bench_user_{i:04d}"
+            user_ids.append(user_id)
+            db.add(User(id=user_id, age=30 + i % 40, gender="F" if i % 2 else "M", data_source="bench"))
+            for j in range(biomarkers_per_user):
+                db.add(Biomarker(
+                    user_id=user_id,
+                    name=f"marker_{j}",
+                    value=random.uniform(1, 200),
+                    unit="mg/dL",
+                    normal_range="1-100",
+                    status=random.choice(["normal", "high", "low"]),
+                    category=CATEGORIES[j % len(CATEGORIES)],
+                ))
+        db.commit()
+    finally:
+        db.close()
+    return user_ids
+
+
+async def drive(app: FastAPI, user_ids: list, concurrency: int, requests: int) -> int:
+    """Issue ``requests`` requests with ``concurrency`` in flight; return the count sent."""
+    transport = httpx.ASGITransport(app=app)
+    per_client = max(1, requests // concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def client_loop():
+            for _ in range(per_client):
+                response = await client.get(f"/api/db/users/{random.choice(user_ids)}/biomarkers")
+                response.raise_for_status()
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return per_client * concurrency
+
+
+def worker_main(args) -> int:
+    """Entry point for one worker process."""
+    user_ids, concurrency, requests, start_barrier = args
+    app = FastAPI()
+    app.include_router(db_users_router)
+    start_barrier.wait()
+    return asyncio.run(drive(app, user_ids, concurrency, requests))
+
+
+def run_level(user_ids: list, workers: int, concurrency: int, total_requests: int) -> float:
+    """Run ``total_requests`` across ``workers`` processes and return aggregate req/s."""
+    manager = multiprocessing.Manager()
+    barrier = manager.Barrier(workers + 1)
+    per_worker = max(1, total_requests // workers)
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = pool.map_async(worker_main, [(user_ids, concurrency, per_worker, barrier)] * workers)
+        barrier.wait()
+        start = time.perf_counter()
+        sent = sum(pending.get())
+        elapsed = time.perf_counter() - start
+
+    manager.shutdown()
+    return sent / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--biomarkers", type=int, default=40, help="biomarkers per user")
+    parser.add_argument("--requests", type=int, default=4000, help="requests per worker count")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma separated worker process counts")
+    parser.add_argument("--concurrency", type=int, default=4, help="in-flight requests per worker")
+    args = parser.parse_args()
+
+    print(f"Seeding {args.users} users x {args.biomarkers} biomarkers into {os.environ['DATABASE_URL']}")
+    user_ids = seed(args.users, args.biomarkers)
+
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        rps = run_level(user_ids, workers, args.concurrency, args.requests)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.1f} {rps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
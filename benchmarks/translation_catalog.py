@@ -0,0 +1,124 @@
+"""
+Benchmark: translating a 500-biomarker GET /api/db/users/{id}/biomarkers response.
+
+Runs the endpoint's translation step on a synthetic response (biomarkers
+spread over six categories, a mix of names with and without catalog keys)
+in each language and reports microseconds per response for:
+  - "nested": the previous per-key walk of the nested JSON (three lookups
+    per biomarker, recursing to English on a miss),
+  - "catalog": the compiled catalog, one ``translate`` call per key,
+  - "endpoint": the endpoint's payload builder, which collects the
+    distinct keys and makes one ``translate_many`` call.
+
+Usage:
+    python -m benchmarks.translation_catalog [--biomarkers 500] [--repeat 200]
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+from app.middleware.translation import TRANSLATIONS_DIR
+from app.middleware.translation_catalog import TranslationCatalog
+from app.routers.db_users import build_biomarkers_response
+
+CATEGORIES = ["cardiovascular", "metabolic", "lipids", "vitamins", "hormonal", "liver"]
+NAMES = ["Cholesterol", "BMI", "Heart Rate", "Blood Sugar", "HbA1c", "Vitamin D", "TSH", "ALT"]
+STATUSES = ["normal", "high", "low", "borderline"]
+
+
+def build_response(count: int) -> dict:
+    biomarkers = {category: [] for category in CATEGORIES}
+    for i in range(count):
+        biomarkers[CATEGORIES[i % len(CATEGORIES)]].append({
+            "name": NAMES[i % len(NAMES)] if i % 3 else f"{NAMES[i % len(NAMES)]} {i}",
+            "value": i * 0.5,
+            "unit": "mg/dL",
+            "status": STATUSES[i % len(STATUSES)],
+        })
+    return biomarkers
+
+
+def nested_translate(translations, key, language):
+    if language not in translations:
+        language = 'en'
+    value = translations[language]
+    try:
+        for k in key.split('.'):
+            value = value[k]
+        return value
+    except (KeyError, TypeError):
+        if language != 'en':
+            return nested_translate(translations, key, 'en')
+        return key
+
+
+def translate_per_key(biomarkers, t):
+    """The endpoint's translation loop as it was, one lookup per key"""
+    translated_biomarkers = {}
+    for category, markers in biomarkers.items():
+        translated_category = t(f"health.categories.{category}")
+        translated_markers = []
+        for marker in markers:
+            translated_marker = marker.copy()
+            biomarker_key = marker['name'].lower().replace(' ', '').replace('-', '')
+            translated_name = t(f"health.biomarkers.{biomarker_key}")
+            if translated_name != f"health.biomarkers.{biomarker_key}":
+                translated_marker['name'] = translated_name
+            status_key = marker['status'].lower()
+            translated_status = t(f"health.status.{status_key}")
+            if translated_status != f"health.status.{status_key}":
+                translated_marker['status_label'] = translated_status
+            translated_markers.append(translated_marker)
+        translated_biomarkers[translated_category] = translated_markers
+    return translated_biomarkers
+
+
+class FakeUserDBService:
+    def __init__(self, biomarkers):
+        self.biomarkers = biomarkers
+
+    def get_user_biomarkers_by_category(self, user_id):
+        return self.biomarkers
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(count: int, repeat: int):
+    catalog = TranslationCatalog(TRANSLATIONS_DIR)
+    sources = catalog.sources
+    biomarkers = build_response(count)
+    service = FakeUserDBService(biomarkers)
+
+    print(f"{count} biomarkers, mean of {repeat} runs")
+    print(f"{'lang':>5} {'nested us':>10} {'catalog us':>11} {'endpoint us':>12} {'speedup':>8}")
+    for language in ("hi", "ta"):
+        request = SimpleNamespace(state=SimpleNamespace(language=language))
+        expected = translate_per_key(biomarkers, lambda key: nested_translate(sources, key, language))
+        response = build_biomarkers_response("bench", request, service)
+        assert response["biomarkers"] == expected
+
+        nested = timed(lambda: translate_per_key(
+            biomarkers, lambda key: nested_translate(sources, key, language)), repeat)
+        per_key = timed(lambda: translate_per_key(
+            biomarkers, lambda key: catalog.translate(key, language)), repeat)
+        endpoint = timed(lambda: build_biomarkers_response("bench", request, service), repeat)
+        print(f"{language:>5} {nested:>10.0f} {per_key:>11.0f} {endpoint:>12.0f} {nested / endpoint:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--biomarkers", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.biomarkers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Microbenchmark: digital twin cache, legacy dict cache vs bounded LRU.
+
+Populates a throwaway DigitalTwinDatabase with N twins, then replays a skewed
+(Zipf-like) read workload through PersistentDigitalTwinStorage twice: once
+with the previous FIFO dict cache and once with the LRU cache. Misses go to
+SQLite, so hit rate shows up directly in throughput.
+
+Usage:
+    python -m benchmarks.twin_cache --twins 10000 --cache-size 1000 --reads 50000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.models.digital_twin import DigitalTwin
+from app.storage.database import DigitalTwinDatabase
+from app.storage.persistent_storage import PersistentDigitalTwinStorage
+
+
+class LegacyDictCacheStorage(PersistentDigitalTwinStorage):
+    """The pre-LRU behaviour: plain dict, FIFO eviction, shared mutable twins."""
+
+    def __init__(self, database, max_size):
+        super().__init__(database)
+        self._legacy_cache = {}
+        self._max_cache_size = max_size
+        self.hits = 0
+
+    def get_digital_twin(self, user_id):
+        if user_id in self._legacy_cache:
+            self.hits += 1
+            return self._legacy_cache[user_id]
+        digital_twin = self.database.get_digital_twin(user_id)
+        if digital_twin:
+            self._save_to_cache(user_id, digital_twin)
+        return digital_twin
+
+    def _save_to_cache(self, user_id, digital_twin):
+        if len(self._legacy_cache) >= self._max_cache_size and user_id not in self._legacy_cache:
+            del self._legacy_cache[next(iter(self._legacy_cache))]
+        self._legacy_cache[user_id] = digital_twin
+
+
+def build_twin(user_id: str, fields: int, points: int) -> DigitalTwin:
+    twin = DigitalTwin(user_id=user_id)
+    start = datetime(2024, 1, 1)
+    for f in range(fields):
+        for p in range(points):
+            twin.set_value('biomarkers', f"marker_{f}", random.uniform(1, 200),
+                           timestamp=start + timedelta(days=p), unit="mg/dL")
+    return twin
+
+
+def populate(database: DigitalTwinDatabase, count: int, fields: int, points: int) -> list:
+    user_ids = []
+    for i in range(count):
+        user_id = f"bench_{i:05d}"
+        database.create_user(user_id, user_id)
+        database.save_digital_twin(user_id, build_twin(user_id, fields, points))
+        user_ids.append(user_id)
+    return user_ids
+
+
+def zipf_workload(user_ids: list, reads: int, skew: float) -> list:
+    weights = [1 / (rank + 1) ** skew for rank in range(len(user_ids))]
+    return random.choices(user_ids, weights=weights, k=reads)
+
+
+def run(storage, workload: list) -> float:
+    start = time.perf_counter()
+    for user_id in workload:
+        storage.get_digital_twin(user_id)
+    return len(workload) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--twins", type=int, default=10000)
+    parser.add_argument("--fields", type=int, default=10)
+    parser.add_argument("--points", type=int, default=3)
+    parser.add_argument("--cache-size", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=50000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the read workload")
+    args = parser.parse_args()
+
+    random.seed(42)
+    db_path = Path(tempfile.mkdtemp(prefix="bench_twin_cache_")) / "twins.db"
+    database = DigitalTwinDatabase(str(db_path))
+    print(f"Populating {args.twins} twins ({args.fields} fields x {args.points} points) ...")
+    user_ids = populate(database, args.twins, args.fields, args.points)
+    random.shuffle(user_ids)
+    workload = zipf_workload(user_ids, args.reads, args.skew)
+
+    legacy = LegacyDictCacheStorage(database, args.cache_size)
+    legacy_rate = run(legacy, workload)
+    legacy_hit_rate = legacy.hits / len(workload)
+
+    lru = PersistentDigitalTwinStorage(database)
+    lru._cache.max_entries = args.cache_size
+    lru._cache.max_bytes = 0
+    lru_rate = run(lru, workload)
+    stats = lru._cache.stats()
+
+    print(f"{'cache':>8} {'reads/s':>10} {'hit rate':>9}")
+    print(f"{'legacy':>8} {legacy_rate:>10.0f} {legacy_hit_rate:>9.1%}")
+    print(f"{'lru':>8} {lru_rate:>10.0f} {stats['hit_rate']:>9.1%}")
+    print(f"lru stats: hits={stats['hits']} misses={stats['misses']} evictions={stats['evictions']} "
+          f"bytes={stats['bytes']}")
+
+
+if __name__ == "__main__":
+    main()
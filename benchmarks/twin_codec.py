@@ -0,0 +1,71 @@
+"""
+Round-trip benchmark for digital twin codecs.
+
+Encodes and decodes twins with 10, 1k and 100k data points using every
+registered codec and reports payload size and encode/decode time.
+
+Usage:
+    python -m benchmarks.twin_codec [--sizes 10 1000 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.models.digital_twin import DigitalTwin, HealthDataPoint
+from app.storage.codecs import _CODECS_BY_NAME, decode_twin, encode_twin
+
+UNITS = ["mg/dL", "ng/mL", "mmol/L", "%", None]
+
+
+def build_twin(points: int, fields: int = 10) -> DigitalTwin:
+    """A twin with ``points`` data points spread over ``fields`` biomarker fields."""
+    twin = DigitalTwin(user_id="bench_user")
+    start = datetime(2020, 1, 1)
+    per_field = max(1, points // fields)
+    remaining = points
+    for f in range(fields):
+        if remaining <= 0:
+            break
+        count = min(per_field if f < fields - 1 else remaining, remaining)
+        unit = UNITS[f % len(UNITS)]
+        twin.set_value('biomarkers', f"marker_{f}", 0.0, timestamp=start, unit=unit)
+        field = twin.domains['biomarkers'].fields[f"marker_{f}"]
+        field.values = [
+            HealthDataPoint(round(random.uniform(1, 300), 2), start + timedelta(minutes=i, seconds=f), unit)
+            for i in range(count)
+        ]
+        remaining -= count
+    return twin
+
+
+def time_it(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(7)
+    print(f"{'points':>8} {'codec':>9} {'bytes':>11} {'encode ms':>10} {'decode ms':>10}")
+    for size in args.sizes:
+        twin = build_twin(size)
+        for name, codec in _CODECS_BY_NAME.items():
+            stored = encode_twin(twin, codec)
+            encode_ms = time_it(lambda: encode_twin(twin, codec), args.repeat)
+            decode_ms = time_it(lambda: decode_twin(stored), args.repeat)
+            size_bytes = len(stored.encode("utf-8")) if isinstance(stored, str) else len(stored)
+            print(f"{size:>8} {name:>9} {size_bytes:>11} {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
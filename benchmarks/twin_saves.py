@@ -0,0 +1,109 @@
+"""
+Write-throughput benchmark for DigitalTwinDatabase.
+
+Compares saves/sec for:
+  legacy     a new connection per call, rollback journal, SELECT then UPDATE
+  per-call   a new connection per call with the current statements
+  pooled     thread-local long-lived connection (WAL, synchronous=NORMAL)
+  save_many  pooled, many twins per transaction
+
+Usage:
+    python -m benchmarks.twin_saves [--users 500] [--saves 2000] [--batch 100]
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.models.digital_twin import DigitalTwin
+from app.storage.database import DigitalTwinDatabase, UserNotFoundError
+
+
+class LegacyDigitalTwinDatabase(DigitalTwinDatabase):
+    """Connection and write path as they were before pooling and single-statement writes."""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path, pooled=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return conn
+
+    def save_digital_twin(self, user_id: str, digital_twin: DigitalTwin) -> None:
+        data = self._serialize_digital_twin(digital_twin)
+        with self._get_connection() as conn:
+            if not conn.execute("SELECT user_id FROM digital_twins WHERE user_id = ?", (user_id,)).fetchone():
+                raise UserNotFoundError(f"User '{user_id}' not found")
+            conn.execute(
+                "UPDATE digital_twins SET digital_twin_data = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+                (data, user_id)
+            )
+            conn.commit()
+
+
+def build_twin(user_id: str, points: int) -> DigitalTwin:
+    twin = DigitalTwin(user_id=user_id)
+    start = datetime(2024, 1, 1)
+    for i in range(points):
+        twin.set_value('biomarkers', f"marker_{i % 10}", float(i), timestamp=start + timedelta(days=i), unit="mg/dL")
+    return twin
+
+
+def bench_single(database: DigitalTwinDatabase, twins: dict, saves: int) -> float:
+    user_ids = list(twins)
+    start = time.perf_counter()
+    for i in range(saves):
+        user_id = user_ids[i % len(user_ids)]
+        database.save_digital_twin(user_id, twins[user_id])
+    return saves / (time.perf_counter() - start)
+
+
+def bench_many(database: DigitalTwinDatabase, twins: dict, saves: int, batch: int) -> float:
+    user_ids = list(twins)
+    start = time.perf_counter()
+    done = 0
+    while done < saves:
+        chunk = [user_ids[(done + i) % len(user_ids)] for i in range(min(batch, saves - done))]
+        done += database.save_many({user_id: twins[user_id] for user_id in chunk})
+    return saves / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--saves", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--points", type=int, default=20, help="data points per twin")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_twin_saves_"))
+    twins = {f"bench_{i:05d}": build_twin(f"bench_{i:05d}", args.points) for i in range(args.users)}
+
+    variants = [
+        ("legacy", LegacyDigitalTwinDatabase(str(workdir / "legacy.db")), None),
+        ("per-call", DigitalTwinDatabase(str(workdir / "per_call.db"), pooled=False), None),
+        ("pooled", DigitalTwinDatabase(str(workdir / "pooled.db")), None),
+        ("save_many", DigitalTwinDatabase(str(workdir / "many.db")), args.batch),
+    ]
+
+    print(f"{args.saves} saves over {args.users} users, {args.points} points per twin")
+    print(f"{'mode':>10} {'saves/s':>10}")
+    baseline = None
+    for name, database, batch in variants:
+        database.save_many(twins)  # create the users
+        if batch:
+            rate = bench_many(database, twins, args.saves, batch)
+        else:
+            rate = bench_single(database, twins, args.saves)
+        baseline = baseline or rate
+        print(f"{name:>10} {rate:>10.0f}  ({rate / baseline:.1f}x)")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
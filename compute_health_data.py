@@ -4,44 +4,235 @@ Generates conditions, supplements, goals, computed biomarkers, routines, and bio
 Auto-triggers on data updates via digital twin.
 """
 
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-from app.database import SessionLocal, Base, engine
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from app.database import DATABASE_URL, SessionLocal, create_db_engine, engine, init_db
 from app.models.db_models import User, Biomarker, MedicalHistory, Goal
-from app.models.computed_models import ComputedData
+from app.models.computed_models import ComputedData, PIPELINE_STATE_TYPE
+from app.utils.dag_runner import DagRunner, DagStep, format_timings
+# Commits evict the users' cached chat summaries (process-wide, or every worker with the Redis backend)
+import app.services.twin_summary_cache  # noqa: F401
+# Routine changes queue their translations; see _drain_translation_jobs
+from app.services import translation_jobs
 
+logger = logging.getLogger(__name__)
 
-# Ensure computed_data table exists
-Base.metadata.create_all(bind=engine)
+
+# Ensure computed_data table (and any newly added columns) exist
+init_db()
+
+# Pipeline steps: (result key, method, inputs, outputs, biomarkers read).
+# Inputs and outputs are resource names; the DAG runner orders steps so that a
+# step runs after whichever step produces its inputs. 'lab_results' and
+# 'profile' come straight from the snapshot. The biomarker list narrows what a
+# step's fingerprint covers (None = every biomarker); a step reruns only when
+# the fingerprint of its inputs changes.
+PIPELINE_STEPS = [
+    ('computed_biomarkers', 'compute_biomarkers', ('lab_results', 'profile'), ('biomarkers',),
+     ['hdl', 'ldl', 'triglycerides', 'creatinine', 'hba1c']),
+    ('conditions', 'detect_conditions', ('biomarkers',), ('conditions',), None),
+    ('supplements', 'recommend_supplements', ('conditions',), ('supplements',), None),
+    ('goals', 'generate_goals', ('conditions', 'biomarkers'), ('goals',),
+     ['vitamin_d', 'triglycerides', 'hdl']),
+    ('biological_age', 'compute_biological_age', ('biomarkers', 'profile'), ('biological_age',),
+     ['hba1c', 'hdl', 'triglycerides', 'ldl', 'vitamin_d', 'vitamin_b12', 'egfr']),
+    ('daily_routine', 'generate_daily_routine', ('supplements',), ('daily_routine',), None),
+    ('weekly_routine', 'generate_weekly_routine', ('conditions',), ('weekly_routine',), None),
+    ('health_scores', 'compute_health_scores', ('biomarkers',), ('health_scores',), None),
+]
+
+
+class UserSnapshot:
+    """
+    In-memory view of one user's rows, loaded once and shared by every step.
+    
+    Steps read from the snapshot instead of querying, and register new rows
+    through it so later steps see them before anything is flushed.
+    """
+    
+    def __init__(self, db: Session, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        self.user: Optional[User] = db.query(User).options(
+            selectinload(User.biomarkers),
+            selectinload(User.medical_history),
+            selectinload(User.goals)
+        ).filter(User.id == user_id).first()
+        self.biomarker_rows: List[Biomarker] = list(self.user.biomarkers) if self.user else []
+        self.biomarkers: Dict[str, Biomarker] = {b.name: b for b in self.biomarker_rows}
+        self.history: List[MedicalHistory] = list(self.user.medical_history) if self.user else []
+        self.goal_ids = {g.id for g in self.user.goals} if self.user else set()
+        self.computed: Dict[str, ComputedData] = {
+            r.data_type: r for r in db.query(ComputedData).filter(ComputedData.user_id == user_id).all()
+        }
+    
+    def history_of(self, entry_type: str) -> List[MedicalHistory]:
+        return [h for h in self.history if h.type == entry_type]
+    
+    def has_history(self, entry_type: str, name: str) -> bool:
+        return any(h.name == name for h in self.history_of(entry_type))
+    
+    def add_biomarker(self, biomarker: Biomarker):
+        self.db.add(biomarker)
+        self.biomarker_rows.append(biomarker)
+        self.biomarkers[biomarker.name] = biomarker
+    
+    def add_history(self, entry: MedicalHistory):
+        self.db.add(entry)
+        self.history.append(entry)
+    
+    def add_goal(self, goal: Goal):
+        self.db.add(goal)
+        self.goal_ids.add(goal.id)
+    
+    def set_computed(self, data_type: str, data: Any):
+        existing = self.computed.get(data_type)
+        if existing:
+            existing.data = data
+            existing.computed_at = datetime.utcnow()
+            existing.version += 1
+        else:
+            record = ComputedData(user_id=self.user_id, data_type=data_type, data=data)
+            self.db.add(record)
+            self.computed[data_type] = record
 
 
 class HealthDataComputer:
     """Compute derived health data from biomarkers."""
     
-    def __init__(self):
-        self.db = SessionLocal()
-    
-    def compute_all_for_user(self, user_id: str) -> Dict[str, Any]:
-        """Run all computations for a user."""
-        results = {
-            'user_id': user_id,
-            'computed_biomarkers': self.compute_biomarkers(user_id),
-            'conditions': self.detect_conditions(user_id),
-            'supplements': self.recommend_supplements(user_id),
-            'goals': self.generate_goals(user_id),
-            'biological_age': self.compute_biological_age(user_id),
-            'daily_routine': self.generate_daily_routine(user_id),
-            'weekly_routine': self.generate_weekly_routine(user_id),
-            'health_scores': self.compute_health_scores(user_id)
-        }
-        return results
+    def __init__(self, db: Optional[Session] = None):
+        self.db = db if db is not None else SessionLocal()
+        self.last_timings: Dict[str, float] = {}
     
-    def generate_daily_routine(self, user_id: str) -> List[Dict]:
+    def compute_all_for_user(self, user_id: str, force: bool = False, commit: bool = True) -> Dict[str, Any]:
+        """
+        Run all computations for a user.
+        
+        Incremental by default: if the user's data version matches the one
+        recorded after the last run, the stored results are returned without
+        computing anything. Otherwise only steps whose inputs changed rerun.
+        Pass ``force=True`` to rerun every step.
+        
+        The user's rows are loaded once into a UserSnapshot, steps run in
+        dependency order through a DagRunner, and all writes are committed in
+        a single transaction. Steps run one at a time on the calling thread
+        since they modify ORM objects on the shared Session; the batch
+        pipeline parallelises across users instead. Per-step timings (ms) end
+        up in ``last_timings``.
+        With ``commit=False`` the writes are only flushed and the caller owns
+        the transaction (the batch pipeline commits once per chunk).
+        """
+        state = self._load_pipeline_state(user_id)
+        cached_steps = {} if force else state.get('steps', {})
+        
+        if (not force and state.get('data_version') == self.get_data_version(user_id)
+                and all(step[0] in cached_steps for step in PIPELINE_STEPS)):
+            self.last_timings = {}
+            return {'user_id': user_id, **{step[0]: cached_steps[step[0]]['result'] for step in PIPELINE_STEPS}}
+        
+        start = time.perf_counter()
+        snapshot = UserSnapshot(self.db, user_id)
+        load_ms = (time.perf_counter() - start) * 1000
+        
+        step_state = {}
+        runner = DagRunner([
+            DagStep(name, self._incremental_step(name, getattr(self, method), cached_steps, step_state),
+                    inputs=inputs, outputs=outputs)
+            for name, method, inputs, outputs, _ in PIPELINE_STEPS
+        ])
+        
+        try:
+            step_results = runner.run(snapshot)
+            
+            start = time.perf_counter()
+            self.db.flush()
+            # Version is taken after the flush so the pipeline's own writes count as current
+            snapshot.set_computed(PIPELINE_STATE_TYPE, {
+                'data_version': self.get_data_version(user_id),
+                'steps': step_state
+            })
+            if commit:
+                self.db.commit()
+            commit_ms = (time.perf_counter() - start) * 1000
+        except Exception:
+            if commit:
+                self.db.rollback()
+            raise
+        
+        self.last_timings = {'load_snapshot': load_ms, **runner.timings, 'commit': commit_ms}
+        logger.debug(f"Pipeline for {user_id}: {format_timings(self.last_timings)}")
+        
+        return {'user_id': user_id, **{step[0]: step_results[step[0]] for step in PIPELINE_STEPS}}
+    
+    def _incremental_step(self, name: str, method, cached_steps: Dict[str, Any], step_state: Dict[str, Any]):
+        """Wrap a step so it reuses its cached result when its input fingerprint is unchanged."""
+        def run(snapshot: UserSnapshot):
+            fingerprint = self._input_fingerprint(snapshot, name)
+            cached = cached_steps.get(name)
+            if cached and cached.get('fingerprint') == fingerprint:
+                result = cached['result']
+            else:
+                result = method(snapshot)
+            step_state[name] = {'fingerprint': fingerprint, 'result': result}
+            return result
+        return run
+    
+    def get_data_version(self, user_id: str) -> str:
+        """Cheap version stamp of a user's source data (row counts and latest change)."""
+        biomarkers = self.db.query(
+            func.count(Biomarker.id),
+            func.max(func.coalesce(Biomarker.updated_at, Biomarker.created_at))
+        ).filter(Biomarker.user_id == user_id).one()
+        history = self.db.query(
+            func.count(MedicalHistory.id),
+            func.max(func.coalesce(MedicalHistory.updated_at, MedicalHistory.created_at))
+        ).filter(MedicalHistory.user_id == user_id).one()
+        user_updated = self.db.query(User.updated_at).filter(User.id == user_id).scalar()
+        return '|'.join(str(v) for v in (*biomarkers, *history, user_updated))
+    
+    def _input_fingerprint(self, snapshot: UserSnapshot, step: str) -> str:
+        """Hash of the snapshot data a step reads, as declared in PIPELINE_STEPS."""
+        _, _, inputs, _, biomarker_names = next(s for s in PIPELINE_STEPS if s[0] == step)
+        payload = {}
+        
+        if 'lab_results' in inputs or 'biomarkers' in inputs:
+            rows = [[b.name, b.value, b.status] for b in snapshot.biomarker_rows
+                    if biomarker_names is None or b.name in biomarker_names]
+            payload['biomarkers'] = sorted(rows, key=str)
+        
+        for resource, entry_type in (('conditions', 'condition'), ('supplements', 'supplement')):
+            if resource in inputs:
+                payload[resource] = sorted(
+                    ([h.name, h.details] for h in snapshot.history_of(entry_type)), key=lambda r: r[0]
+                )
+        
+        if 'profile' in inputs:
+            payload['profile'] = [snapshot.user.age, snapshot.user.gender] if snapshot.user else None
+        
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+    
+    def _load_pipeline_state(self, user_id: str) -> Dict[str, Any]:
+        record = self.db.query(ComputedData).filter(
+            ComputedData.user_id == user_id,
+            ComputedData.data_type == PIPELINE_STATE_TYPE
+        ).first()
+        return record.data if record and record.data else {}
+    
+    def generate_daily_routine(self, snapshot: UserSnapshot) -> List[Dict]:
         """Generate personalized daily routine matching frontend format."""
-        supplements = self.db.query(MedicalHistory).filter(
-            MedicalHistory.user_id == user_id,
-            MedicalHistory.type == 'supplement'
-        ).all()
+        supplements = snapshot.history_of('supplement')
         
         routine = []
         
@@ -97,15 +288,12 @@ class HealthDataComputer:
             ]
         })
         
-        self._save_computed_data(user_id, 'daily_routine', routine)
+        snapshot.set_computed('daily_routine', routine)
         return routine
     
-    def generate_weekly_routine(self, user_id: str) -> List[Dict]:
+    def generate_weekly_routine(self, snapshot: UserSnapshot) -> List[Dict]:
         """Generate personalized weekly routine matching frontend format."""
-        conditions = self.db.query(MedicalHistory).filter(
-            MedicalHistory.user_id == user_id,
-            MedicalHistory.type == 'condition'
-        ).all()
+        conditions = snapshot.history_of('condition')
         condition_names = [c.name for c in conditions]
         
         routine = []
@@ -136,12 +324,12 @@ class HealthDataComputer:
             'products': exercise_products
         })
         
-        self._save_computed_data(user_id, 'weekly_routine', routine)
+        snapshot.set_computed('weekly_routine', routine)
         return routine
     
-    def compute_health_scores(self, user_id: str) -> Dict[str, Any]:
+    def compute_health_scores(self, snapshot: UserSnapshot) -> Dict[str, Any]:
         """Compute health category scores."""
-        biomarkers = self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()
+        biomarkers = list(snapshot.biomarker_rows)
         
         categories = {
             'metabolic': {'markers': ['hba1c', 'glucose_fasting', 'average_blood_glucose'], 'score': 0, 'count': 0},
@@ -176,32 +364,13 @@ class HealthDataComputer:
         result = {'categories': scores, 'overall_score': round(overall)}
         
         # Save to DB
-        self._save_computed_data(user_id, 'health_scores', result)
+        snapshot.set_computed('health_scores', result)
         return result
     
-    def _save_computed_data(self, user_id: str, data_type: str, data: Any):
-        """Save or update computed data in database."""
-        existing = self.db.query(ComputedData).filter(
-            ComputedData.user_id == user_id,
-            ComputedData.data_type == data_type
-        ).first()
-        
-        if existing:
-            existing.data = data
-            existing.computed_at = datetime.utcnow()
-            existing.version += 1
-        else:
-            self.db.add(ComputedData(
-                user_id=user_id,
-                data_type=data_type,
-                data=data
-            ))
-        self.db.commit()
-    
-    def compute_biomarkers(self, user_id: str) -> List[Dict]:
+    def compute_biomarkers(self, snapshot: UserSnapshot) -> List[Dict]:
         """Compute derived biomarkers (ratios, eGFR, etc.)."""
-        biomarkers = {b.name: b.value for b in self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()}
-        user = self.db.query(User).filter(User.id == user_id).first()
+        biomarkers = {name: b.value for name, b in snapshot.biomarkers.items()}
+        user = snapshot.user
         computed = []
         
         # HDL/LDL Ratio
@@ -259,17 +428,14 @@ class HealthDataComputer:
         
         # Save computed biomarkers to DB
         for cb in computed:
-            existing = self.db.query(Biomarker).filter(
-                Biomarker.user_id == user_id,
-                Biomarker.name == cb['name']
-            ).first()
+            existing = snapshot.biomarkers.get(cb['name'])
             
             if existing:
                 existing.value = cb['value']
                 existing.status = cb['status']
             else:
-                self.db.add(Biomarker(
-                    user_id=user_id,
+                snapshot.add_biomarker(Biomarker(
+                    user_id=snapshot.user_id,
                     name=cb['name'],
                     value=cb['value'],
                     unit=cb['unit'],
@@ -278,12 +444,11 @@ class HealthDataComputer:
                     category='computed'
                 ))
         
-        self.db.commit()
         return computed
     
-    def detect_conditions(self, user_id: str) -> List[Dict]:
+    def detect_conditions(self, snapshot: UserSnapshot) -> List[Dict]:
         """Detect health conditions from abnormal biomarkers."""
-        biomarkers = self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()
+        biomarkers = list(snapshot.biomarker_rows)
         conditions = []
         
         for b in biomarkers:
@@ -310,29 +475,19 @@ class HealthDataComputer:
         
         # Save to DB
         for cond in conditions:
-            existing = self.db.query(MedicalHistory).filter(
-                MedicalHistory.user_id == user_id,
-                MedicalHistory.type == 'condition',
-                MedicalHistory.name == cond['name']
-            ).first()
-            
-            if not existing:
-                self.db.add(MedicalHistory(
-                    user_id=user_id,
+            if not snapshot.has_history('condition', cond['name']):
+                snapshot.add_history(MedicalHistory(
+                    user_id=snapshot.user_id,
                     type='condition',
                     name=cond['name'],
                     details={'severity': cond['severity'], 'auto_detected': True}
                 ))
         
-        self.db.commit()
         return conditions
     
-    def recommend_supplements(self, user_id: str) -> List[Dict]:
+    def recommend_supplements(self, snapshot: UserSnapshot) -> List[Dict]:
         """Recommend supplements based on conditions."""
-        conditions = self.db.query(MedicalHistory).filter(
-            MedicalHistory.user_id == user_id,
-            MedicalHistory.type == 'condition'
-        ).all()
+        conditions = snapshot.history_of('condition')
         
         supplements = []
         condition_names = [c.name for c in conditions]
@@ -371,32 +526,23 @@ class HealthDataComputer:
         
         # Save to DB
         for supp in supplements:
-            existing = self.db.query(MedicalHistory).filter(
-                MedicalHistory.user_id == user_id,
-                MedicalHistory.type == 'supplement',
-                MedicalHistory.name == supp['name']
-            ).first()
-            
-            if not existing:
-                self.db.add(MedicalHistory(
-                    user_id=user_id,
+            if not snapshot.has_history('supplement', supp['name']):
+                snapshot.add_history(MedicalHistory(
+                    user_id=snapshot.user_id,
                     type='supplement',
                     name=supp['name'],
                     details=supp,
                     start_date=datetime.now()
                 ))
         
-        self.db.commit()
         return supplements
     
-    def generate_goals(self, user_id: str) -> List[Dict]:
+    def generate_goals(self, snapshot: UserSnapshot) -> List[Dict]:
         """Generate health goals based on conditions."""
-        conditions = self.db.query(MedicalHistory).filter(
-            MedicalHistory.user_id == user_id,
-            MedicalHistory.type == 'condition'
-        ).all()
+        user_id = snapshot.user_id
+        conditions = snapshot.history_of('condition')
         
-        biomarkers = {b.name: b for b in self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()}
+        biomarkers = dict(snapshot.biomarkers)
         goals = []
         
         if 'Vitamin D Deficiency' in [c.name for c in conditions]:
@@ -426,10 +572,9 @@ class HealthDataComputer:
         # Save to DB
         for i, goal in enumerate(goals):
             goal_id = f"{user_id}_auto_goal_{i+1}"
-            existing = self.db.query(Goal).filter(Goal.id == goal_id).first()
             
-            if not existing:
-                self.db.add(Goal(
+            if goal_id not in snapshot.goal_ids:
+                snapshot.add_goal(Goal(
                     id=goal_id,
                     user_id=user_id,
                     type=goal['type'],
@@ -438,16 +583,15 @@ class HealthDataComputer:
                     start_date=datetime.now()
                 ))
         
-        self.db.commit()
         return goals
     
-    def compute_biological_age(self, user_id: str) -> float:
+    def compute_biological_age(self, snapshot: UserSnapshot) -> float:
         """Compute biological age from all biomarkers."""
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = snapshot.user
         if not user:
             return 0
         
-        biomarkers = {b.name: b for b in self.db.query(Biomarker).filter(Biomarker.user_id == user_id).all()}
+        biomarkers = dict(snapshot.biomarkers)
         age = user.age or 30
         adjustment = 0
         
@@ -497,7 +641,6 @@ class HealthDataComputer:
         
         # Update user's biological age in DB
         user.biological_age = bio_age
-        self.db.commit()
         
         return bio_age
     
@@ -518,13 +661,252 @@ def run_pipeline_for_all_ocr_users():
         results.append(result)
         print(f"   ✅ Computed: {len(result['computed_biomarkers'])} biomarkers, {len(result['conditions'])} conditions, {len(result['supplements'])} supplements, {len(result['goals'])} goals")
         print(f"   🧬 Biological Age: {result['biological_age']}")
+        if computer.last_timings:
+            print(f"   ⏱️  {format_timings(computer.last_timings)}")
     
     computer.close()
+    _drain_translation_jobs()
     return results
 
 
+def _drain_translation_jobs():
+    """
+    Translate the routines queued by this process's commits (or handed to it by batch workers).
+    
+    The default in-memory queue dies with the process, so ready jobs get
+    one pass before the process's work is reported done. Retries are not
+    waited for: a failing or unreachable Translate must not hold up the
+    compute run, so jobs still waiting on a retry are reported and lost
+    when the process exits. With
+    TRANSLATION_QUEUE_URL the jobs are left for the API or standalone worker.
+    """
+    worker = translation_jobs.translation_worker
+    if isinstance(worker.queue, translation_jobs.MemoryJobQueue) and worker.queue.status()['depth']:
+        asyncio.run(worker.drain())
+        pending = worker.queue.status()['depth']
+        if pending:
+            print(f"⚠️  {pending} translation jobs are waiting on a retry and are lost when this "
+                  f"process exits; set TRANSLATION_QUEUE_URL to hand them to a translation worker")
+
+
+# Batch mode: shards OCR users across a process pool. Each worker has its own
+# engine and session, commits once per chunk and reports back to the parent,
+# which keeps a checkpoint file so an interrupted run can resume. Translation
+# jobs queued by the workers' commits are passed back and drained by the
+# parent once all chunks are done.
+
+DEFAULT_CHECKPOINT_PATH = Path("data/compute_pipeline_checkpoint.json")
+BATCH_BUSY_TIMEOUT_MS = int(os.getenv("PIPELINE_BUSY_TIMEOUT_MS", "60000"))
+
+_worker_session_factory = None
+
+
+def _init_batch_worker():
+    """Give each worker process its own engine and connection pool."""
+    global _worker_session_factory
+    worker_engine = create_db_engine(DATABASE_URL, busy_timeout_ms=BATCH_BUSY_TIMEOUT_MS)
+    _worker_session_factory = sessionmaker(autocommit=False, autoflush=False, bind=worker_engine)
+
+
+def _process_chunk(user_ids: List[str], force: bool) -> Dict[str, Any]:
+    """Compute a chunk of users in one transaction (worker side)."""
+    computer = HealthDataComputer(db=_worker_session_factory())
+    done, failed = [], []
+    try:
+        try:
+            for user_id in user_ids:
+                computer.compute_all_for_user(user_id, force=force, commit=False)
+            computer.db.commit()
+            done = list(user_ids)
+        except Exception:
+            computer.db.rollback()
+            # Fall back to one transaction per user so a bad record doesn't sink the chunk
+            for user_id in user_ids:
+                try:
+                    computer.compute_all_for_user(user_id, force=force)
+                    done.append(user_id)
+                except Exception as e:
+                    failed.append({'user_id': user_id, 'error': str(e)})
+    finally:
+        computer.close()
+    return {'done': done, 'failed': failed, 'translation_jobs': _take_translation_jobs()}
+
+
+def _take_translation_jobs() -> List[Dict[str, Any]]:
+    """
+    Remove the jobs this process's commits put on the in-memory queue.
+    
+    Compute workers hand them to the parent instead of calling Translate
+    themselves; the parent drains them once after the last chunk.
+    """
+    queue = translation_jobs.translation_worker.queue
+    if not isinstance(queue, translation_jobs.MemoryJobQueue):
+        return []
+    jobs = queue.claim(queue.status()['depth'])
+    queue.ack(jobs)
+    return [job.to_dict() for job in jobs]
+
+
+def select_ocr_users(db: Session, since: Optional[datetime] = None) -> List[str]:
+    """
+    OCR user ids, optionally only those whose data changed at or after ``since``.
+    
+    Rows the pipeline itself wrote for a user (computed biomarkers, detected
+    conditions) are not changes: only rows changed after the user's last
+    pipeline run count.
+    """
+    query = db.query(User.id).filter(User.data_source == 'ocr_extracted')
+    if since:
+        def changed(changed_at, user_id):
+            last_run = select(ComputedData.computed_at).where(
+                ComputedData.user_id == user_id,
+                ComputedData.data_type == PIPELINE_STATE_TYPE
+            ).scalar_subquery()
+            return and_(changed_at >= since, or_(last_run.is_(None), changed_at > last_run))
+        
+        changed_biomarkers = db.query(Biomarker.user_id).filter(
+            changed(func.coalesce(Biomarker.updated_at, Biomarker.created_at), Biomarker.user_id)
+        )
+        changed_history = db.query(MedicalHistory.user_id).filter(
+            changed(func.coalesce(MedicalHistory.updated_at, MedicalHistory.created_at), MedicalHistory.user_id)
+        )
+        query = query.filter(or_(
+            changed(User.updated_at, User.id),
+            User.id.in_(changed_biomarkers),
+            User.id.in_(changed_history)
+        ))
+    return [row.id for row in query.order_by(User.id).all()]
+
+
+def _load_checkpoint(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: Path, checkpoint: Dict[str, Any]):
+    """Write the checkpoint atomically (temp file + rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_batch_pipeline(workers: int = 4, chunk_size: int = 25, since: Optional[datetime] = None,
+                       checkpoint_path: Path = DEFAULT_CHECKPOINT_PATH, resume: bool = False,
+                       force: bool = False) -> Dict[str, Any]:
+    """
+    Run the pipeline for all OCR users across a process pool.
+    
+    Users are split into chunks of ``chunk_size``; each chunk is one
+    transaction in one worker. After every chunk the checkpoint records the
+    completed user ids, so ``resume=True`` skips them after an interruption.
+    """
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if not (resume and checkpoint and not checkpoint.get('finished_at')):
+        checkpoint = {
+            'run_started_at': datetime.utcnow().isoformat(),
+            'last_finished_run_started_at': checkpoint.get('last_finished_run_started_at'),
+            'completed': [],
+            'failed': []
+        }
+    completed = set(checkpoint['completed'])
+    # Latest failure per user: a resumed run retries them, so a later result replaces it
+    failed = {failure['user_id']: failure for failure in checkpoint['failed']}
+    
+    db = SessionLocal()
+    try:
+        user_ids = select_ocr_users(db, since)
+    finally:
+        db.close()
+    # Don't hand pooled connections to forked workers
+    engine.dispose()
+    
+    pending = [u for u in user_ids if u not in completed]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    print(f"🔄 {len(pending)} users to process ({len(user_ids) - len(pending)} already done), "
+          f"{len(chunks)} chunks across {workers} workers")
+    
+    start = time.perf_counter()
+    processed = 0
+    
+    def record(result: Dict[str, Any]):
+        nonlocal processed
+        completed.update(result['done'])
+        for job in result['translation_jobs']:
+            translation_jobs.translation_worker.queue.put(translation_jobs.TranslationJob.from_dict(job))
+        checkpoint['completed'] = sorted(completed)
+        for user_id in result['done']:
+            failed.pop(user_id, None)
+        failed.update((failure['user_id'], failure) for failure in result['failed'])
+        checkpoint['failed'] = list(failed.values())
+        _save_checkpoint(checkpoint_path, checkpoint)
+        processed += len(result['done']) + len(result['failed'])
+        rate = processed / max(time.perf_counter() - start, 1e-9)
+        print(f"   ✅ {processed}/{len(pending)} users ({rate:.1f} users/sec)")
+        for failure in result['failed']:
+            print(f"   ❌ {failure['user_id']}: {failure['error']}")
+    
+    if workers <= 1:
+        _init_batch_worker()
+        for chunk in chunks:
+            record(_process_chunk(chunk, force))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker) as pool:
+            futures = [pool.submit(_process_chunk, chunk, force) for chunk in chunks]
+            for future in as_completed(futures):
+                record(future.result())
+    _drain_translation_jobs()
+    
+    elapsed = time.perf_counter() - start
+    checkpoint['finished_at'] = datetime.utcnow().isoformat()
+    checkpoint['last_finished_run_started_at'] = checkpoint['run_started_at']
+    _save_checkpoint(checkpoint_path, checkpoint)
+    
+    summary = {
+        'processed': processed,
+        'failed': len(failed),
+        'seconds': round(elapsed, 2),
+        'users_per_sec': round(processed / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"⏱️  {summary['processed']} users in {summary['seconds']}s ({summary['users_per_sec']} users/sec)")
+    return summary
+
+
+def _parse_since(value: Optional[str], checkpoint_path: Path) -> Optional[datetime]:
+    """Accept an ISO timestamp, or 'last' for the start of the last finished run."""
+    if not value:
+        return None
+    if value == 'last':
+        last = _load_checkpoint(checkpoint_path).get('last_finished_run_started_at')
+        return datetime.fromisoformat(last) if last else None
+    return datetime.fromisoformat(value)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute derived health data for OCR users")
+    parser.add_argument("--batch", action="store_true", help="shard users across a process pool")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=25, help="users per transaction")
+    parser.add_argument("--since", help="only users whose data changed since this ISO timestamp, or 'last'")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT_PATH)
+    parser.add_argument("--resume", action="store_true", help="skip users completed by an interrupted run")
+    parser.add_argument("--force", action="store_true", help="recompute even when data is unchanged")
+    args = parser.parse_args()
+    
     print("🚀 Running Health Data Computation Pipeline")
     print("=" * 50)
-    run_pipeline_for_all_ocr_users()
+    if args.batch:
+        run_batch_pipeline(
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            since=_parse_since(args.since, args.checkpoint),
+            checkpoint_path=args.checkpoint,
+            resume=args.resume,
+            force=args.force
+        )
+    else:
+        run_pipeline_for_all_ocr_users()
     print("\n✅ Pipeline complete!")
@@ -2,6 +2,7 @@ from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 import json
+import os
 import asyncio
 import logging
 from pathlib import Path
@@ -76,6 +77,12 @@ async def startup_event():
         logger.error(f"Failed to initialize Unified Database System: {e}")
         # Don't fail startup, fall back to in-memory storage
         logger.warning("Falling back to in-memory storage")
+    
+    # Background translation precompute worker (also installs the routine change hook)
+    from app.services.translation_jobs import translation_worker
+    if os.getenv("TRANSLATION_WORKER", "1") == "1":
+        translation_worker.start()
+        logger.info(f"Translation worker started on {translation_worker.status()['backend']}")
 
 
 @app.on_event("shutdown")
@@ -83,10 +90,17 @@ async def shutdown_event():
     """Cleanup on application shutdown."""
     logger.info("Shutting down Aarogyadost API")
     
+    from app.services.translation_jobs import translation_worker
+    await translation_worker.stop()
+    
     try:
         # Close database connections
+        from app.database import engine
         from app.services.user_db_service import user_db_service
+        from app.storage.persistent_storage import persistent_storage
         user_db_service.close()
+        engine.dispose()
+        persistent_storage.database.close()
         logger.info("Closed database connections")
         
     except Exception as e:
@@ -1134,100 +1148,116 @@ async def get_action_details(action_id: str):
     return action_details[action_id]
 
 # Routine endpoints
+# Translation keys of the hardcoded user's routine steps, products and descriptions
+ROUTINE_STEP_KEYS = {
+    "Morning Longevity Stack": "step_morning_stack",
+    "Exercise & Movement": "step_exercise",
+    "Supplements": "step_supplements",
+    "Wellness": "step_wellness"
+}
+
+ROUTINE_PRODUCT_KEYS = {
+    "Vitamin D3 + K2": "product_vitamin_d3",
+    "Omega-3 EPA/DHA": "product_omega3",
+    "Zone 2 Cardio": "product_zone2_cardio",
+    "Resistance Training": "product_resistance",
+    "Magnesium Glycinate": "product_magnesium",
+    "Omega-3 Fish Oil": "product_omega3_fish",
+    "Probiotic": "product_probiotic",
+    "8 Glasses of Water": "product_water",
+    "10-Min Meditation": "product_meditation",
+    "30-Minute Walk": "product_walk"
+}
+
+ROUTINE_DESCRIPTION_KEYS = {
+    "2000 IU with breakfast for bone health": "desc_vitamin_d3",
+    "2g daily for cardiovascular health": "desc_omega3",
+    "45min at 180-age heart rate": "desc_zone2",
+    "3x/week for muscle maintenance": "desc_resistance",
+    "400mg before bed for sleep quality": "desc_magnesium",
+    "Take 2 capsules daily": "desc_omega3_fish",
+    "Take 1 capsule before bed": "desc_probiotic",
+    "Stay hydrated throughout the day": "desc_water",
+    "Practice mindfulness daily": "desc_meditation",
+    "2 of 3 completed this week": "desc_walk"
+}
+
 @app.get("/api/routines/daily")
 async def get_daily_routine(request: Request):
     await simulate_delay(200)
     
     from app.services.user_context import user_context_manager
-    from app.services.digital_twin_db import digital_twin_db
-    from app.utils.translation_helpers import get_translation_context
+    from app.services.translated_response_cache import translated_response_cache
+    from app.storage.translation_database import translation_db
     
     current_user = user_context_manager.get_current_user()
     
     # Get language from request state (set by translation middleware)
     language = getattr(request.state, 'language', 'en')
     
+    # Served from cache until the user's data or the precomputed translations change
+    return translated_response_cache.get_or_build(
+        "routines.daily", current_user.user_id, language,
+        lambda: build_daily_routine(current_user.user_id, language),
+        translation_version=translation_db.version() if language != 'en' else None
+    )
+
+def translate_routine(routine_data, lookup):
+    """Copy of a routine with step, name and description text replaced by ``lookup(field, text)``."""
+    return [
+        {
+            "step": lookup("step", step["step"]),
+            "products": [
+                {
+                    "name": lookup("name", product["name"]),
+                    "description": lookup("description", product["description"]),
+                    "image": product["image"]
+                }
+                for product in step["products"]
+            ]
+        }
+        for step in routine_data
+    ]
+
+def build_daily_routine(user_id: str, language: str):
+    """Daily routine payload for ``get_daily_routine``."""
+    from app.services.user_context import user_context_manager
+    from app.services.digital_twin_db import digital_twin_db
+    from app.storage.translation_database import translation_db
+    
     # Try to get computed routine from database
-    computed = digital_twin_db.get_computed_data(current_user.user_id)
+    computed = digital_twin_db.get_computed_data(user_id)
     if computed and computed.get('daily_routine'):
         routine_data = computed['daily_routine']
+        
+        # Translations are precomputed in the background whenever the routine changes
+        if language != 'en':
+            from app.services.translation_jobs import content_key
+            translations = translation_db.get_user_translations(user_id, 'daily_routine', language)
+            if translations:
+                return translate_routine(
+                    routine_data, lambda field, text: translations.get(content_key(text), text)
+                )
     elif user_context_manager.is_hardcoded_user_active():
         routine_data = mock_data["daily_routine"]
         
         # Get pre-computed translations for hardcoded user
         if language != 'en':
-            from app.storage.translation_database import translation_db
-            user_id = "user_001_29f"
-            translations = translation_db.get_user_translations(user_id, 'daily_routine', language)
+            translations = translation_db.get_user_translations("user_001_29f", 'daily_routine', language)
             
             if translations:
                 # Apply translations to routine data
-                translated_routine = []
-                
-                for step in routine_data:
-                    step_name = step["step"]
-                    
-                    # Map step names to translation keys
-                    step_key_map = {
-                        "Morning Longevity Stack": "step_morning_stack",
-                        "Exercise & Movement": "step_exercise",
-                        "Supplements": "step_supplements", 
-                        "Wellness": "step_wellness"
-                    }
-                    
-                    translated_step = {
-                        "step": translations.get(step_key_map.get(step_name, ""), step_name),
-                        "products": []
-                    }
-                    
-                    for product in step["products"]:
-                        product_name = product["name"]
-                        product_desc = product["description"]
-                        
-                        # Map product names and descriptions to translation keys
-                        name_key_map = {
-                            "Vitamin D3 + K2": "product_vitamin_d3",
-                            "Omega-3 EPA/DHA": "product_omega3",
-                            "Zone 2 Cardio": "product_zone2_cardio",
-                            "Resistance Training": "product_resistance",
-                            "Magnesium Glycinate": "product_magnesium",
-                            "Omega-3 Fish Oil": "product_omega3_fish",
-                            "Probiotic": "product_probiotic",
-                            "8 Glasses of Water": "product_water",
-                            "10-Min Meditation": "product_meditation",
-                            "30-Minute Walk": "product_walk"
-                        }
-                        
-                        desc_key_map = {
-                            "2000 IU with breakfast for bone health": "desc_vitamin_d3",
-                            "2g daily for cardiovascular health": "desc_omega3",
-                            "45min at 180-age heart rate": "desc_zone2",
-                            "3x/week for muscle maintenance": "desc_resistance",
-                            "400mg before bed for sleep quality": "desc_magnesium",
-                            "Take 2 capsules daily": "desc_omega3_fish",
-                            "Take 1 capsule before bed": "desc_probiotic",
-                            "Stay hydrated throughout the day": "desc_water",
-                            "Practice mindfulness daily": "desc_meditation",
-                            "2 of 3 completed this week": "desc_walk"
-                        }
-                        
-                        translated_product = {
-                            "name": translations.get(name_key_map.get(product_name, ""), product_name),
-                            "description": translations.get(desc_key_map.get(product_desc, ""), product_desc),
-                            "image": product["image"]
-                        }
-                        translated_step["products"].append(translated_product)
-                    
-                    translated_routine.append(translated_step)
-                
-                return translated_routine
+                key_maps = {
+                    "step": ROUTINE_STEP_KEYS,
+                    "name": ROUTINE_PRODUCT_KEYS,
+                    "description": ROUTINE_DESCRIPTION_KEYS
+                }
+                return translate_routine(
+                    routine_data, lambda field, text: translations.get(key_maps[field].get(text, ""), text)
+                )
     else:
         routine_data = []
     
-    # Get translation context (simplified for now)
-    # translation_ctx = get_translation_context(request, db)
-    
-    # For now, return routine data without complex translation until db is fixed
     return routine_data
 
 @app.get("/api/routines/weekly")
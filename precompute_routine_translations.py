@@ -1,17 +1,27 @@
 #!/usr/bin/env python3
 """
 Pre-compute translations for daily routine content.
+
+The content is queued as one background translation job. By default this
+script then drains the queue itself; with --enqueue-only it leaves the job
+for the worker of a shared TRANSLATION_QUEUE_URL broker.
 """
 
 import sys
 import os
+import argparse
+import asyncio
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.services.translation_service import translation_service
+from app.services.translation_jobs import enqueue, translation_worker
 from app.storage.translation_database import translation_db
 
 def main():
     """Pre-compute translations for daily routine content."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--enqueue-only", action="store_true",
+                        help="queue the job for another worker instead of processing it here")
+    args = parser.parse_args()
     
     print("🚀 Pre-computing daily routine translations...")
     
@@ -51,26 +61,22 @@ def main():
     }
     
     try:
-        # Pre-compute translations for all content
-        translations = {}
+        # One job: every string is translated per language in a single batch and stored together
+        job = enqueue(user_id, 'daily_routine', daily_routine_content, ['hi', 'ta'])
+        if job is None:
+            raise RuntimeError("could not enqueue the translation job")
         
-        for content_key, english_text in daily_routine_content.items():
-            lang_translations = {'en': english_text}
-            
-            # Translate to Hindi and Tamil
-            for lang_code in ['hi', 'ta']:
-                translated = translation_service.translate_text(english_text, lang_code)
-                lang_translations[lang_code] = translated
-                print(f"  {content_key} ({lang_code}): {translated[:50]}...")
-            
-            translations[content_key] = lang_translations
+        if args.enqueue_only:
+            print(f"\n📨 Queued {len(daily_routine_content)} routine strings ({translation_worker.status()['backend']})")
+            return
         
-        # Store all translations
-        translation_db.store_user_translations(
-            user_id, 'daily_routine', translations
-        )
+        # A transient Translate error re-queues the job with backoff, so wait out the retries
+        asyncio.run(translation_worker.drain(wait_for_retries=True))
+        status = translation_worker.status()
+        if status['failed']:
+            raise RuntimeError(status['last_error'] or "translation job failed")
         
-        print(f"\n✅ Pre-computed {len(translations)} routine translations")
+        print(f"\n✅ Pre-computed {len(daily_routine_content)} routine translations")
         
         # Verify stored translations
         print("\n🔍 Verifying stored translations:")
@@ -0,0 +1,138 @@
+"""
+Tests for non-blocking Bedrock streaming, using a local fake Bedrock client
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.services.chat.aws_bedrock_llm import AWSBedrockLLM
+from app.services.chat.models import StreamEventType
+
+CHUNKS = 20
+CHUNK_DELAY = 0.02
+
+
+class FakeEventStream:
+    """Blocks between chunks like botocore's EventStream does while waiting on the network."""
+
+    def __init__(self, client):
+        self.client = client
+        self.closed = False
+
+    def __iter__(self):
+        with self.client.lock:
+            self.client.active += 1
+            self.client.peak = max(self.client.peak, self.client.active)
+        try:
+            for i in range(CHUNKS):
+                time.sleep(CHUNK_DELAY)
+                yield {'chunk': {'bytes': json.dumps({'outputText': f"t{i} "}).encode()}}
+        finally:
+            with self.client.lock:
+                self.client.active -= 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBedrockClient:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.streams = []
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        stream = FakeEventStream(self)
+        self.streams.append(stream)
+        return {'body': stream}
+
+
+def make_llm(tmp_path, max_concurrent_streams):
+    config = {
+        "llm": {
+            "provider": "aws_bedrock",
+            "model_id": "amazon.titan-text-lite-v1",
+            "region": "us-east-1",
+            "max_tokens": 100,
+            "temperature": 0.7,
+            "streaming": True,
+            "max_concurrent_streams": max_concurrent_streams
+        }
+    }
+    config_path = tmp_path / "llm_config.json"
+    config_path.write_text(json.dumps(config))
+    llm = AWSBedrockLLM(str(config_path))
+    llm.bedrock_client = FakeBedrockClient()
+    return llm
+
+
+def test_other_endpoints_stay_responsive_during_generations(tmp_path):
+    llm = make_llm(tmp_path, max_concurrent_streams=4)
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/generate")
+    async def generate():
+        async def body():
+            async for event in llm.generate_streaming_response("hello"):
+                yield f"{event.event_type.value}:{event.data}\n"
+        return StreamingResponse(body(), media_type="text/plain")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            generations = [asyncio.create_task(client.get("/generate")) for _ in range(10)]
+            latencies = []
+            while not all(task.done() for task in generations):
+                start = time.perf_counter()
+                assert (await client.get("/ping")).status_code == 200
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+            return [task.result() for task in generations], latencies
+
+    started = time.perf_counter()
+    responses, latencies = asyncio.run(scenario())
+    elapsed = time.perf_counter() - started
+
+    one_generation = CHUNKS * CHUNK_DELAY
+    for response in responses:
+        assert response.text.rstrip("\n").endswith("complete:" + "".join(f"t{i} " for i in range(CHUNKS)))
+    # Ten generations through four slots take about three rounds, not ten
+    assert elapsed < one_generation * 6
+    assert llm.bedrock_client.peak <= 4
+    # The loop kept serving while generations were running
+    assert len(latencies) > 10
+    assert max(latencies) < one_generation / 2
+
+
+def test_early_exit_stops_the_reader(tmp_path):
+    llm = make_llm(tmp_path, max_concurrent_streams=1)
+
+    async def take_two():
+        stream = llm.generate_streaming_response("hello")
+        events = []
+        async for event in stream:
+            if event.event_type == StreamEventType.TOKEN:
+                events.append(event)
+                if len(events) == 2:
+                    break
+        await stream.aclose()
+        # The slot was released, so another generation can run
+        return events, [event async for event in llm.generate_streaming_response("again")]
+
+    started = time.perf_counter()
+    partial, full = asyncio.run(take_two())
+    assert len(partial) == 2
+    assert full[-1].event_type == StreamEventType.COMPLETE
+    assert llm.bedrock_client.streams[0].closed
+    assert time.perf_counter() - started < CHUNKS * CHUNK_DELAY * 1.8
@@ -0,0 +1,136 @@
+"""
+Tests for concurrent writers on the file-backed chat stores
+"""
+
+import asyncio
+import multiprocessing
+import threading
+
+import pytest
+
+from app.services.chat.context_window import ContextWindowStore
+from app.services.chat.log_message_store import LogMessageStore
+from app.services.chat.message_store import MessageStore
+from app.services.chat.models import ChatSession, Message, MessageRole
+from app.services.chat.session_manager import SessionManager
+from app.services.chat.sqlite_session_manager import SQLiteSessionManager
+
+WRITERS = 5
+MESSAGES = 8
+
+
+async def write(store_cls, data_dir: str, worker: int):
+    store = store_cls(data_dir)
+    manager = SessionManager(data_dir)
+    windows = ContextWindowStore(data_dir)
+
+    async def writer(w: int):
+        for i in range(MESSAGES):
+            content = f"p{worker}-w{w}-m{i}"
+            message = Message(session_id="shared", role=MessageRole.USER, content=content)
+            assert await store.save_message(message)
+            await manager.record_message("shared", preview=content)
+            await windows.append("shared", message)
+
+    await asyncio.gather(*(writer(w) for w in range(WRITERS)))
+
+
+def worker_main(store_cls, data_dir: str, worker: int):
+    asyncio.run(write(store_cls, data_dir, worker))
+
+
+@pytest.mark.parametrize("store_cls", [MessageStore, LogMessageStore])
+def test_concurrent_workers_lose_no_messages(tmp_path, store_cls):
+    data_dir = str(tmp_path)
+    asyncio.run(SessionManager(data_dir)._save_session(ChatSession(session_id="shared", user_id="u1")))
+    store_cls(data_dir)
+
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=worker_main, args=(store_cls, data_dir, p)) for p in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert [p.exitcode for p in workers] == [0, 0, 0]
+
+    store = store_cls(data_dir)
+    stored = asyncio.run(store.get_messages("shared"))
+    expected = {f"p{p}-w{w}-m{i}" for p in range(3) for w in range(WRITERS) for i in range(MESSAGES)}
+    assert sorted(m.content for m in stored) == sorted(expected)
+    assert len({m.message_id for m in stored}) == len(expected)
+    assert asyncio.run(SessionManager(data_dir).get_session("shared")).message_count == len(expected)
+    assert asyncio.run(ContextWindowStore(data_dir).get("shared")).message_count == len(expected)
+
+    # Positions recorded by each worker resolve to the right message
+    last = stored[-1]
+    assert asyncio.run(store.update_message(last.message_id, "edited"))
+    assert asyncio.run(store.get_messages("shared"))[-1].content == "edited"
+
+
+def test_in_process_saves_share_one_rewrite(tmp_path):
+    store = MessageStore(str(tmp_path))
+    rewrites = []
+    append = store._append_messages
+    store._append_messages = lambda session_id, messages: rewrites.append(len(messages)) or append(session_id, messages)
+
+    async def save_all():
+        return await asyncio.gather(*(
+            store.save_message(Message(session_id="s1", role=MessageRole.USER, content=str(i)))
+            for i in range(20)
+        ))
+
+    assert all(asyncio.run(save_all()))
+    assert sum(rewrites) == 20
+    assert len(rewrites) < 20
+    assert [m.content for m in asyncio.run(store.get_messages("s1"))] == [str(i) for i in range(20)]
+
+
+@pytest.mark.parametrize("manager_cls", [SessionManager, SQLiteSessionManager])
+def test_title_update_keeps_concurrent_counts(tmp_path, manager_cls):
+    manager = manager_cls(str(tmp_path))
+
+    async def scenario():
+        session = await manager.create_session("u1", title="old")
+        # A message is recorded after the caller read the session
+        snapshot = await manager.get_session(session.session_id)
+        await manager.record_message(session.session_id, preview="hi")
+        assert await manager.update_session_fields(snapshot.session_id, title="new")
+        assert not await manager.update_session_fields("missing", title="new")
+        with pytest.raises(ValueError):
+            await manager.update_session_fields(session.session_id, message_count=0)
+        return await manager.get_session(session.session_id)
+
+    stored = asyncio.run(scenario())
+    assert (stored.title, stored.message_count) == ("new", 1)
+
+
+def test_deletes_wait_on_lock_files_off_the_event_loop(tmp_path):
+    store = MessageStore(str(tmp_path))
+    windows = ContextWindowStore(str(tmp_path))
+    message = Message(session_id="s1", role=MessageRole.USER, content="hi")
+    assert asyncio.run(store.save_message(message))
+    asyncio.run(windows.append("s1", message))
+
+    async def scenario():
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_locks():
+            with store._file_locks("s1"), windows._file_locks("s1"):
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_locks)
+        holder.start()
+        held.wait(5)
+        deletes = asyncio.gather(store.delete_session_messages("s1"), windows.delete("s1"))
+        await asyncio.sleep(0.05)
+        assert not deletes.done()
+        release.set()
+        results = await deletes
+        holder.join()
+        return results
+
+    assert asyncio.run(scenario()) == [True, None]
+    assert asyncio.run(store.get_messages("s1")) == []
+    assert asyncio.run(windows.get("s1")).message_count == 0
@@ -0,0 +1,159 @@
+"""
+Tests for the DAG pipeline and incremental recompute of derived health data
+"""
+
+import importlib
+from collections import Counter
+from unittest import mock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models.computed_models import ComputedData, PIPELINE_STATE_TYPE
+from app.models.db_models import Biomarker, Goal, MedicalHistory, User
+from app.services import translation_jobs
+from app.services.translation_jobs import MemoryJobQueue, TranslationWorker
+from app.storage.translation_database import TranslationDatabase
+
+USER_ID = "ocr_incremental"
+BIOMARKERS = [
+    ("hdl", 35, "mg/dL", "low"),
+    ("ldl", 165, "mg/dL", "high"),
+    ("triglycerides", 220, "mg/dL", "high"),
+    ("hba1c", 5.9, "%", "high"),
+    ("creatinine", 0.9, "mg/dL", "normal"),
+    ("vitamin_d", 18, "ng/mL", "low"),
+    ("vitamin_b12", 180, "pg/mL", "low"),
+]
+
+
+@pytest.fixture(scope="module")
+def chd():
+    # The module creates tables on import; keep that away from the checked-in database
+    with mock.patch("app.database.init_db"):
+        return importlib.import_module("compute_health_data")
+
+
+@pytest.fixture
+def make_session(tmp_path, monkeypatch):
+    """Opens a session on a fresh database holding one OCR user."""
+    monkeypatch.setattr(translation_jobs, "translation_worker", TranslationWorker(
+        MemoryJobQueue(), translator=None, store=TranslationDatabase(str(tmp_path / "translations.db"))
+    ))
+    engines = []
+
+    def make(name="pipeline.db"):
+        engine = create_db_engine(f"sqlite:///{tmp_path / name}")
+        engines.append(engine)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        db.add(User(id=USER_ID, age=45, gender="M", data_source="ocr_extracted"))
+        for marker, value, unit, status in BIOMARKERS:
+            db.add(Biomarker(user_id=USER_ID, name=marker, value=value, unit=unit, status=status))
+        db.commit()
+        return db
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def computer(chd, make_session):
+    computer = chd.HealthDataComputer(db=make_session())
+    yield computer
+    computer.close()
+
+
+@pytest.fixture
+def calls(chd, monkeypatch):
+    """Counts invocations of every pipeline step method."""
+    counter = Counter()
+    for _, method, *_ in chd.PIPELINE_STEPS:
+        original = getattr(chd.HealthDataComputer, method)
+
+        def counted(self, snapshot, _method=method, _original=original):
+            counter[_method] += 1
+            return _original(self, snapshot)
+
+        monkeypatch.setattr(chd.HealthDataComputer, method, counted)
+    return counter
+
+
+def test_unchanged_data_version_skips_every_step(chd, computer, calls):
+    first = computer.compute_all_for_user(USER_ID)
+    assert set(calls) == {method for _, method, *_ in chd.PIPELINE_STEPS}
+    assert all(count == 1 for count in calls.values())
+
+    calls.clear()
+    second = computer.compute_all_for_user(USER_ID)
+
+    assert calls == Counter()
+    assert computer.last_timings == {}
+    assert second == first
+
+
+def test_changed_biomarker_reruns_only_dependent_steps(computer, calls):
+    first = computer.compute_all_for_user(USER_ID)
+    calls.clear()
+
+    # Still low, so conditions and supplements keep their names and details
+    computer.db.query(Biomarker).filter(Biomarker.user_id == USER_ID, Biomarker.name == "vitamin_d").one().value = 12
+    computer.db.commit()
+    second = computer.compute_all_for_user(USER_ID)
+
+    # vitamin_d is outside compute_biomarkers' inputs and does not change any history entry
+    assert set(calls) == {"detect_conditions", "generate_goals", "compute_biological_age", "compute_health_scores"}
+    assert all(count == 1 for count in calls.values())
+    assert second["goals"][0]["target"] == "Increase Vitamin D from 12.0 to >30 ng/mL"
+    assert second["daily_routine"] == first["daily_routine"]
+    assert second["computed_biomarkers"] == first["computed_biomarkers"]
+
+    calls.clear()
+    computer.compute_all_for_user(USER_ID)
+    assert calls == Counter()
+
+
+def test_force_reruns_every_step(chd, computer, calls):
+    first = computer.compute_all_for_user(USER_ID)
+    calls.clear()
+
+    forced = computer.compute_all_for_user(USER_ID, force=True)
+
+    assert calls == Counter({method: 1 for _, method, *_ in chd.PIPELINE_STEPS})
+    assert set(computer.last_timings) >= {"load_snapshot", "commit"}
+    assert forced["biological_age"] == first["biological_age"]
+
+
+def stored_state(db):
+    """Everything the pipeline writes for the user, minus volatile timestamps."""
+    return {
+        'biomarkers': sorted((b.name, b.value, b.status) for b in db.query(Biomarker).filter_by(user_id=USER_ID)),
+        'history': sorted((h.type, h.name) for h in db.query(MedicalHistory).filter_by(user_id=USER_ID)),
+        'goals': sorted((g.id, g.target) for g in db.query(Goal).filter_by(user_id=USER_ID)),
+        'biological_age': db.get(User, USER_ID).biological_age,
+        'computed': {r.data_type: r.data for r in db.query(ComputedData).filter_by(user_id=USER_ID)
+                     if r.data_type != PIPELINE_STATE_TYPE},
+    }
+
+
+def without_dates(results):
+    return {**results, 'conditions': [{k: v for k, v in c.items() if k != 'diagnosed_date'}
+                                      for c in results['conditions']]}
+
+
+def test_dag_pipeline_matches_sequential_run(chd, computer, make_session):
+    dag_results = computer.compute_all_for_user(USER_ID)
+
+    # The original pipeline: every step in declaration order, one after another
+    reference = chd.HealthDataComputer(db=make_session("sequential.db"))
+    snapshot = chd.UserSnapshot(reference.db, USER_ID)
+    sequential_results = {'user_id': USER_ID, **{
+        name: getattr(reference, method)(snapshot) for name, method, *_ in chd.PIPELINE_STEPS
+    }}
+    reference.db.commit()
+
+    assert without_dates(dag_results) == without_dates(sequential_results)
+    assert stored_state(computer.db) == stored_state(reference.db)
+    reference.close()
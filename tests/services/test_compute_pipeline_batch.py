@@ -0,0 +1,193 @@
+"""
+Tests for the batch mode of compute_health_data (chunks, checkpoints, --since)
+"""
+
+import importlib
+import json
+import time
+from datetime import datetime
+from unittest import mock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models.computed_models import ComputedData, PIPELINE_STATE_TYPE
+from app.models.db_models import Biomarker, User
+from app.services import translation_jobs
+from app.services.translation_jobs import MemoryJobQueue, TranslationWorker
+from app.storage.translation_database import TranslationDatabase
+
+USERS = [f"ocr_{i}" for i in range(6)]
+
+
+class FakeTranslator:
+    def translate_many(self, texts, target_language, source_language='en', strict=False):
+        return [f"[{target_language}] {text}" for text in texts]
+
+
+@pytest.fixture(scope="module")
+def chd():
+    # The module creates tables on import; keep that away from the checked-in database
+    with mock.patch("app.database.init_db"):
+        return importlib.import_module("compute_health_data")
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, chd):
+    url = f"sqlite:///{tmp_path / 'pipeline.db'}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(chd, "DATABASE_URL", url)
+    monkeypatch.setattr(chd, "engine", engine)
+    monkeypatch.setattr(chd, "SessionLocal", session_factory)
+
+    store = TranslationDatabase(str(tmp_path / "translations.db"))
+    monkeypatch.setattr(translation_jobs, "translation_worker", TranslationWorker(
+        MemoryJobQueue(), translator=FakeTranslator(), store=store, retry_delay=0, poll_interval=0.01
+    ))
+
+    db = session_factory()
+    for i, user_id in enumerate(USERS):
+        db.add(User(id=user_id, age=30 + i, gender="F", data_source="ocr_extracted"))
+        db.add(Biomarker(user_id=user_id, name="vitamin_d", value=15 + i, unit="ng/mL", status="low"))
+    db.add(User(id="manual_user", age=40, gender="M", data_source="manual"))
+    db.commit()
+    db.close()
+
+    yield session_factory, store, tmp_path / "checkpoint.json"
+    engine.dispose()
+
+
+def computed_users(session_factory):
+    db = session_factory()
+    try:
+        rows = db.query(ComputedData.user_id).filter(ComputedData.data_type == PIPELINE_STATE_TYPE).all()
+        return sorted(row.user_id for row in rows)
+    finally:
+        db.close()
+
+
+def test_chunks_run_across_workers_and_drain_translations(chd, pipeline):
+    session_factory, store, checkpoint_path = pipeline
+
+    summary = chd.run_batch_pipeline(workers=2, chunk_size=2, checkpoint_path=checkpoint_path)
+
+    assert (summary['processed'], summary['failed']) == (6, 0)
+    assert computed_users(session_factory) == USERS
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert checkpoint['completed'] == USERS and checkpoint['finished_at']
+    # The parent drained the routine translations queued by every worker's commits
+    for user_id in USERS:
+        assert store.get_user_translations(user_id, "daily_routine", "hi")
+
+
+def test_resume_skips_users_completed_by_an_interrupted_run(chd, pipeline):
+    session_factory, _, checkpoint_path = pipeline
+    checkpoint_path.write_text(json.dumps({
+        'run_started_at': datetime.utcnow().isoformat(),
+        'last_finished_run_started_at': None,
+        'completed': USERS[:2],
+        'failed': []
+    }))
+
+    summary = chd.run_batch_pipeline(workers=1, chunk_size=3, checkpoint_path=checkpoint_path, resume=True)
+
+    assert summary['processed'] == 4
+    assert computed_users(session_factory) == USERS[2:]
+    assert json.loads(checkpoint_path.read_text())['completed'] == USERS
+
+
+def test_since_last_selects_only_changed_users(chd, pipeline):
+    session_factory, _, checkpoint_path = pipeline
+    chd.run_batch_pipeline(workers=1, chunk_size=10, checkpoint_path=checkpoint_path)
+
+    db = session_factory()
+    db.query(Biomarker).filter(Biomarker.user_id == USERS[3]).one().value = 42
+    db.commit()
+
+    since = chd._parse_since('last', checkpoint_path)
+    assert chd.select_ocr_users(db, since) == [USERS[3]]
+    db.close()
+    summary = chd.run_batch_pipeline(workers=1, chunk_size=10, since=since, checkpoint_path=checkpoint_path)
+    assert summary['processed'] == 1
+
+
+def test_failed_chunk_falls_back_to_one_transaction_per_user(chd, pipeline, monkeypatch):
+    session_factory, _, checkpoint_path = pipeline
+    compute = chd.HealthDataComputer.compute_all_for_user
+
+    def compute_or_fail(self, user_id, *args, **kwargs):
+        if user_id == USERS[1]:
+            raise ValueError("bad record")
+        return compute(self, user_id, *args, **kwargs)
+
+    monkeypatch.setattr(chd.HealthDataComputer, "compute_all_for_user", compute_or_fail)
+
+    summary = chd.run_batch_pipeline(workers=1, chunk_size=3, checkpoint_path=checkpoint_path)
+
+    assert (summary['processed'], summary['failed']) == (6, 1)
+    assert computed_users(session_factory) == [u for u in USERS if u != USERS[1]]
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert checkpoint['failed'] == [{'user_id': USERS[1], 'error': "bad record"}]
+    assert USERS[1] not in checkpoint['completed']
+
+
+class FailingTranslator:
+    def translate_many(self, texts, target_language, source_language='en', strict=False):
+        raise ConnectionError("Translate unreachable")
+
+
+def test_failing_translator_does_not_hold_up_chunks(chd, pipeline, monkeypatch):
+    session_factory, store, checkpoint_path = pipeline
+    monkeypatch.setattr(translation_jobs, "translation_worker", TranslationWorker(
+        MemoryJobQueue(), translator=FailingTranslator(), store=store, retry_delay=30
+    ))
+
+    started = time.perf_counter()
+    summary = chd.run_batch_pipeline(workers=1, chunk_size=3, checkpoint_path=checkpoint_path)
+
+    # The chunks return without sleeping through the retry schedule
+    assert time.perf_counter() - started < 10
+    assert (summary['processed'], summary['failed']) == (6, 0)
+    assert computed_users(session_factory) == USERS
+    assert not store.get_user_translations(USERS[0], "daily_routine", "hi")
+
+
+def test_resume_replaces_failures_of_retried_users(chd, pipeline, monkeypatch):
+    session_factory, _, checkpoint_path = pipeline
+    checkpoint_path.write_text(json.dumps({
+        'run_started_at': datetime.utcnow().isoformat(),
+        'last_finished_run_started_at': None,
+        'completed': USERS[:2],
+        'failed': [{'user_id': USERS[2], 'error': "timeout"}, {'user_id': USERS[3], 'error': "timeout"}]
+    }))
+    compute = chd.HealthDataComputer.compute_all_for_user
+
+    def compute_or_fail(self, user_id, *args, **kwargs):
+        if user_id == USERS[3]:
+            raise ValueError("bad record")
+        return compute(self, user_id, *args, **kwargs)
+
+    monkeypatch.setattr(chd.HealthDataComputer, "compute_all_for_user", compute_or_fail)
+
+    summary = chd.run_batch_pipeline(workers=1, chunk_size=2, checkpoint_path=checkpoint_path, resume=True)
+
+    # USERS[2] succeeded on retry and USERS[3] failed again: one failure, with the latest error
+    assert summary['failed'] == 1
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert checkpoint['failed'] == [{'user_id': USERS[3], 'error': "bad record"}]
+    assert USERS[2] in checkpoint['completed']
+
+
+def test_chunks_hand_translation_jobs_to_the_parent(chd, pipeline):
+    _, store, _ = pipeline
+    chd._init_batch_worker()
+
+    result = chd._process_chunk(USERS[:2], False)
+
+    # The worker made no Translate calls; its queued jobs come back with the result
+    assert sorted(job['user_id'] for job in result['translation_jobs']) == USERS[:2]
+    assert translation_jobs.translation_worker.queue.status()['depth'] == 0
+    assert not store.get_user_translations(USERS[0], "daily_routine", "hi")
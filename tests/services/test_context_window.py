@@ -0,0 +1,87 @@
+"""
+Tests for the token-budgeted chat context window
+"""
+
+import asyncio
+
+from app.services.chat.context_window import ContextWindow, ContextWindowStore, estimate_tokens
+from app.services.chat.models import Message, MessageRole
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def message(i, session_id='s1', length=40):
+    role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+    content = f"Message {i} first sentence. " + "x" * length
+    return Message(session_id=session_id, role=role, content=content)
+
+
+def test_window_stays_within_budget():
+    window = ContextWindow('s1', token_budget=200, max_messages=4)
+    rendered_sizes = []
+    for i in range(500):
+        window.add(message(i))
+        assert window.tokens <= window.token_budget
+        assert len(window.messages) <= 4
+        rendered_sizes.append(len(window.render()))
+
+    # Prompt history stops growing once the window is full
+    assert max(rendered_sizes[100:]) == max(rendered_sizes[400:])
+    history = window.render()
+    assert "Message 499 first sentence." in history
+    assert "earlier messages omitted" in history
+    # Older messages appear only as their first sentence
+    assert "- Assistant: Message 495 first sentence." in history
+    assert window.message_count == 500
+
+
+def test_oversized_message_is_kept():
+    window = ContextWindow('s1', token_budget=50, max_messages=10)
+    window.add(message(0, length=1000))
+    assert len(window.messages) == 1
+    window.add(message(1))
+    assert [m.content.split()[1] for m in window.recent_messages()] == ["1"]
+    assert estimate_tokens(window.summary[0]['text']) == window.summary[0]['tokens']
+
+
+def test_store_persists_and_rebuilds(tmp_path):
+    store = ContextWindowStore(str(tmp_path), token_budget=200, max_messages=4)
+    for i in range(6):
+        run(store.append('s1', message(i)))
+    rendered = run(store.get('s1')).render()
+
+    reloaded = ContextWindowStore(str(tmp_path), token_budget=200, max_messages=4)
+    assert run(reloaded.get('s1')).render() == rendered
+
+    async def load_messages(session_id):
+        return [message(i, session_id) for i in range(6)]
+
+    rebuilt = run(reloaded.get('s2', load_messages))
+    assert rebuilt.message_count == 6
+    assert (tmp_path / "context" / "s2.json").exists()
+
+    run(reloaded.delete('s2'))
+    assert not (tmp_path / "context" / "s2.json").exists()
+    assert run(reloaded.get('s2')).message_count == 0
+
+
+def test_stores_sharing_a_directory_see_each_others_appends(tmp_path):
+    # Two workers serving the same session
+    first = ContextWindowStore(str(tmp_path), token_budget=200, max_messages=4)
+    second = ContextWindowStore(str(tmp_path), token_budget=200, max_messages=4)
+
+    run(first.append('s1', message(0)))
+    assert run(second.get('s1')).message_count == 1
+    run(second.append('s1', message(1)))
+    run(first.append('s1', message(2)))
+
+    for store in (first, second):
+        window = run(store.get('s1'))
+        assert window.message_count == 3
+        assert [m.content.split()[1] for m in window.recent_messages()] == ["0", "1", "2"]
+    assert [p.name for p in (tmp_path / "context").iterdir() if p.suffix == ".tmp"] == []
+
+    run(second.delete('s1'))
+    assert run(first.get('s1')).message_count == 0
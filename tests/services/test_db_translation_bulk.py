@@ -0,0 +1,102 @@
+"""
+Tests for the bulk lookup/write path of DatabaseTranslationService
+"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models.db_models import User, UserTranslation
+from app.utils import db_translation
+from app.utils.db_translation import DatabaseTranslationService
+
+
+class FakeTranslationService:
+    """Records batches; strings containing FAIL come back unchanged like a failed translation"""
+
+    def __init__(self):
+        self.batches = []
+
+    def translate_many(self, texts, target_language, source_language='en'):
+        self.batches.append((list(texts), target_language))
+        return [text if "FAIL" in text else f"[{target_language}] {text}" for text in texts]
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    backend = FakeTranslationService()
+    monkeypatch.setattr(db_translation, "translation_service", backend)
+    return backend
+
+
+@pytest.fixture
+def db():
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id="user_0", age=30, gender="F", data_source="test"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def count_statements(session):
+    counter = {"select": 0, "insert": 0, "commit": 0}
+
+    def before_execute(conn, cursor, statement, *args):
+        verb = statement.lstrip().split(None, 1)[0].lower()
+        if verb in counter:
+            counter[verb] += 1
+
+    event.listen(session.get_bind(), "before_cursor_execute", before_execute)
+    event.listen(session, "after_commit", lambda s: counter.__setitem__("commit", counter["commit"] + 1))
+    return counter
+
+
+def test_translate_user_list_is_one_lookup_one_batch_one_commit(db, fake_backend):
+    service = DatabaseTranslationService()
+    items = [{"title": f"Title {i}", "description": f"Walk {i} km", "id": i} for i in range(20)]
+    counter = count_statements(db)
+
+    result = service.translate_user_list("user_0", items, "routine", ["title", "description"], "hi", db)
+
+    assert [r["title"] for r in result] == [f"[hi] Title {i}" for i in range(20)]
+    assert result[3]["id"] == 3 and items[3]["title"] == "Title 3"
+    assert len(fake_backend.batches) == 1 and len(fake_backend.batches[0][0]) == 40
+    assert counter == {"select": 1, "insert": 1, "commit": 1}
+    assert db.query(UserTranslation).count() == 40
+
+    # Second call is served from the database
+    fake_backend.batches.clear()
+    again = service.translate_user_list("user_0", items, "routine", ["title", "description"], "hi", db)
+    assert again == result
+    assert fake_backend.batches == []
+
+
+def test_failed_translations_are_not_stored(db, fake_backend):
+    service = DatabaseTranslationService()
+    translated = service.get_user_translations(
+        "user_0", [("Sleep well", "insight"), ("FAIL here", "insight"), ("Sleep well", "insight")], "ta", db
+    )
+
+    assert translated == ["[ta] Sleep well", "FAIL here", "[ta] Sleep well"]
+    assert fake_backend.batches == [(["Sleep well", "FAIL here"], "ta")]
+    assert [t.original_text for t in db.query(UserTranslation)] == ["Sleep well"]
+
+
+def test_precompute_batches_per_language(db, fake_backend):
+    service = DatabaseTranslationService()
+    service.get_user_translation("user_0", "Drink water", "recommendation", "hi", db)
+    fake_backend.batches.clear()
+    items = [{"content": text, "content_type": "recommendation"} for text in ("Drink water", "Eat greens", "Stretch")]
+
+    created = service.precompute_user_translations("user_0", items, ["en", "hi", "ta"], db)
+
+    assert created == 5
+    assert fake_backend.batches == [
+        (["Eat greens", "Stretch"], "hi"),
+        (["Drink water", "Eat greens", "Stretch"], "ta"),
+    ]
+    assert service.precompute_user_translations("user_0", items, ["hi", "ta"], db) == 0
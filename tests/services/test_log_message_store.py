@@ -0,0 +1,131 @@
+"""
+Tests for the segmented log chat message store
+"""
+
+import asyncio
+import json
+import threading
+
+from app.services.chat.log_message_store import LogMessageStore
+from app.services.chat.message_store import MessageStore
+from app.services.chat.models import Message, MessageRole
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def fill(store, session_id, count):
+    ids = []
+    for i in range(count):
+        message = Message(session_id=session_id, role=MessageRole.USER, content=f"message {i}")
+        assert run(store.save_message(message))
+        ids.append(message.message_id)
+    return ids
+
+
+def test_ranges_span_segments(tmp_path):
+    store = LogMessageStore(str(tmp_path), segment_size=4)
+    fill(store, 's1', 10)
+
+    assert [m.content for m in run(store.get_messages('s1', limit=5, offset=2))] == \
+        [f"message {i}" for i in range(2, 7)]
+    assert [m.content for m in run(store.get_recent_messages('s1', count=3))] == \
+        ["message 7", "message 8", "message 9"]
+    assert len(run(store.get_messages('s1'))) == 10
+    assert run(store.get_messages('missing')) == []
+
+
+def test_patches_and_compaction(tmp_path):
+    store = LogMessageStore(str(tmp_path), segment_size=4)
+    ids = fill(store, 's1', 6)
+    # A torn write: a line without an index entry is invisible
+    with open(tmp_path / "log" / "s1" / "seg_000001.jsonl", 'ab') as f:
+        f.write(b'{"garbage": true}\n')
+    fill(store, 's1', 1)
+
+    assert run(store.update_message(ids[5], "edited"))
+    assert run(store.get_messages('s1', limit=1, offset=5))[0].content == "edited"
+
+    assert store.compact('s1') == 7
+    assert not (tmp_path / "log" / "s1" / "patches.jsonl").exists()
+    assert [m.content for m in run(store.get_messages('s1'))][4:] == ["message 4", "edited", "message 0"]
+
+
+def test_legacy_session_file_is_imported(tmp_path):
+    legacy = {
+        'session_id': 'old',
+        'messages': [
+            {'message_id': 'b', 'session_id': 'old', 'role': 'assistant', 'content': 'hi',
+             'timestamp': '2024-01-01T10:00:01', 'metadata': {}},
+            {'message_id': 'a', 'session_id': 'old', 'role': 'user', 'content': 'hello',
+             'timestamp': '2024-01-01T10:00:00', 'metadata': {}},
+        ]
+    }
+    (tmp_path / "session_old.json").write_text(json.dumps(legacy))
+    store = LogMessageStore(str(tmp_path))
+
+    assert [m.message_id for m in run(store.get_messages('old'))] == ['a', 'b']
+    assert (tmp_path / "log" / "old").is_dir()
+    assert json.loads((tmp_path / "session_old.json").read_text()) == legacy
+    assert run(store.delete_session_messages('old'))
+    assert run(store.get_messages('old')) == []
+    assert not (tmp_path / "session_old.json").exists()
+
+
+def test_update_uses_message_index(tmp_path):
+    store = LogMessageStore(str(tmp_path))
+    ids = fill(store, 's1', 3)
+    fill(store, 's2', 2)
+    assert store.index.lookup(ids[2]) == ('s1', 2)
+
+    # A fresh instance reuses the persisted index; deleting a session drops its entries
+    reopened = LogMessageStore(str(tmp_path))
+    assert not reopened.index.created
+    assert run(reopened.update_message(ids[1], "patched"))
+    assert run(reopened.get_messages('s1'))[1].content == "patched"
+    assert run(reopened.delete_session_messages('s1'))
+    assert not run(reopened.update_message(ids[0], "gone"))
+
+
+def test_json_store_update_via_index(tmp_path):
+    store = MessageStore(str(tmp_path))
+    ids = fill(store, 's1', 3)
+    fill(store, 's2', 1)
+    assert run(store.update_message(ids[1], "patched"))
+    # The JSON store re-stamps updated messages, so the patched one sorts last
+    assert [m.content for m in run(store.get_messages('s1'))] == ["message 0", "message 2", "patched"]
+
+    (tmp_path / "message_index.db").unlink()
+    rebuilt = MessageStore(str(tmp_path))
+    assert rebuilt.index.lookup(ids[2]) == ('s1', 2)
+
+
+def test_lock_waits_do_not_block_event_loop(tmp_path):
+    store = LogMessageStore(str(tmp_path))
+    ids = fill(store, 's1', 2)
+
+    async def scenario():
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with store._lock('s1'):
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(5)
+        update = asyncio.ensure_future(store.update_message(ids[0], "patched"))
+        delete = asyncio.ensure_future(store.delete_session_messages('s1'))
+        # While another thread holds the lock file the loop keeps running
+        await asyncio.sleep(0.05)
+        assert not update.done() and not delete.done()
+        release.set()
+        results = await asyncio.gather(update, delete)
+        holder.join()
+        return results
+
+    assert run(scenario()) == [True, True]
+    assert run(store.get_messages('s1')) == []
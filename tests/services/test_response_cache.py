@@ -0,0 +1,117 @@
+"""
+Tests for the LLM response cache and in-flight coalescing
+"""
+
+import asyncio
+
+from app.services.chat.llm_orchestrator import LLMOrchestrator
+from app.services.chat.models import ChatContext, StreamEvent, StreamEventType
+from app.services.chat.response_cache import ResponseCache
+
+
+class FakeUpstream:
+    def __init__(self, tokens=("Hello ", "there"), delay=0.01, fail=False):
+        self.tokens = tokens
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+
+    async def generate(self):
+        self.calls += 1
+        try:
+            yield StreamEvent(event_type=StreamEventType.THINKING, data="Connecting...")
+            for token in self.tokens:
+                await asyncio.sleep(self.delay)
+                yield StreamEvent(event_type=StreamEventType.TOKEN, data=token)
+            if self.fail:
+                yield StreamEvent(event_type=StreamEventType.ERROR, data="boom")
+            else:
+                yield StreamEvent(event_type=StreamEventType.COMPLETE, data="".join(self.tokens))
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def collect(cache, key, upstream):
+    return [(event.event_type, event.data) async for event in cache.stream(key, upstream.generate)]
+
+
+def test_key_normalization():
+    summary = {"user_id": "u1", "conditions": ["a"]}
+    key = ResponseCache.make_key("What is  my\nHbA1c?", "titan", 0.7, summary)
+    assert key == ResponseCache.make_key("what is my hba1c?  ", "titan", 0.7, dict(reversed(summary.items())))
+    assert key != ResponseCache.make_key("what is my hba1c?", "titan", 0.2, summary)
+    assert key != ResponseCache.make_key("what is my hba1c?", "claude", 0.7, summary)
+    assert key != ResponseCache.make_key("what is my hba1c?", "titan", 0.7, {"user_id": "u2"})
+
+
+def test_hits_replay_tokens_and_skip_failures():
+    cache = ResponseCache()
+    upstream = FakeUpstream()
+
+    first = asyncio.run(collect(cache, "k", upstream))
+    second = asyncio.run(collect(cache, "k", upstream))
+    assert upstream.calls == 1
+    assert first[0][0] == StreamEventType.THINKING
+    assert second == first[1:]
+
+    failing = FakeUpstream(fail=True)
+    asyncio.run(collect(cache, "bad", failing))
+    asyncio.run(collect(cache, "bad", failing))
+    assert failing.calls == 2
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 3
+    assert stats['hit_rate'] == 0.25
+
+
+def test_concurrent_identical_requests_share_one_stream():
+    cache = ResponseCache()
+    upstream = FakeUpstream(tokens=tuple(f"t{i} " for i in range(5)))
+
+    async def scenario():
+        return await asyncio.gather(*(collect(cache, "k", upstream) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert all(result == results[0] for result in results)
+    assert results[0][-1] == (StreamEventType.COMPLETE, "t0 t1 t2 t3 t4 ")
+    stats = cache.stats()
+    assert stats['coalesced'] == 4
+    assert stats['served_without_upstream_rate'] == 0.8
+    assert stats['in_flight'] == 0
+
+
+def test_upstream_cancelled_when_every_caller_leaves():
+    cache = ResponseCache()
+    upstream = FakeUpstream(tokens=tuple(f"t{i} " for i in range(50)))
+
+    async def scenario():
+        stream = cache.stream("k", upstream.generate)
+        async for event in stream:
+            if event.event_type == StreamEventType.TOKEN:
+                break
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert upstream.cancelled
+    assert "k" not in cache._in_flight
+    assert cache.stats()['size'] == 0
+
+
+def test_reply_language_is_part_of_the_prompt_and_key():
+    orchestrator = LLMOrchestrator(response_cache=None)
+    summary = {"demographics": {"age": 40, "sex": "F"}}
+
+    def prompt(language):
+        context = ChatContext(user_id="u1", session_id="s1", recent_messages=[],
+                              digital_twin_summary=summary, language=language)
+        return orchestrator._build_prompt(context, "How is my vitamin D?")
+
+    assert "Respond in" not in prompt("en")
+    assert "Respond in Hindi." in prompt("hi")
+    assert prompt("xx") == prompt("en")
+    keys = {ResponseCache.make_key(prompt(language), "model", 0.7, summary) for language in ("en", "hi", "ta")}
+    assert len(keys) == 3
@@ -0,0 +1,98 @@
+"""
+Tests for the BM25 retrieval index used for chat context
+"""
+
+import math
+
+from app.services.chat.context_builder import ContextBuilder
+from app.services.chat.models import ChatContext
+from app.services.chat.retrieval import RetrievalIndex, snippet, tokenize
+
+
+def make_index(tmp_path):
+    index = RetrievalIndex(str(tmp_path / "retrieval.db"))
+    index.add_many("u1", [
+        ("ldl", "record", "Biomarker LDL cholesterol: 160 mg/dL, high"),
+        ("hdl", "record", "Biomarker HDL cholesterol: 38 mg/dL, low"),
+        ("vitd", "record", "Biomarker Vitamin D: 18 ng/mL, low"),
+        ("chat1", "chat:s1", "Should I take vitamin D supplements in winter?"),
+    ])
+    index.add("u2", "other", "record", "Biomarker LDL cholesterol: 90 mg/dL, normal")
+    return index
+
+
+def test_tokenize():
+    assert tokenize("What are my Vitamins and HbA1c levels at 5.7?") == ["vitamin", "hba1c", "level", "5.7"]
+
+
+def test_bm25_ranking_is_per_user(tmp_path):
+    index = make_index(tmp_path)
+
+    results = index.search("u1", "how is my LDL cholesterol?")
+    assert [r['doc_id'] for r in results] == ["ldl", "hdl"]
+    assert results[0]['score'] > results[1]['score']
+
+    # Hand-computed BM25 for the single-term query "ldl" (df=1, N=4)
+    doc_lengths = [len(tokenize(t)) for t in (
+        "Biomarker LDL cholesterol: 160 mg/dL, high", "Biomarker HDL cholesterol: 38 mg/dL, low",
+        "Biomarker Vitamin D: 18 ng/mL, low", "Should I take vitamin D supplements in winter?")]
+    average = sum(doc_lengths) / 4
+    expected = math.log(1 + 3.5 / 1.5) * 2.2 / (1 + 1.2 * (0.25 + 0.75 * doc_lengths[0] / average))
+    assert index.search("u1", "ldl", k=1)[0]['score'] == round(expected, 4)
+
+    assert [r['doc_id'] for r in index.search("u2", "ldl")] == ["other"]
+    assert index.search("u1", "vitamin", exclude=["chat1"])[0]['doc_id'] == "vitd"
+    assert index.search("u1", "the and of") == []
+    assert index.search("missing", "ldl") == []
+
+
+def test_incremental_updates_persist(tmp_path):
+    index = make_index(tmp_path)
+    assert index.add_many("u1", [("ldl", "record", "Biomarker LDL cholesterol: 160 mg/dL, high")]) == 0
+
+    index.add("u1", "ldl", "record", "Biomarker LDL cholesterol: 110 mg/dL, borderline")
+    assert "borderline" in index.search("u1", "ldl")[0]['text']
+    assert index.search("u1", "160") == []
+
+    changed = index.sync_source("u1", "record", [("ldl", "Biomarker LDL cholesterol: 110 mg/dL, borderline")])
+    assert changed == 2
+    assert index.document_count("u1") == 2
+    assert index.document_count("u1", "record") == 1
+    index.close()
+
+    reopened = RetrievalIndex(str(tmp_path / "retrieval.db"))
+    assert reopened.document_count("u1") == 2
+    assert [r['doc_id'] for r in reopened.search("u1", "vitamin winter")] == ["chat1"]
+    reopened.sync_source("u1", "chat:s1", [])
+    assert reopened.search("u1", "vitamin") == []
+
+
+def test_snippet_centres_on_match():
+    text = "filler " * 100 + "ferritin 12 ng/mL low " + "filler " * 100
+    result = snippet(text, ["ferritin"], width=80)
+    assert "ferritin 12" in result
+    assert result.startswith("...") and result.endswith("...")
+    assert len(result) <= 86
+
+
+def test_only_retrieved_records_replace_the_summary_listings(tmp_path):
+    summary = {
+        "demographics": {"age": 40, "sex": "F"},
+        "latest_biomarkers": {"test_date": "2024-01-01", "key_markers": {
+            "ldl": {"value": 160, "unit": "mg/dL", "status": "high"}}},
+        "family_history": [{"condition": "diabetes", "relation": "mother"}]
+    }
+    builder = ContextBuilder(str(tmp_path))
+
+    def render(documents):
+        return builder.format_context_for_llm(ChatContext(
+            user_id="u1", session_id="s1", recent_messages=[],
+            digital_twin_summary=summary, relevant_documents=documents))
+
+    chat_only = render([{"doc_id": "chat:m1", "source": "chat:s0", "text": "Should I take vitamin D?"}])
+    assert "Should I take vitamin D?" in chat_only
+    assert "ldl: 160 mg/dL (high)" in chat_only and "diabetes (mother)" in chat_only
+
+    with_record = render([{"doc_id": "ldl", "source": "record", "text": "Biomarker LDL cholesterol: 160 mg/dL, high"}])
+    assert "Biomarker LDL cholesterol" in with_record
+    assert "Recent abnormal biomarkers" not in with_record and "Family history" not in with_record
@@ -0,0 +1,79 @@
+"""
+Tests for SSE token coalescing and stream cancellation
+"""
+
+import asyncio
+import json
+
+from fastapi.responses import StreamingResponse
+
+from app.services.chat.models import StreamEvent, StreamEventType
+from app.services.chat.sse import coalesce_tokens, event_frame
+
+
+def token(text):
+    return StreamEvent(event_type=StreamEventType.TOKEN, data=text)
+
+
+async def fake_generation(tokens, delay=0.0, state=None):
+    state = state if state is not None else {}
+    try:
+        for text in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            state['sent'] = state.get('sent', 0) + 1
+            yield token(text)
+        yield StreamEvent(event_type=StreamEventType.COMPLETE, data="".join(tokens))
+    finally:
+        state['closed'] = True
+
+
+async def collect(events):
+    return [(event.event_type, event.data) async for event in events]
+
+
+def test_tokens_are_merged_up_to_frame_size():
+    tokens = [f"t{i} " for i in range(100)]
+    events = asyncio.run(collect(coalesce_tokens(fake_generation(tokens), flush_interval=1, max_chars=100)))
+
+    token_frames = [data for kind, data in events if kind == StreamEventType.TOKEN]
+    assert "".join(token_frames) == "".join(tokens)
+    assert len(token_frames) < 10
+    assert events[-1] == (StreamEventType.COMPLETE, "".join(tokens))
+
+
+def test_slow_tokens_are_not_held_back():
+    tokens = ["a", "b", "c"]
+    events = asyncio.run(collect(coalesce_tokens(fake_generation(tokens, delay=0.05), flush_interval=0.01)))
+    assert events == [(StreamEventType.TOKEN, t) for t in tokens] + [(StreamEventType.COMPLETE, "abc")]
+
+
+def test_disconnect_cancels_generation():
+    state = {}
+
+    async def scenario():
+        frames = []
+        body_sent = asyncio.Event()
+
+        async def body():
+            async for event in coalesce_tokens(fake_generation(["x"] * 1000, delay=0.001, state=state), 0.005):
+                yield event_frame(event)
+
+        async def receive():
+            await body_sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message["body"]:
+                frames.append(message["body"])
+                body_sent.set()
+
+        await StreamingResponse(body(), media_type="text/event-stream")({"type": "http"}, receive, send)
+        await asyncio.sleep(0.05)
+        return frames
+
+    frames = asyncio.run(scenario())
+    first = json.loads(frames[0][len(b"data: "):])
+    assert first["type"] == "token"
+    assert state['closed']
+    assert state['sent'] < 1000
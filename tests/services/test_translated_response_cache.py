@@ -0,0 +1,70 @@
+"""
+Tests for the translated response cache
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.translated_response_cache import TranslatedResponseCache
+from app.services.twin_summary_cache import twin_summary_cache
+
+
+class Builder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"call": self.calls, "text": "उच्च"}
+
+
+def test_serves_cached_bytes_until_a_version_changes():
+    cache = TranslatedResponseCache()
+    build = Builder()
+
+    first = cache.get_or_build("biomarkers", "user_a", "hi", build, translation_version=1)
+    again = cache.get_or_build("biomarkers", "user_a", "hi", build, translation_version=1)
+    assert first.body == again.body
+    assert json.loads(again.body) == {"call": 1, "text": "उच्च"}
+    assert again.media_type == "application/json"
+
+    # Each language and user has its own entry
+    cache.get_or_build("biomarkers", "user_a", "ta", build, translation_version=1)
+    cache.get_or_build("biomarkers", "user_b", "hi", build, translation_version=1)
+    assert build.calls == 3
+
+    # Translation tables changed
+    assert json.loads(cache.get_or_build("biomarkers", "user_a", "hi", build, translation_version=2).body)["call"] == 4
+
+    # User data changed
+    twin_summary_cache.invalidate("user_a")
+    assert json.loads(cache.get_or_build("biomarkers", "user_a", "hi", build, translation_version=2).body)["call"] == 5
+    assert json.loads(cache.get_or_build("biomarkers", "user_b", "hi", build, translation_version=1).body)["call"] == 3
+    assert cache.stats()["builds"] == 5
+
+
+def test_errors_are_not_cached():
+    cache = TranslatedResponseCache(data_version=lambda user_id: 0)
+
+    def missing():
+        raise HTTPException(status_code=404, detail="not found")
+
+    with pytest.raises(HTTPException):
+        cache.get_or_build("biomarkers", "user_a", "hi", missing)
+    assert cache.stats()["size"] == 0
+
+
+def test_unknown_data_version_is_not_cached():
+    # twin_summary_cache.version returns -1 while its backend is unreachable
+    cache = TranslatedResponseCache(data_version=lambda user_id: -1)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    assert json.loads(cache.get_or_build("biomarkers", "user_a", "hi", build).body)["call"] == 1
+    assert json.loads(cache.get_or_build("biomarkers", "user_a", "hi", build).body)["call"] == 2
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,117 @@
+"""
+Tests for the batched Amazon Translate client against a local fake Translate endpoint
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+import pytest
+
+from app.utils.translation import TranslationService
+from app.utils.translation_batch import BatchTranslator, TranslationCache
+
+
+class FakeTranslate(BaseHTTPRequestHandler):
+    """Speaks the TranslateText JSON protocol; 'translates' each paragraph by tagging it."""
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FakeTranslate.requests.append(body)
+        text, target = body['Text'], body['TargetLanguageCode']
+        if "FAIL" in text:
+            return self._reply(400, {"__type": "UnsupportedLanguagePairException", "message": "no"})
+        paragraphs = text.split("\n\n")
+        if any("MERGE" in p for p in paragraphs):
+            # Like a real engine joining short paragraphs, breaking the segment count
+            paragraphs = [" ".join(paragraphs)]
+        self._reply(200, {
+            "TranslatedText": "\n\n".join(f"[{target}] {p}" for p in paragraphs),
+            "SourceLanguageCode": body['SourceLanguageCode'],
+            "TargetLanguageCode": target
+        })
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.1")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def translate_client():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTranslate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield boto3.client(
+        'translate',
+        region_name='ap-south-1',
+        endpoint_url=f"http://127.0.0.1:{server.server_address[1]}",
+        aws_access_key_id='test',
+        aws_secret_access_key='test'
+    )
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_requests():
+    FakeTranslate.requests = []
+
+
+def test_deduped_packed_and_shared_between_workers(translate_client, tmp_path):
+    texts = [f"Drink water {i % 30}" for i in range(90)] + ["  padded  ", ""]
+    translator = BatchTranslator(
+        translate_client, TranslationCache(str(tmp_path / "cache.db")),
+        max_concurrency=4, requests_per_second=0, max_request_bytes=200
+    )
+
+    result = translator.translate_many(texts, 'hi')
+    assert result[:90] == [f"[hi] Drink water {i % 30}" for i in range(90)]
+    assert result[90:] == ["  [hi] padded  ", ""]
+    # 31 unique strings packed into a handful of requests
+    assert 1 < len(FakeTranslate.requests) < 10
+
+    # Another worker process opening the same cache file makes no calls
+    FakeTranslate.requests = []
+    other = BatchTranslator(translate_client, TranslationCache(str(tmp_path / "cache.db")), requests_per_second=0)
+    assert other.translate_many(texts, 'hi') == result
+    assert other.translate_many(["Drink water 3"], 'ta') == ["[ta] Drink water 3"]
+    assert len(FakeTranslate.requests) == 1
+
+
+def test_segment_mismatch_and_failures_fall_back(translate_client, tmp_path):
+    translator = BatchTranslator(translate_client, TranslationCache(str(tmp_path / "cache.db")), requests_per_second=0)
+
+    # The reply lost a segment boundary: each string is retried on its own
+    assert translator.translate_many(["one", "MERGE two"], 'ta') == ["[ta] one", "[ta] MERGE two"]
+    assert translator.split_mismatches == 1
+
+    # A failing batch is retried singly; the failing string comes back unchanged
+    assert translator.translate_many(["one", "three FAIL", "four"], 'ta') == ["[ta] one", "three FAIL", "[ta] four"]
+    assert translator.failures == 2  # the packed request and the single retry
+
+    # Failures are not cached, so the string is tried again
+    FakeTranslate.requests = []
+    assert translator.translate_many(["one", "three FAIL"], 'ta') == ["[ta] one", "three FAIL"]
+    assert [r['Text'] for r in FakeTranslate.requests] == ["three FAIL"]
+
+
+def test_service_translates_list_of_dicts_in_one_request(translate_client, tmp_path):
+    service = TranslationService(translate_client, cache_path=str(tmp_path / "cache.db"))
+    items = [{"name": "Walk", "note": "Daily", "id": 1}, {"name": "Walk", "note": "Hydrate", "id": 2}]
+
+    translated = service.translate_list_of_dicts(items, 'hi', ["name", "note"])
+    assert translated == [
+        {"name": "[hi] Walk", "note": "[hi] Daily", "id": 1},
+        {"name": "[hi] Walk", "note": "[hi] Hydrate", "id": 2}
+    ]
+    assert items[0]["name"] == "Walk"
+    assert len(FakeTranslate.requests) == 1
+    assert service.translate_text("Walk", 'en') == "Walk"
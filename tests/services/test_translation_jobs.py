@@ -0,0 +1,169 @@
+"""
+Tests for the background translation job queue and worker
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models.computed_models import ComputedData
+from app.models.db_models import User
+from app.services import translation_jobs
+from app.services.translation_jobs import (
+    MemoryJobQueue, SQLiteJobQueue, TranslationJob, TranslationWorker, content_key, enqueue
+)
+from app.storage.translation_database import TranslationDatabase
+from app.utils.translation import TranslationService
+
+
+class FakeTranslator:
+    def __init__(self, fail_times=0):
+        self.calls = []
+        self.fail_times = fail_times
+
+    def translate_many(self, texts, target_language, source_language='en', strict=False):
+        self.calls.append((list(texts), target_language))
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("translate unavailable")
+        return [text if text == "HbA1c" else f"[{target_language}] {text}" for text in texts]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TranslationDatabase(str(tmp_path / "translations.db"))
+
+
+def test_batch_is_coalesced_translated_once_per_language_and_stored(store):
+    queue = MemoryJobQueue()
+    translator = FakeTranslator()
+    worker = TranslationWorker(queue, translator=translator, store=store)
+
+    queue.put(TranslationJob("u1", "daily_routine", {"a": "Walk", "b": "Old text"}))
+    queue.put(TranslationJob("u2", "daily_routine", {"a": "Walk", "c": "HbA1c"}))
+    queue.put(TranslationJob("u1", "daily_routine", {"a": "Walk", "b": "Stretch"}))
+
+    assert asyncio.run(worker.run_once()) == 3
+    assert sorted(translator.calls, key=lambda call: call[1]) == [
+        (["Walk", "Stretch", "HbA1c"], "hi"),
+        (["Walk", "Stretch", "HbA1c"], "ta"),
+    ]
+    assert store.get_user_translations("u1", "daily_routine", "ta") == {"a": "[ta] Walk", "b": "[ta] Stretch"}
+    assert store.get_user_translations("u2", "daily_routine", "hi") == {"a": "[hi] Walk", "c": "HbA1c"}
+    assert store.get_user_translations("u2", "daily_routine", "en") == {"a": "Walk", "c": "HbA1c"}
+
+    status = worker.status()
+    assert (status["depth"], status["in_flight"], status["processed"], status["superseded"]) == (0, 0, 2, 1)
+    assert status["lag_seconds"] == 0.0
+
+
+def test_failed_batch_is_retried_then_dropped(store):
+    queue = MemoryJobQueue()
+    worker = TranslationWorker(queue, translator=FakeTranslator(fail_times=1), store=store,
+                               retry_delay=0, max_attempts=2)
+    queue.put(TranslationJob("u1", "insights", {"insight_0": "Sleep more"}))
+
+    asyncio.run(worker.run_once())
+    status = worker.status()
+    assert status["depth"] == 1 and status["processed"] == 0
+    assert "translate unavailable" in status["last_error"]
+
+    asyncio.run(worker.run_once())
+    assert store.get_user_translations("u1", "insights", "hi") == {"insight_0": "[hi] Sleep more"}
+
+    always_failing = TranslationWorker(queue, translator=FakeTranslator(fail_times=10), store=store,
+                                       retry_delay=0, max_attempts=2)
+    queue.put(TranslationJob("u1", "insights", {"insight_0": "Sleep less"}))
+    asyncio.run(always_failing.drain())
+    assert always_failing.failed == 1
+    assert queue.status()["depth"] == 0
+
+
+def test_sqlite_queue_claims_are_exclusive_across_connections(tmp_path):
+    path = tmp_path / "jobs.db"
+    producer, worker_a, worker_b = SQLiteJobQueue(path), SQLiteJobQueue(path), SQLiteJobQueue(path)
+    for i in range(5):
+        producer.put(TranslationJob(f"u{i}", "daily_routine", {"a": f"text {i}"}, enqueued_at=1000.0 + i))
+
+    first = worker_a.claim(3)
+    second = worker_b.claim(10)
+    assert sorted(job.user_id for job in first + second) == [f"u{i}" for i in range(5)]
+    assert len(first) == 3 and second[0].items == {"a": "text 3"}
+    assert producer.status() == {"depth": 0, "in_flight": 5, "oldest_enqueued_at": None}
+
+    worker_a.ack(first)
+    worker_b.retry(second[0], delay=0)
+    status = producer.status()
+    assert (status["depth"], status["in_flight"], status["oldest_enqueued_at"]) == (1, 1, 1003.0)
+    assert worker_a.claim(10)[0].attempts == 1
+
+
+def test_routine_commits_enqueue_and_running_worker_drains(store, monkeypatch):
+    queue = MemoryJobQueue()
+    worker = TranslationWorker(queue, translator=FakeTranslator(), store=store, poll_interval=5)
+    monkeypatch.setattr(translation_jobs, "translation_worker", worker)
+
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id="u1", age=30, gender="F", data_source="test"))
+    session.add(ComputedData(user_id="u1", data_type="daily_routine", data=[
+        {"step": "Exercise & Movement", "products": [{"name": "Zone 2 Cardio", "description": "30min", "image": ""}]}
+    ]))
+    session.add(ComputedData(user_id="u1", data_type="health_scores", data={"overall": 80}))
+    session.commit()
+    session.close()
+    engine.dispose()
+
+    assert queue.status()["depth"] == 1
+
+    async def run():
+        worker.start()
+        enqueue("u2", "insights", {"insight_0": "Sleep more"})
+        for _ in range(100):
+            if worker.processed == 2:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    asyncio.run(run())
+    translations = store.get_user_translations("u1", "daily_routine", "hi")
+    assert translations[content_key("Zone 2 Cardio")] == "[hi] Zone 2 Cardio"
+    assert len(translations) == 3
+    assert store.get_user_translations("u2", "insights", "ta") == {"insight_0": "[ta] Sleep more"}
+    assert not worker.running
+
+
+def test_drain_can_wait_for_retries(store):
+    queue = MemoryJobQueue()
+    worker = TranslationWorker(queue, translator=FakeTranslator(fail_times=1), store=store,
+                               retry_delay=0.01, poll_interval=0.01)
+    queue.put(TranslationJob("u1", "insights", {"insight_0": "Sleep more"}))
+
+    asyncio.run(worker.drain(wait_for_retries=True))
+    assert queue.status()["depth"] == 0
+    assert store.get_user_translations("u1", "insights", "ta") == {"insight_0": "[ta] Sleep more"}
+
+
+class FailingTranslateClient:
+    def translate_text(self, **kwargs):
+        raise RuntimeError("ThrottlingException")
+
+
+def test_untranslated_strings_fail_the_job_and_store_nothing(store, tmp_path):
+    # The real service falls back to the original text; the worker must not take that as a result
+    translator = TranslationService(translate_client=FailingTranslateClient(), cache_path=str(tmp_path / "cache.db"))
+    queue = MemoryJobQueue()
+    worker = TranslationWorker(queue, translator=translator, store=store, retry_delay=0, max_attempts=2)
+    queue.put(TranslationJob("u1", "insights", {"insight_0": "Sleep more"}))
+
+    asyncio.run(worker.run_once())
+    status = worker.status()
+    assert (status["depth"], status["processed"], status["failed"]) == (1, 0, 0)
+    assert "could not be translated" in status["last_error"]
+
+    asyncio.run(worker.drain())
+    assert (worker.processed, worker.failed) == (0, 1)
+    assert not store.has_user_translations("u1", "insights")
@@ -0,0 +1,109 @@
+"""
+Tests for the shared digital twin summary cache and its invalidation hooks
+"""
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models.db_models import User, Biomarker
+from app.services.twin_summary_cache import RedisSummaryBackend, TwinSummaryCache, twin_summary_cache
+
+
+class FakeRedis:
+    """Local stand-in for the subset of the redis client the backend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+
+class Builder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        return {"user_id": user_id, "build": self.calls}
+
+
+def test_hits_until_invalidated():
+    cache = TwinSummaryCache(max_entries=2)
+    build = Builder()
+
+    assert cache.get_or_build("u1", build) == {"user_id": "u1", "build": 1}
+    assert cache.get_or_build("u1", build)["build"] == 1
+    cache.invalidate("u1")
+    assert cache.get_or_build("u1", build)["build"] == 2
+
+    cache.get_or_build("u2", build)
+    cache.get_or_build("u3", build)
+    assert cache.stats()['size'] == 2
+
+
+def test_commits_evict_changed_users():
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(id="hook_a", age=30, data_source="test"), User(id="hook_b", age=40, data_source="test")])
+    session.commit()
+
+    build = Builder()
+    twin_summary_cache.get_or_build("hook_a", build)
+    twin_summary_cache.get_or_build("hook_b", build)
+
+    session.add(Biomarker(user_id="hook_a", name="LDL", value=150, status="high", category="lipids"))
+    session.flush()
+    # Nothing is evicted until the transaction commits
+    assert twin_summary_cache.get_or_build("hook_a", build)["build"] == 1
+    session.commit()
+
+    assert twin_summary_cache.get_or_build("hook_a", build)["build"] == 3
+    assert twin_summary_cache.get_or_build("hook_b", build)["build"] == 2
+
+    session.add(Biomarker(user_id="hook_b", name="HDL", value=30, status="low", category="lipids"))
+    session.flush()
+    session.rollback()
+    assert twin_summary_cache.get_or_build("hook_b", build)["build"] == 2
+    session.close()
+    engine.dispose()
+
+
+def test_invalidation_reaches_other_workers():
+    redis = FakeRedis()
+    worker_a = TwinSummaryCache(backend=RedisSummaryBackend(redis))
+    worker_b = TwinSummaryCache(backend=RedisSummaryBackend(redis))
+    build = Builder()
+
+    worker_a.get_or_build("u1", build)
+    # The second worker reuses the shared summary instead of building its own
+    assert worker_b.get_or_build("u1", build)["build"] == 1
+    assert worker_b.stats()['shared_hits'] == 1
+
+    worker_a.invalidate("u1")
+    assert worker_b.get_or_build("u1", build)["build"] == 2
+    assert worker_a.get_or_build("u1", build)["build"] == 2
+    assert build.calls == 2
+
+
+def test_backend_outage_falls_back_to_local_cache():
+    class DownRedis:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError("redis down")
+            return fail
+
+    cache = TwinSummaryCache(backend=RedisSummaryBackend(DownRedis()))
+    build = Builder()
+    assert cache.get_or_build("u1", build)["build"] == 1
+    assert cache.get_or_build("u1", build)["build"] == 1
+    cache.invalidate("u1")
+    assert cache.get_or_build("u1", build)["build"] == 2
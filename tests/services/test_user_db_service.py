@@ -0,0 +1,148 @@
+"""
+Tests for UserDBService session handling and bulk loading
+"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.database
+import app.services.user_db_service
+from app.database import Base, create_db_engine, get_db
+from app.models.db_models import User, Biomarker, MedicalHistory, Goal
+from app.services.user_db_service import UserDBService, get_user_db_service
+
+
+@pytest.fixture
+def db():
+    """In-memory database seeded with three users"""
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for i in range(3):
+        user_id = f"user_{i}"
+        session.add(User(id=user_id, age=30 + i, gender="F", data_source="test"))
+        for j in range(i + 1):
+            session.add(Biomarker(user_id=user_id, name=f"marker_{j}", value=j, status="normal",
+                                  category="lipids" if j % 2 else "vitamins"))
+        session.add(MedicalHistory(user_id=user_id, type="condition", name="Condition", details={}))
+        session.add(Goal(id=f"{user_id}_goal", user_id=user_id, type="fitness", target="Walk"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def count_queries(session):
+    """Attach a statement counter to the session's engine"""
+    counter = {"count": 0}
+
+    def before_execute(*args):
+        counter["count"] += 1
+
+    event.listen(session.get_bind(), "before_cursor_execute", before_execute)
+    return counter
+
+
+def test_bulk_loader_matches_single_user_shape(db):
+    service = UserDBService(db)
+    bulk = service.get_users_full_data(["user_0", "user_1", "user_2", "missing"])
+
+    assert set(bulk) == {"user_0", "user_1", "user_2"}
+    for user_id, data in bulk.items():
+        single = {
+            'profile': service.get_user(user_id),
+            'biomarkers': service.get_user_biomarkers_by_category(user_id),
+            'medical_history': service.get_user_medical_history(user_id),
+            'goals': service.get_user_goals(user_id),
+        }
+        assert data == single
+
+
+def test_bulk_loader_uses_constant_queries(db):
+    service = UserDBService(db)
+    counter = count_queries(db)
+
+    service.get_users_full_data(["user_0", "user_1", "user_2"])
+
+    assert counter["count"] == 4
+
+
+def test_biomarker_counts_single_query(db):
+    service = UserDBService(db)
+    counter = count_queries(db)
+
+    counts = {u['user_id']: u['biomarker_count'] for u in service.get_users_with_biomarker_counts()}
+
+    assert counts == {"user_0": 1, "user_1": 2, "user_2": 3}
+    assert counter["count"] == 1
+
+
+class TrackedSession(Session):
+    """Session that records how often it was closed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.close_count = 0
+
+    def close(self):
+        self.close_count += 1
+        super().close()
+
+
+@pytest.fixture
+def tracked_sessions(db, monkeypatch):
+    """Route SessionLocal to a factory that keeps every session it opens"""
+    opened = []
+    factory = sessionmaker(bind=db.get_bind(), class_=TrackedSession)
+
+    def open_session():
+        session = factory()
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(app.services.user_db_service, "SessionLocal", open_session)
+    monkeypatch.setattr(app.database, "SessionLocal", open_session)
+    return opened
+
+
+def test_bound_session_is_reused_across_calls(db, tracked_sessions):
+    service = UserDBService(db)
+
+    service.get_user("user_0")
+    service.get_user_biomarkers("user_1")
+    service.get_user_full_data("user_2")
+
+    assert tracked_sessions == []
+    assert db.is_active
+
+
+def test_unbound_service_opens_and_closes_a_session_per_call(db, tracked_sessions):
+    service = UserDBService()
+
+    assert service.get_user("user_0")['user_id'] == "user_0"
+    assert len(service.get_user_goals("user_1")) == 1
+
+    assert len(tracked_sessions) == 2
+    assert [s.close_count for s in tracked_sessions] == [1, 1]
+
+
+def test_request_dependency_closes_its_session(db, tracked_sessions):
+    dependency = get_db()
+    session = next(dependency)
+    service = get_user_db_service(session)
+
+    assert service.db is session
+    service.get_user("user_0")
+    service.get_user_goals("user_0")
+    assert tracked_sessions == [session] and session.close_count == 0
+
+    # FastAPI finalises the generator once the response is sent
+    dependency.close()
+    assert session.close_count == 1
+
+
+def test_file_sqlite_engine_applies_pool_recycle(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    assert engine.pool._recycle == app.database.DB_POOL_RECYCLE
+    engine.dispose()
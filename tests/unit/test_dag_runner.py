@@ -0,0 +1,51 @@
+"""
+Unit tests for the DAG step runner
+"""
+
+import pytest
+
+from app.utils.dag_runner import DagRunner, DagStep
+
+
+def test_waves_follow_declared_dependencies():
+    noop = lambda ctx: None
+    runner = DagRunner([
+        DagStep('routine', noop, inputs=['supplements'], outputs=['routine']),
+        DagStep('supplements', noop, inputs=['conditions'], outputs=['supplements']),
+        DagStep('conditions', noop, inputs=['biomarkers'], outputs=['conditions']),
+        DagStep('scores', noop, inputs=['biomarkers'], outputs=['scores']),
+    ])
+
+    assert [[s.name for s in wave] for wave in runner.waves] == [
+        ['conditions', 'scores'], ['supplements'], ['routine']
+    ]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_run_passes_context_and_records_timings(max_workers):
+    runner = DagRunner([
+        DagStep('a', lambda ctx: ctx + 1, outputs=['a']),
+        DagStep('b', lambda ctx: ctx * 2, inputs=['a'], outputs=['b']),
+        DagStep('c', lambda ctx: ctx - 1, inputs=['a'], outputs=['c']),
+    ], max_workers=max_workers)
+
+    assert runner.run(10) == {'a': 11, 'b': 20, 'c': 9}
+    assert set(runner.timings) == {'a', 'b', 'c'}
+
+
+def test_cycle_is_rejected():
+    noop = lambda ctx: None
+    with pytest.raises(ValueError):
+        DagRunner([
+            DagStep('a', noop, inputs=['y'], outputs=['x']),
+            DagStep('b', noop, inputs=['x'], outputs=['y']),
+        ])
+
+
+def test_duplicate_producer_is_rejected():
+    noop = lambda ctx: None
+    with pytest.raises(ValueError, match="produced by both 'a' and 'b'"):
+        DagRunner([
+            DagStep('a', noop, outputs=['x']),
+            DagStep('b', noop, outputs=['x']),
+        ])
@@ -0,0 +1,59 @@
+"""
+Unit tests for HealthField ordering and time-range queries
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.digital_twin import DigitalTwin, FieldState, HealthField
+
+T0 = datetime(2024, 1, 1)
+
+
+def make_field(hours):
+    field = HealthField('heart_rate', 'int', FieldState.MISSING)
+    for value, hour in enumerate(hours):
+        field.add_value(value, T0 + timedelta(hours=hour))
+    return field
+
+
+def test_out_of_order_inserts_stay_sorted_and_stable():
+    field = make_field([5, 1, 3, 1, 0])
+    assert [p.timestamp.hour for p in field.values] == [0, 1, 1, 3, 5]
+    # The two points at hour 1 keep insertion order
+    assert [p.value for p in field.values if p.timestamp.hour == 1] == [1, 3]
+    assert field.state == FieldState.POPULATED
+
+    field.bulk_add([(99, T0 + timedelta(hours=2)), (100, T0 - timedelta(hours=1), 'bpm')])
+    assert [p.value for p in field.values] == [100, 4, 1, 3, 99, 2, 0]
+
+
+def test_range_and_latest_before():
+    field = make_field(range(10))
+    assert [p.value for p in field.range(T0 + timedelta(hours=2), T0 + timedelta(hours=5))] == [2, 3, 4]
+    assert [p.value for p in field.range(end=T0 + timedelta(hours=1))] == [0]
+    assert field.latest_before(T0 + timedelta(hours=4, minutes=30)).value == 4
+    assert field.latest_before(T0 + timedelta(hours=4)).value == 4
+    assert field.latest_before(T0 - timedelta(seconds=1)) is None
+
+
+def test_downsample():
+    field = make_field([h / 2 for h in range(12)])  # every 30 minutes for 6 hours
+    assert [p.value for p in field.downsample(timedelta(hours=2))] == [3, 7, 11]
+    assert [p.value for p in field.downsample(timedelta(hours=2), method='first')] == [0, 4, 8]
+
+    means = field.downsample(timedelta(hours=3), method='mean')
+    assert [(p.value, p.timestamp, p.metadata['count']) for p in means] == [
+        (2.5, T0, 6), (8.5, T0 + timedelta(hours=3), 6)
+    ]
+    with pytest.raises(ValueError):
+        field.downsample(timedelta(hours=1), method='median')
+
+
+def test_twin_get_field():
+    twin = DigitalTwin('u1')
+    twin.set_value('biomarkers', 'ldl', 130, timestamp=T0)
+    assert twin.get_field('biomarkers', 'ldl').latest_before(T0).value == 130
+    assert twin.get_field('biomarkers', 'hdl') is None
+    assert twin.get_field('nope', 'ldl') is None
@@ -0,0 +1,67 @@
+"""
+Unit tests for the bounded LRU cache and copy-on-write twin snapshots
+"""
+
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from app.models.digital_twin import DigitalTwin
+from app.storage.cache import LRUCache
+
+
+def test_evicts_least_recently_used_and_counts():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert 'b' not in cache
+    assert cache.keys() == ['a', 'c']
+    assert cache.get('b') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 1, 1)
+
+
+def test_byte_budget_and_ttl(monkeypatch):
+    cache = LRUCache(max_entries=10, max_bytes=10, size_of=len, ttl_seconds=5)
+    cache.put('a', 'xxxxxx')
+    cache.put('b', 'yyyyyy')
+    assert cache.keys() == ['b']
+
+    clock = [1000.0]
+    monkeypatch.setattr('app.storage.cache.time.monotonic', lambda: clock[0])
+    cache.put('c', 'zz')
+    clock[0] += 6
+    assert cache.get('c') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_twin_copy_isolates_mutations():
+    twin = DigitalTwin('u1')
+    twin.set_value('biomarkers', 'glucose', 90)
+    snapshot = twin.copy()
+    snapshot.set_value('biomarkers', 'glucose', 120)
+    snapshot.set_value('lifestyle', 'sleep_hours', 7)
+
+    assert len(twin.get_value('biomarkers', 'glucose', latest=False)) == 1
+    assert 'sleep_hours' not in twin.domains['lifestyle'].fields
+
+
+def test_twin_copy_shares_frozen_points_and_copies_values_on_write():
+    twin = DigitalTwin('u1')
+    twin.set_value('biomarkers', 'lipid_panel', {'ldl': 100}, metadata={'lab': 'A'})
+    snapshot = twin.copy()
+
+    point = snapshot.get_value('biomarkers', 'lipid_panel')
+    assert point is twin.get_value('biomarkers', 'lipid_panel')
+    with pytest.raises(FrozenInstanceError):
+        point.value = {'ldl': 160}
+
+    # The value list is shared until one side writes, then only the writer's changes
+    assert snapshot.get_field('biomarkers', 'lipid_panel').values is twin.get_field('biomarkers', 'lipid_panel').values
+    twin.set_value('biomarkers', 'lipid_panel', {'ldl': 90})
+    snapshot.set_value('biomarkers', 'lipid_panel', {'ldl': 120})
+    assert [p.value['ldl'] for p in twin.get_value('biomarkers', 'lipid_panel', latest=False)] == [100, 90]
+    assert [p.value['ldl'] for p in snapshot.get_value('biomarkers', 'lipid_panel', latest=False)] == [100, 120]
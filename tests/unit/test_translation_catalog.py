@@ -0,0 +1,77 @@
+"""
+Unit tests for the compiled translation catalog
+"""
+
+import json
+import os
+
+from app.middleware.translation import TRANSLATIONS_DIR
+from app.middleware.translation_catalog import TranslationCatalog
+
+
+def write(path, data, mtime=None):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def legacy_translate(translations, key, language='en', **kwargs):
+    """The nested walk the catalog replaces"""
+    if language not in translations:
+        language = 'en'
+    value = translations[language]
+    try:
+        for k in key.split('.'):
+            value = value[k]
+        if kwargs and isinstance(value, str):
+            return value.format(**kwargs)
+        return value
+    except (KeyError, TypeError):
+        if language != 'en':
+            return legacy_translate(translations, key, 'en', **kwargs)
+        return key
+
+
+def test_matches_nested_lookup_on_shipped_files():
+    catalog = TranslationCatalog(TRANSLATIONS_DIR)
+    keys = [
+        "health.status.high", "health.biomarkers.bmi", "health.categories.lipids",
+        "chat.greeting", "health.status", "health.status.high.extra", "missing"
+    ]
+    for language in ("en", "hi", "ta", "fr"):
+        expected = [legacy_translate(catalog.sources, key, language) for key in keys]
+        assert catalog.translate_many(keys, language) == expected
+        assert [catalog.translate(key, language) for key in keys] == expected
+
+
+def test_fallback_chain_and_formatting(tmp_path):
+    write(tmp_path / "en.json", {"a": {"hello": "Hello {name}", "bye": "Bye"}})
+    write(tmp_path / "hi.json", {"a": {"hello": "Namaste {name}"}})
+    write(tmp_path / "hi-IN.json", {"a": {"bye": "Alvida"}})
+    catalog = TranslationCatalog(tmp_path)
+
+    assert catalog.translate("a.hello", "hi", name="Asha") == "Namaste Asha"
+    assert catalog.translate_many(["a.hello", "a.bye"], "hi") == ["Namaste {name}", "Bye"]
+    assert catalog.translate_many(["a.hello", "a.bye", "a.x"], "hi-IN") == ["Namaste {name}", "Alvida", "a.x"]
+
+
+def test_hot_reload_and_broken_file(tmp_path):
+    write(tmp_path / "en.json", {"k": "one"}, mtime=1_000_000_000)
+    catalog = TranslationCatalog(tmp_path, reload_interval=0)
+    assert catalog.translate("k") == "one"
+    assert catalog.reloads == 1
+
+    write(tmp_path / "en.json", {"k": "two"}, mtime=2_000_000_000)
+    assert catalog.translate("k") == "two"
+
+    # A file that no longer parses keeps its last good translations
+    (tmp_path / "en.json").write_text("{", encoding="utf-8")
+    write(tmp_path / "ta.json", {"k": "moonru"})
+    assert catalog.translate_many(["k"], "en") == ["two"]
+    assert catalog.translate("k", "ta") == "moonru"
+
+    (tmp_path / "ta.json").unlink()
+    assert catalog.languages == ["en"]
+    reloads = catalog.reloads
+    catalog.translate("k")
+    assert catalog.reloads == reloads
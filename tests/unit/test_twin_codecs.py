@@ -0,0 +1,75 @@
+"""
+Unit tests for digital twin codecs and lazy row migration
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.digital_twin import DigitalTwin
+from app.storage.codecs import MAGIC, TwinCodec, decode_twin, encode_twin, get_codec
+from app.storage.database import DigitalTwinDatabase, DigitalTwinSerializationError
+
+
+def make_twin():
+    twin = DigitalTwin('codec_user', metadata={'source': 'ocr'})
+    twin.set_value('biomarkers', 'glucose', 92.5, timestamp=datetime(2024, 1, 1, 8, 30, 0, 123456), unit='mg/dL')
+    twin.set_value('biomarkers', 'glucose', 101, timestamp=datetime(2024, 2, 1), unit='mmol/L',
+                   metadata={'lab': 'A'})
+    twin.set_value('lifestyle', 'smoker', False, timestamp=datetime(2023, 5, 1, tzinfo=timezone(timedelta(hours=5, minutes=30))))
+    twin.domains['genetics'].add_field('apoe', 'str')
+    return twin
+
+
+def snapshot(twin):
+    return {
+        'meta': (twin.user_id, twin.created_at, twin.updated_at, twin.metadata),
+        'domains': {
+            d: {
+                f: (field.field_type, field.state, [(p.value, p.timestamp, p.timestamp.utcoffset(), p.unit, p.metadata)
+                                                    for p in field.values])
+                for f, field in domain.fields.items()
+            }
+            for d, domain in twin.domains.items()
+        }
+    }
+
+
+@pytest.mark.parametrize("codec_name", ["json", "columnar"])
+def test_round_trip(codec_name):
+    twin = make_twin()
+    stored = encode_twin(twin, get_codec(codec_name))
+
+    assert snapshot(decode_twin(stored)) == snapshot(twin)
+    assert isinstance(stored, str) == (codec_name == "json")
+
+
+def test_legacy_rows_are_migrated_on_read(tmp_path):
+    legacy = DigitalTwinDatabase(str(tmp_path / "twins.db"), codec="json")
+    legacy.create_user('codec_user', 'Codec User')
+    twin = make_twin()
+    legacy.save_digital_twin('codec_user', twin)
+
+    database = DigitalTwinDatabase(str(tmp_path / "twins.db"))
+    assert snapshot(database.get_digital_twin('codec_user')) == snapshot(twin)
+    assert snapshot(database.get_digital_twin('codec_user')) == snapshot(twin)
+
+    with sqlite3.connect(str(tmp_path / "twins.db")) as conn:
+        stored = conn.execute("SELECT digital_twin_data FROM digital_twins").fetchone()[0]
+    assert stored.startswith(MAGIC)
+
+
+def test_unknown_format_version_is_rejected(tmp_path):
+    database = DigitalTwinDatabase(str(tmp_path / "twins.db"))
+    with pytest.raises(DigitalTwinSerializationError):
+        database._deserialize_digital_twin(MAGIC + bytes((99, 1)) + b"{}")
+
+
+def test_codecs_must_implement_encode_and_decode():
+    class EncodeOnly(TwinCodec):
+        def encode(self, digital_twin):
+            return b""
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
@@ -0,0 +1,126 @@
+"""
+Unit tests for DigitalTwinDatabase connection handling and write paths
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.config.database import db_config
+from app.models.digital_twin import DigitalTwin
+from app.storage.database import DigitalTwinDatabase, UserAlreadyExistsError, UserNotFoundError
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = DigitalTwinDatabase(str(tmp_path / "twins.db"))
+    yield db
+    db.close()
+
+
+def test_single_statement_writes_keep_error_semantics(database):
+    database.create_user('alice', 'Alice')
+    with pytest.raises(UserAlreadyExistsError):
+        database.create_user('alice', 'Alice again')
+    with pytest.raises(UserNotFoundError):
+        database.save_digital_twin('nobody', DigitalTwin('nobody'))
+
+    twin = DigitalTwin('alice')
+    twin.set_value('biomarkers', 'glucose', 95)
+    database.save_digital_twin('alice', twin)
+    assert database.get_digital_twin('alice').get_value('biomarkers', 'glucose').value == 95
+
+
+def test_save_many_upserts_in_one_call(database):
+    database.create_user('alice', 'Alice')
+    twins = {user_id: DigitalTwin(user_id) for user_id in ('alice', 'bob', 'carol')}
+    twins['alice'].set_value('lifestyle', 'sleep_hours', 7)
+
+    assert database.save_many(twins, display_names={'bob': 'Bob'}) == 3
+
+    users = {u['user_id']: u['display_name'] for u in database.list_users()}
+    assert users == {'alice': 'Alice', 'bob': 'Bob', 'carol': 'User carol'}
+    assert database.get_digital_twin('alice').get_value('lifestyle', 'sleep_hours').value == 7
+
+
+def test_pooled_connections_are_per_thread(database):
+    with database._get_connection() as first, database._get_connection() as second:
+        assert first is second
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database._thread_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+    assert len(database._connections) == 2
+
+
+def test_appended_points_merge_and_compact(tmp_path):
+    database = DigitalTwinDatabase(str(tmp_path / "twins.db"), compact_after=3)
+    database.create_user('alice', 'Alice')
+    database.append_datapoint('alice', 'biomarkers', 'glucose', 110, timestamp=datetime(2024, 3, 1), unit='mg/dL')
+    database.append_datapoint('alice', 'biomarkers', 'glucose', 90, timestamp=datetime(2024, 1, 1), unit='mg/dL')
+    database.append_datapoint('alice', 'lifestyle', 'steps', 8000, metadata={'source': 'watch'})
+
+    partial = database.get_digital_twin('alice', domains=['biomarkers'])
+    assert list(partial.domains) == ['biomarkers']
+    assert [p.value for p in partial.get_value('biomarkers', 'glucose', latest=False)] == [90, 110]
+
+    twin = database.get_digital_twin('alice')  # third pending point triggers compaction
+    assert twin.get_value('lifestyle', 'steps').metadata == {'source': 'watch'}
+    with database._get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM twin_datapoints").fetchone()[0] == 0
+
+    reloaded = database.get_digital_twin('alice')
+    assert len(reloaded.get_value('biomarkers', 'glucose', latest=False)) == 2
+    with pytest.raises(UserNotFoundError):
+        database.append_datapoint('nobody', 'biomarkers', 'glucose', 1)
+    database.close()
+
+
+def test_save_keeps_points_appended_after_load(database):
+    database.create_user('alice', 'Alice')
+    database.append_datapoint('alice', 'biomarkers', 'glucose', 90, timestamp=datetime(2024, 1, 1))
+
+    twin = database.get_digital_twin('alice')
+    database.append_datapoint('alice', 'biomarkers', 'glucose', 110, timestamp=datetime(2024, 3, 1))
+    twin.set_value('lifestyle', 'steps', 8000)
+    database.save_digital_twin('alice', twin)
+
+    reloaded = database.get_digital_twin('alice')
+    assert [p.value for p in reloaded.get_value('biomarkers', 'glucose', latest=False)] == [90, 110]
+    assert reloaded.get_value('lifestyle', 'steps').value == 8000
+
+    database.append_datapoint('alice', 'lifestyle', 'steps', 9000)
+    database.save_many({'alice': reloaded})
+    with database._get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM twin_datapoints").fetchone()[0] == 1
+    assert len(database.get_digital_twin('alice').get_value('lifestyle', 'steps', latest=False)) == 2
+
+
+def test_cached_twin_takes_appends_in_place(database, monkeypatch, tmp_path):
+    monkeypatch.setattr(db_config, 'storage_mode', 'datapoints')
+    monkeypatch.setattr(db_config, 'enable_cache', True)
+    # The module creates its global storage on import; keep it out of the working directory
+    monkeypatch.setattr(db_config, 'database_path', str(tmp_path / "global.db"))
+    from app.storage.persistent_storage import PersistentDigitalTwinStorage
+    storage = PersistentDigitalTwinStorage(database)
+    storage.create_user_digital_twin('alice', 'Alice')
+
+    before = storage.get_digital_twin('alice')
+    cached = storage._cache.get('alice')
+    for value in (90, 110):
+        storage.add_data_point('alice', 'biomarkers', 'glucose', value)
+
+    assert storage._cache.get('alice') is cached
+    assert before.get_value('biomarkers', 'glucose') is None
+    assert [p.value for p in storage.get_digital_twin('alice').get_value('biomarkers', 'glucose', latest=False)] == [90, 110]
+    assert [p.value for p in database.get_digital_twin('alice').get_value('biomarkers', 'glucose', latest=False)] == [90, 110]
+
+    # A point appended by another writer drops the cached twin instead
+    database.append_datapoint('alice', 'biomarkers', 'glucose', 95)
+    storage.add_data_point('alice', 'biomarkers', 'glucose', 100)
+    assert 'alice' not in storage._cache
+    assert len(storage.get_digital_twin('alice').get_value('biomarkers', 'glucose', latest=False)) == 4